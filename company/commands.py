@@ -0,0 +1,22 @@
+import click
+from frappe.commands import get_site, pass_context
+
+
+@click.command("rebuild-attendance-summary")
+@click.option("--from-date", help="First date to rebuild (default: earliest attendance)")
+@click.option("--to-date", help="Last date to rebuild (default: latest attendance)")
+@click.option("--employee", multiple=True, help="Only rebuild these employees")
+@pass_context
+def rebuild_attendance_summary(context, from_date=None, to_date=None, employee=None):
+    "Recompute Attendance Monthly Summary rows from Attendance"
+    import frappe
+    from company.company.attendance_summary import rebuild_attendance_summary as rebuild
+
+    site = get_site(context)
+    with frappe.init_site(site):
+        frappe.connect()
+        written = rebuild(from_date, to_date, list(employee) or None)
+        click.echo(f"Attendance Monthly Summary rows written: {written}")
+
+
+commands = [rebuild_attendance_summary]
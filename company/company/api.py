@@ -23,77 +23,17 @@ from frappe import _
 # =================== ESTIMATION REFERENCE ===================
 @frappe.whitelist()
 def get_next_estimation_preview():
-    """Get next Estimation number for preview or assignment"""
-    today = getdate()
-    year = today.year
-
-    if today.month < 4:
-        start_year = year - 1
-        end_year = year
-    else:
-        start_year = year
-        end_year = year + 1
-
-    fy = f"{str(start_year)[-2:]}-{str(end_year)[-2:]}"  # e.g., 25-26
-
-    # Get last saved Estimation for this FY
-    last = frappe.db.sql("""
-        SELECT ref_no FROM `tabEstimation`
-        WHERE ref_no LIKE %s
-        ORDER BY creation DESC LIMIT 1
-    """, (f"IB-E/{fy}/%",), as_dict=True)
-
-    if last:
-        last_num = int(last[0].ref_no.split("/")[-1])
-        next_num = last_num + 1
-    else:
-        next_num = 1
-
-    return f"IB-E/{fy}/{str(next_num).zfill(3)}"
-
-
-def before_insert_estimation(doc, method):
-    """Assign Estimation ref_no automatically if not set"""
-    if not doc.ref_no:
-        doc.ref_no = get_next_estimation_preview()
+    """Next Estimation number for the form (not reserved; assigned on insert)"""
+    from company.company.series import preview_number
+    return preview_number("Estimation")
 
 
 # =================== INVOICE REFERENCE ===================
 @frappe.whitelist()
 def get_next_invoice_preview():
-    """Get next Invoice number for preview or assignment"""
-    today = getdate()
-    year = today.year
-
-    if today.month < 4:
-        start_year = year - 1
-        end_year = year
-    else:
-        start_year = year
-        end_year = year + 1
-
-    fy = f"{str(start_year)[-2:]}-{str(end_year)[-2:]}"  # e.g., 25-26
-
-    # Get last saved Invoice for this FY
-    last = frappe.db.sql("""
-        SELECT ref_no FROM `tabInvoice`
-        WHERE ref_no LIKE %s
-        ORDER BY creation DESC LIMIT 1
-    """, (f"IB-I/{fy}/%",), as_dict=True)
-
-    if last:
-        last_num = int(last[0].ref_no.split("/")[-1])
-        next_num = last_num + 1
-    else:
-        next_num = 1
-
-    return f"IB-I/{fy}/{str(next_num).zfill(3)}"
-
-
-def before_insert_invoice(doc, method):
-    """Assign Invoice ref_no automatically if not set"""
-    if not doc.ref_no:
-        doc.ref_no = get_next_invoice_preview()
+    """Next Invoice number for the form (not reserved; assigned on insert)"""
+    from company.company.series import preview_number
+    return preview_number("Invoice")
 
 
 @frappe.whitelist()
@@ -106,62 +46,6 @@ def get_total_collected(invoice_name):
 
     return total
 
-def update_invoice_received_balance(doc, method):
-    """
-    Update received_amount and balance_amount in Invoice
-    whenever an Invoice Collection is inserted/updated/deleted.
-    """
-    invoice_name = doc.invoice
-    if not invoice_name:
-        return
-
-    # Call the existing function
-    total_collected = flt(get_total_collected(invoice_name))
-
-    grand_total = flt(frappe.db.get_value("Invoice", invoice_name, "grand_total") or 0)
-    balance = grand_total - total_collected
-    if balance < 0:
-        balance = 0
-
-    frappe.db.set_value("Invoice", invoice_name, {
-        "received_amount": total_collected,
-        "balance_amount": balance
-    })
-
-    # Update only the CURRENT collection entry with the balance at this point in time
-    # to preserve historical sequence of balances.
-    if doc.doctype == "Invoice Collection":
-        frappe.db.set_value("Invoice Collection", doc.name, "amount_pending", balance)
-
-def validate_invoice_collection(doc, method):
-    """
-    Prevent Invoice Collection from exceeding Invoice grand_total
-    """
-    if not doc.invoice:
-        return
-
-    # Get grand total & already collected
-    invoice = frappe.db.get_value("Invoice", doc.invoice, ["grand_total"], as_dict=True)
-    if not invoice:
-        return
-
-    already_collected = frappe.db.sql("""
-        SELECT SUM(amount_collected)
-        FROM `tabInvoice Collection`
-        WHERE invoice=%s AND name != %s
-    """, (doc.invoice, doc.name))[0][0] or 0
-
-    new_total = flt(already_collected) + flt(doc.amount_collected)
-
-    if new_total > flt(invoice.grand_total):
-        frappe.throw(
-            f"Collection exceeds Invoice Amount.<br><br>"
-            f"Grand Total: {invoice.grand_total}<br>"
-            f"Already Collected: {already_collected}<br>"
-            f"Trying to Add: {doc.amount_collected}<br><br>"
-            f"Remaining Balance: {invoice.grand_total - already_collected}"
-        )
-
 @frappe.whitelist()
 def get_todays_followups():
     today = frappe.utils.today()  # '2025-09-23'
@@ -176,155 +60,26 @@ def get_todays_followups():
 # =================== EXPENSES REFERENCE ===================
 @frappe.whitelist()
 def get_next_expense_preview():
-    """Get next Expense number for preview or assignment"""
-    today = getdate()
-    year = today.year
-
-    # Financial Year (April → March)
-    if today.month < 4:
-        start_year = year - 1
-        end_year = year
-    else:
-        start_year = year
-        end_year = year + 1
-
-    fy = f"{str(start_year)[-2:]}-{str(end_year)[-2:]}"  # e.g., 25-26
-
-    # Get last saved Expense for this FY
-    last = frappe.db.sql("""
-        SELECT expense_no FROM `tabExpenses`
-        WHERE expense_no LIKE %s
-        ORDER BY creation DESC LIMIT 1
-    """, (f"EXP/{fy}/%",), as_dict=True)
-
-    if last:
-        last_num = int(last[0].expense_no.split("/")[-1])
-        next_num = last_num + 1
-    else:
-        next_num = 1
-
-    return f"EXP/{fy}/{str(next_num).zfill(3)}"
-
-
-def before_insert_expense(doc, method):
-    """Assign Expense number automatically if not set"""
-    if not doc.expense_no:
-        doc.expense_no = get_next_expense_preview()
-        doc.name = doc.expense_no  
+    """Next Expense number for the form (not reserved; assigned on insert)"""
+    from company.company.series import preview_number
+    return preview_number("Expenses")
 
 # =================== Auto Allocate Leave ==================
 @frappe.whitelist()
-def auto_allocate_monthly_leaves(year: int, month: int):
+def auto_allocate_monthly_leaves(year: int, month: int, months: int = 1):
     """
-    Automatically allocate leaves (Sick + Unpaid) to all active employees
-    for a given month/year.
+    Automatically allocate leaves (Sick + Unpaid + Permission) to all active employees
+    for a given month/year, or for `months` consecutive months starting there (backfill).
     Sick Leave - Paid: carries forward for 3 months, then resets.
     Unpaid Leave: fixed every month, no carry-forward.
     """
+    from company.company.leaves import allocate_monthly_leaves
 
     try:
-        month_start = get_first_day(datetime(year, month, 1))
-        month_end = get_last_day(datetime(year, month, 1))
-
-        prev_month_start = get_first_day(add_months(month_start, -1))
-        prev_month_end = get_last_day(add_months(month_start, -1))
-
-        employees = frappe.get_all(
-            "Employee",
-            filters={"status": "Active"},
-            fields=["name", "employee_id"]
-        )
-
-        leave_types = {
-            "Sick Leave - Paid": 1,
-            "Unpaid Leave": 30,
-            "Permission" : 120
-        }
-
-        created_count, skipped_count = 0, 0
-        errors = []
-
-        for emp in employees:
-            for leave_type, base_leave_count in leave_types.items():
-                try:
-                    # === Step 1: Skip if already exists for this month ===
-                    if frappe.db.exists("Leave Allocation", {
-                        "employee": emp.name,
-                        "leave_type": leave_type,
-                        "from_date": month_start,
-                        "to_date": month_end,
-                        "status": "Approved"
-                    }):
-                        skipped_count += 1
-                        continue
-
-                    # === Step 2: Get previous month's allocation ===
-                    prev_alloc = frappe.get_value(
-                        "Leave Allocation",
-                        {
-                            "employee": emp.name,
-                            "leave_type": leave_type,
-                            "from_date": prev_month_start,
-                            "to_date": prev_month_end,
-                            "status": "Approved"
-                        },
-                        ["total_leaves_allocated", "total_leaves_taken"],
-                        as_dict=True
-                    )
-
-                    # === Step 3: Count how many allocations exist ===
-                    allocation_count = frappe.db.count(
-                        "Leave Allocation",
-                        {
-                            "employee": emp.name,
-                            "leave_type": leave_type,
-                            "status": "Approved"
-                        }
-                    )
-
-                    carry_forward_balance = 0
-                    leave_count = base_leave_count
-
-                    # === ✅ Step 4: Logic for Sick Leave - Paid ===
-                    if leave_type == "Sick Leave - Paid":
-                        if allocation_count > 0 and allocation_count % 3 == 0:
-                            # Restart after every 3 months
-                            carry_forward_balance = 0
-                            leave_count = base_leave_count
-                        elif prev_alloc:
-                            balance = flt(prev_alloc.total_leaves_allocated) - flt(prev_alloc.total_leaves_taken)
-                            if balance > 0:
-                                carry_forward_balance = balance
-
-                    # === ✅ Step 5: Logic for Unpaid Leave ===
-                    elif leave_type == "Unpaid Leave":
-                        # Always fixed 30, no carry-forward
-                        carry_forward_balance = 0
-                        leave_count = base_leave_count
-
-                    # === Step 6: Create new allocation ===
-                    frappe.get_doc({
-                        "doctype": "Leave Allocation",
-                        "employee": emp.name,
-                        "leave_type": leave_type,
-                        "from_date": month_start,
-                        "to_date": month_end,
-                        "total_leaves_allocated": leave_count + carry_forward_balance,
-                        "total_leaves_taken": 0,
-                        "status": "Approved"
-                    }).insert(ignore_permissions=True, ignore_mandatory=True)
-
-                    created_count += 1
-
-                except Exception as e:
-                    errors.append(f"{emp.employee_id} - {leave_type} - {str(e)}")
-
+        result = allocate_monthly_leaves(year, month, months)
         frappe.db.commit()
 
-        msg = f"✅ Leave Allocation done.<br>Created: {created_count}, Skipped: {skipped_count}"
-        if errors:
-            msg += "<br><br>⚠️ Errors:<br>" + "<br>".join(errors)
-        return msg
+        return f"✅ Leave Allocation done.<br>Created: {result['created']}, Skipped: {result['skipped']}"
 
     except Exception as e:
         frappe.throw(f"❌ Error in auto leave allocation: {e}")
@@ -334,16 +89,16 @@ def auto_allocate_monthly_leaves(year: int, month: int):
 
 @frappe.whitelist()
 def generate_salary_slips_from_employee(year=None, month=None, employees=None):
+    """
+    Generate draft Salary Slips for the given month.
+    The month is loaded in bulk and evaluated in memory (see company.company.payroll).
+    """
     import json
+    from company.company.payroll import create_salary_slips
 
     if not year or not month:
         frappe.throw(_("Please provide year and month"))
 
-    year = int(year)
-    month = int(month)
-    start_date = getdate(f"{year}-{month}-01")
-    end_date = getdate(f"{year}-{month}-{monthrange(year, month)[1]}")
-
     # 🔹 Convert employees argument (JSON string) to Python list
     if isinstance(employees, str):
         try:
@@ -351,336 +106,33 @@ def generate_salary_slips_from_employee(year=None, month=None, employees=None):
         except Exception:
             frappe.throw(_("Invalid employees data"))
 
-    # Fetch holidays
-    holiday_dates = get_holiday_dates_for_month(year, month)
-    number_of_holidays = len(holiday_dates)  # total holidays in month
-
-    # 🔹 If employees are selected → filter only them, else include all
-    if employees:
-        employee_filters = {"name": ["in", employees]}
-    else:
-        employee_filters = {}
-
-    # Get employees
-    employees = frappe.get_all(
-        "Employee",
-        filters=employee_filters,
-        fields=[
-            "name", "employee_name", "basic_pay", "hra", "conveyance_allowances",
-            "medical_allowances", "other_allowances", "pf", "health_insurance",
-            "professional_tax", "loan_recovery", "email", "personal_email", "user"
-        ]
-    )
-
-    created_count = 0
-    skipped_count = 0
-    errors = []
-
-    for emp in employees:
-        # Skip already submitted slips
-        if frappe.db.exists("Salary Slip", {
-            "employee": emp.name,
-            "pay_period_start": start_date,
-            "pay_period_end": end_date,
-        }):
-            skipped_count += 1
-            continue
-
-        # Fetch attendance
-        attendance_records = frappe.get_all(
-            "Attendance",
-            filters={
-                "employee": emp.name,
-                "attendance_date": ["between", [start_date, end_date]],
-                "docstatus": ["in", [0, 1]]
-            },
-            fields=["status", "leave_type", "attendance_date"]
-        )
-
-        # Initialize counters
-        total_days = (end_date - start_date).days + 1
-        present_days = 0
-        absent_days = 0
-        paid_leave_days = 0
-        total_leave_days = 0
-
-        for single_day in [start_date + timedelta(days=i) for i in range(total_days)]:
-            is_holiday = single_day in holiday_dates
-            record = next((r for r in attendance_records if r["attendance_date"] == single_day), None)
-
-            if is_holiday:
-                present_days += 1  # count holiday as present
-                continue  # skip further attendance check
-
-            if record:
-                status = record.get("status")
-                if status == "Present":
-                    present_days += 1
-                elif status == "Half Day":
-                    total_leave_days += 0.5
-                    leave_type = record.get("leave_type")
-
-                    if leave_type == "Unpaid Leave":
-                        absent_days += 0.5  # unpaid leave
-                    else:
-                        present_days += 0.5
-                        paid_leave_days += 0.5
-                elif status == "Absent":
-                    absent_days += 1
-                    total_leave_days += 1
-                elif status in ["On Leave", "Leave"]:
-                    leave_type = record.get("leave_type")
-                    if leave_type:
-                        # Check Leave Allocation for this day
-                        allocations = frappe.get_all(
-                            "Leave Allocation",
-                            filters={
-                                "employee": emp.name,
-                                "leave_type": leave_type,
-                                "status": "Approved",
-                                "from_date": ["<=", single_day],
-                                "to_date": [">=", single_day]
-                            },
-                            fields=["name", "total_leaves_allocated", "total_leaves_taken"]
-                        )
-                        allocation_found = None
-                        for a in allocations:
-                            if flt(a.total_leaves_taken) < flt(a.total_leaves_allocated):
-                                allocation_found = a
-                                break
-
-                        if allocation_found:
-                            paid_leave_days += 1
-                            present_days += 1
-                            total_leave_days += 1
-                        else:
-                            # Check if there’s an approved Leave Application for this date
-                            approved_leave = frappe.db.exists("Leave Application", {
-                                "employee": emp.name,
-                                "leave_type": leave_type,
-                                "workflow_state": "Approved",
-                                "from_date": ["<=", single_day],
-                                "to_date": [">=", single_day]
-                            })
-                            if approved_leave:
-                                paid_leave_days += 1
-                                present_days += 1
-                                total_leave_days += 1
-                            else:
-                                absent_days += 1
-                                total_leave_days += 1
-
-            else:
-                # No attendance record → absent
-                absent_days += 1
-                total_leave_days += 1
-
-        # Calculate salary
-        working_days = total_days
-        unpaid_leave_days = total_leave_days - paid_leave_days
-
-        # Earnings
-        gross_pay = (
-            flt(emp.basic_pay)
-            + flt(emp.hra)
-            + flt(emp.conveyance_allowances)
-            + flt(emp.medical_allowances)
-            + flt(emp.other_allowances)
-        )
-
-        # Deductions
-        base_deductions = (
-            flt(emp.pf)
-            + flt(emp.health_insurance)
-            + flt(emp.professional_tax)
-            + flt(emp.loan_recovery)
-        )
-
-        # Prorate based on attendance
-        grand_gross_pay = gross_pay * ((working_days - unpaid_leave_days) / working_days) if working_days else gross_pay
-        grand_net_pay = grand_gross_pay - base_deductions
-
-        lop_amount = gross_pay * (unpaid_leave_days / working_days) if working_days else 0
-
-        total_deductions = base_deductions + lop_amount
+    result = create_salary_slips(year, month, employees)
 
-        try:
-            slip = frappe.get_doc({
-                "doctype": "Salary Slip",
-                "employee": emp.name,
-                "employee_name": emp.employee_name,
-                "email": emp.email,
-                "personal_email": emp.personal_email,
-                "user": emp.user,
-                "pay_period_start": start_date,
-                "pay_period_end": end_date,
-                "no_of_leave": total_leave_days,
-                "no_of_paid_leave": paid_leave_days,
-                "gross_pay": gross_pay,
-                "grand_gross_pay": grand_gross_pay,
-                "net_pay": grand_gross_pay - base_deductions,
-                "grand_net_pay": grand_net_pay,
-                "total_deduction": total_deductions,
-                "total_working_days": working_days,
-                "lop": lop_amount,
-                "lop_days": unpaid_leave_days,
-                "status": "Draft",
-                "basic_pay": emp.basic_pay,
-                "hra": emp.hra,
-                "conveyance_allowances": emp.conveyance_allowances,
-                "medical_allowances": emp.medical_allowances,
-                "other_allowances": emp.other_allowances,
-                "pf": emp.pf,
-                "health_insurance": emp.health_insurance,
-                "professional_tax": emp.professional_tax,
-                "loan_recovery": emp.loan_recovery
-            })
-            slip.insert(ignore_permissions=True)
-            created_count += 1
-
-        except Exception as e:
-            errors.append(f"Error for {emp.name}: {str(e)}")
-
-    result_msg = f"Salary Slips Created: {created_count}, Skipped: {skipped_count}"
-    if errors:
-        result_msg += "\nErrors:\n" + "\n".join(errors)
+    result_msg = f"Salary Slips Created: {len(result['created'])}, Skipped: {result['skipped']}"
+    if result["errors"]:
+        result_msg += "\nErrors:\n" + "\n".join(result["errors"])
 
     return result_msg
 
 @frappe.whitelist()
 def salary_slip_after_submit(doc, method):
-    """Triggered automatically when a Salary Slip is submitted (approved)."""
-
-    try:
-        # Get Month-Year for display
-        month_year = frappe.utils.formatdate(doc.pay_period_start, "MMMM yyyy")
-
-        # -------------------------
-        # 1️⃣ Create Notification Log
-        # -------------------------
-        if doc.user:
-            notification_doc = frappe.get_doc({
-                "doctype": "Notification Log",
-                "subject": f"Salary Slip for {month_year}",
-                "email_content": f"Your salary slip for {month_year} has been approved.",
-                "for_user": doc.user,
-                "document_type": "Salary Slip",
-                "document_name": doc.name,
-                "from_user": frappe.session.user,
-                "type": "Alert",
-                "seen": 0,
-            })
-            notification_doc.insert(ignore_permissions=True)
-
-            # Real-time bell refresh
-            frappe.publish_realtime(
-                event="notification",
-                message={"type": "New Notification"},
-                user=doc.user,
-                after_commit=True
-            )
-
-    except Exception:
-        frappe.log_error(frappe.get_traceback(), "Salary Slip Notification Error")
-
-    # -------------------------
-    # 2️⃣ Firebase Push Notification
-    # -------------------------
-    try:
-        from company.company.api import send_push_notification_to_user
-
-        if doc.user:
-            result = send_push_notification_to_user(
-                user=doc.user,
-                title=f"Salary Slip for {month_year}",
-                body=f"Your salary slip for {month_year} has been approved successfully.",
-                data={"salary_slip": doc.name}
-            )
-
-            frappe.log_error(
-                message=f"Push notification sent successfully to {doc.user}\nResponse: {result}",
-                title=f"Firebase Push Success for {doc.employee_name}"
-            )
-
-    except Exception as e:
-        frappe.log_error(
-            message=f"Error while sending push notification: {str(e)}",
-            title=f"Firebase Push Error for {doc.employee_name}"
-        )
+    """
+    Triggered automatically when a Salary Slip is submitted (approved).
+    Notification Log, push and the PDF email are sent by a background
+    worker (company.company.salary_release), not in the submit request.
+    """
+    from company.company.salary_release import queue_slip_release
 
-    # -------------------------
-    # 3️⃣ Email Notification
-    # -------------------------
-    try:
-        recipients = []
-        if doc.email:
-            recipients.append(doc.email)
-        if doc.personal_email:
-            recipients.append(doc.personal_email)
-
-        if recipients:
-            print_format = frappe.get_meta("Salary Slip").default_print_format or "Standard"
-            pdf_content = frappe.get_print(
-                "Salary Slip",
-                doc.name,
-                print_format=print_format,
-                as_pdf=True
-            )
+    queue_slip_release(doc, method)
 
-            message = f"""
-            <div style="font-family: 'Montserrat', 'Segoe UI', Arial, sans-serif; background:#f4f6f8; padding:30px;">
-                <div style="max-width:600px; margin:auto; background:white; border-radius:12px;
-                            box-shadow:0 2px 8px rgba(0,0,0,0.08); overflow:hidden;">
-                    <div style="background:#007bff; color:white; padding:18px 24px; font-size:18px; font-weight:600; text-align:center;">
-                        Your Salary Slip for {month_year}
-                    </div>
-                    <div style="padding:24px; color:#333; font-size:14px; line-height:1.6;">
-                        <p>Dear <b>{doc.employee_name}</b>,</p>
-                        <p>Your salary slip for <b>{month_year}</b> has been Released. Please find the attached PDF below.</p>
-                        <p style="margin-top:20px;">Best regards,<br>
-                        <b style="color:#007bff;">HR Team</b></p>
-                    </div>
-                </div>
-            </div>
-            """
-
-            frappe.sendmail(
-                recipients=recipients,
-                subject=f"Salary Slip for {month_year}",
-                message=message,
-                attachments=[{
-                    "fname": f"Salary_Slip_{doc.employee}_{month_year}.pdf",
-                    "fcontent": pdf_content
-                }],
-                reference_doctype="Salary Slip",
-                reference_name=doc.name
-            )
-
-    except Exception as e:
-        frappe.log_error(message=str(e), title=f"Email Error for {doc.employee_name}")
-        
 
 def get_holiday_dates_for_month(year, month):
     """
     Fetch all holiday dates for given month/year from Holiday List (auto + manual holidays)
     """
-    holiday_list = frappe.get_all("Holiday List",
-        filters={"year": year, "month_year": month},
-        fields=["name"]
-    )
-
-    if not holiday_list:
-        return []
+    from company.company.holidays import get_month_holiday_dates
 
-    holiday_doc = frappe.get_doc("Holiday List", holiday_list[0].name)
-    holiday_dates = []
-
-    for row in holiday_doc.holidays:
-        if row.is_working_day == 0:
-            holiday_dates.append(row.holiday_date)
-
-    
-    return holiday_dates
+    return get_month_holiday_dates(year, month)
 
 
 @frappe.whitelist()
@@ -867,40 +319,28 @@ def get_today_leave_employees():
 
 
 def update_leave_allocation_from_attendance(doc, method=None):
+    """
+    Hook: Attendance on_update / on_trash.
+    A leave day debits one leave from the allocation covering the date;
+    any other status (or deleting the row) gives it back via the leave ledger.
+    """
+    from company.company.leaves import find_allocation, sync_reference_debit
+
     if not doc.employee or not doc.attendance_date:
         return
 
-    previous = getattr(doc, "_previous_status", None)
+    on_leave = method != "on_trash" and doc.status in ["On Leave", "Leave"]
+    allocation = None
+    if doc.leave_type:
+        allocation = find_allocation(doc.employee, doc.leave_type, doc.attendance_date)
 
-    allocation = frappe.get_all(
-        "Leave Allocation",
-        filters={
-            "employee": doc.employee,
-            "leave_type": doc.leave_type,
-            "status": "Approved",
-            "from_date": ["<=", doc.attendance_date],
-            "to_date": [">=", doc.attendance_date]
-        },
-        fields=["name", "total_leaves_allocated", "total_leaves_taken"],
-        limit_page_length=1
+    sync_reference_debit(
+        "Attendance", doc.name, allocation,
+        desired=1 if on_leave else 0,
+        posting_date=doc.attendance_date,
+        remarks=f"Attendance {doc.status}"
     )
 
-    if not allocation:
-        return
-
-    allocation = allocation[0]
-    total_taken = allocation.total_leaves_taken or 0
-    total_alloc = allocation.total_leaves_allocated or 0
-
-    # Only act if status changed
-    if doc.status in ["On Leave", "Leave"] and previous not in ["On Leave", "Leave"]:
-        if total_taken < total_alloc:
-            frappe.db.set_value("Leave Allocation", allocation.name, "total_leaves_taken", total_taken + 1)
-
-    elif previous in ["On Leave", "Leave"] and doc.status == "Present":
-        if total_taken > 0:
-            frappe.db.set_value("Leave Allocation", allocation.name, "total_leaves_taken", total_taken - 1)
-
 
 
 @frappe.whitelist()
@@ -912,24 +352,10 @@ def check_leave_balance(employee, leave_type, from_date, to_date, permission_hou
     from_date = getdate(from_date)
     to_date = getdate(to_date)
 
-    # Fetch leave allocation
-    allocations = frappe.get_all(
-        "Leave Allocation",
-        filters={
-            "employee": employee,
-            "leave_type": leave_type,
-            "status": "Approved",
-            "from_date": ["<=", to_date],
-            "to_date": [">=", from_date]
-        },
-        fields=["total_leaves_allocated", "total_leaves_taken"]
-    )
+    from company.company.leaves import get_leave_balance
 
-    remaining = 0
-    if allocations:
-        total_allocated = sum(flt(a.total_leaves_allocated) for a in allocations)
-        total_taken = sum(flt(a.total_leaves_taken) for a in allocations)
-        remaining = total_allocated - total_taken
+    # Cached balance on the overlapping allocations (single indexed lookup)
+    remaining = get_leave_balance(employee, leave_type, from_date, to_date)
 
     # --- Permission logic ---
     if leave_type.lower() == "permission":
@@ -967,6 +393,8 @@ def validate_leave_balance(doc, method=None):
     """
     Hook for Leave Application — blocks submission if insufficient balance or duplicate permission.
     """
+    from company.company.conflicts import has_conflict
+
     if not doc.employee or not doc.leave_type:
         frappe.throw("Employee and Leave Type are required.")
 
@@ -988,81 +416,67 @@ def validate_leave_balance(doc, method=None):
 
     # --- 2️⃣ Prevent overlapping (normal leave only) ---
     if doc.leave_type.lower() != "permission":
-        if has_approved_leave(doc.employee, doc.from_date, doc.to_date, exclude_doc=doc.name):
+        if has_conflict("leave", doc.employee, doc.from_date, doc.to_date, exclude=doc.name):
             frappe.throw(
                 f"Employee {doc.employee} already has an approved leave in the selected date range."
             )
 
-    # --- 3️⃣ Prevent duplicate permission ---
+    # --- 3️⃣ Prevent duplicate permission (approved or pending) ---
     if doc.leave_type.lower() == "permission":
-        existing = frappe.db.exists(
-            "Leave Application",
-            {
-                "employee": doc.employee,
-                "leave_type": "Permission",
-                "from_date": doc.from_date,
-                "workflow_state": ["in", ["Approved", "Pending Approval"]],
-                "name": ["!=", doc.name]
-            }
-        )
-        if existing:
+        if has_conflict("permission", doc.employee, doc.from_date, doc.to_date, exclude=doc.name):
             frappe.throw(
                 f"Employee {doc.employee} already has a Permission applied on {doc.from_date}."
             )
 
 
 
-def has_approved_leave(employee, from_date, to_date, exclude_doc=None):
-    """
-    Checks if employee already has approved leave overlapping the given range.
-    """
-    filters = {
-        "employee": employee,
-        "status": "Approved",
-        "from_date": ["<=", to_date],
-        "to_date": [">=", from_date]
-    }
-    if exclude_doc:
-        filters["name"] = ["!=", exclude_doc]
-
-    return frappe.db.exists("Leave Application", filters)
-
-
 def update_permission_allocation(doc, method=None):
-    # ✅ Run only when leave type is Permission and workflow state is Approved
-    if doc.leave_type.lower() != "permission" or doc.workflow_state != "Approved":
+    from company.company.leaves import find_allocation, sync_reference_debit, get_reference_net
+
+    # ✅ Run only for Permission leave type
+    if doc.leave_type.lower() != "permission":
         return
 
-    if not doc.permission_hours:
+    approved = doc.workflow_state == "Approved" and doc.docstatus != 2
+    if approved and not doc.permission_hours:
         frappe.throw("Permission Hours are required for Permission leave type.")
 
-    # 🔍 Fetch the active Approved Leave Allocation
-    allocation = frappe.db.get_value(
-        "Leave Allocation",
-        {
-            "employee": doc.employee,
-            "leave_type": doc.leave_type,
-            "status": "Approved"
-        },
-        ["name", "total_leaves_taken"],
-        as_dict=True
+    # 🔍 Allocation covering the permission date (any approved one as fallback)
+    allocation = (
+        find_allocation(doc.employee, doc.leave_type, doc.from_date)
+        or find_allocation(doc.employee, doc.leave_type)
     )
 
-    if not allocation:
+    if approved and not allocation:
         frappe.msgprint(f"No Leave Allocation found for {doc.employee} - {doc.leave_type}")
         return
 
-    # ➕ Add new taken minutes
-    new_taken = flt(allocation.total_leaves_taken) + flt(doc.permission_hours)
+    # ➕ Debit the approved minutes once (re-saves / on_change re-runs are no-ops,
+    # cancellation or rejection credits them back)
+    added = sync_reference_debit(
+        "Leave Application", doc.name, allocation,
+        desired=flt(doc.permission_hours) if approved else 0,
+        posting_date=doc.from_date,
+        remarks=f"Permission {doc.workflow_state}"
+    )
 
-    frappe.db.set_value("Leave Allocation", allocation.name, "total_leaves_taken", new_taken)
-    frappe.db.commit()
+    if not approved or not allocation:
+        return
 
-    frappe.msgprint(
-        f"✅ Permission hours updated for {doc.employee}.<br>"
-        f"Added: {doc.permission_hours} minutes.<br>"
-        f"Total taken now: {new_taken} minutes."
-    )
+    if added <= 0 and not get_reference_net("Leave Application", doc.name).get(allocation):
+        frappe.msgprint(
+            f"⚠️ Not enough Permission balance left for {doc.employee}; "
+            f"{doc.permission_hours} minutes were not deducted."
+        )
+        return
+
+    if added:
+        new_taken = frappe.db.get_value("Leave Allocation", allocation, "total_leaves_taken")
+        frappe.msgprint(
+            f"✅ Permission hours updated for {doc.employee}.<br>"
+            f"Added: {added} minutes.<br>"
+            f"Total taken now: {new_taken} minutes."
+        )
 
 
 @frappe.whitelist()
@@ -1273,86 +687,29 @@ def auto_submit_leave_application(doc, method=None):
 
 
 
-def has_approved_leave(employee, from_date, to_date, exclude_doc=None):
-    """
-    Returns True if there is already an approved leave for the employee
-    that overlaps with the given date range.
-    exclude_doc: optional Leave Application name to exclude from check (useful during updates)
-    """
-    filters = {
-        "employee": employee,
-        "workflow_state": "Approved",
-        "docstatus": 1,
-        "from_date": ["<=", to_date],
-        "to_date": [">=", from_date],
-    }
-
-    if exclude_doc:
-        filters["name"] = ["!=", exclude_doc]
-
-    existing = frappe.get_all("Leave Application", filters=filters, fields=["name"])
-    return bool(existing)
-
-
 @frappe.whitelist()
 def get_today_birthdays():
     """
     Returns a list of employees who have birthday today
     """
-    employees = frappe.get_all(
-        "Employee",
-        filters={
-            "status": "Active"
-        },
-        fields=["employee_name", "employee_id", "dob"]
-    )
-    
-
-    today_mmdd = getdate(today()).strftime("%m-%d")  # e.g., "10-02"
-    result = []
-    
-    for emp in employees:
-        if not emp.dob:
-            continue
+    from company.company.celebrations import get_celebrations_between
 
-        dob_date = getdate(emp.dob)  # convert to date object
-        emp_mmdd = dob_date.strftime("%m-%d")
-
-        
-
-        if emp_mmdd == today_mmdd:
-            res = result.append({
-                "employee_name": emp.employee_name,
-                "employee": emp.employee_id,
-                "dob": str(emp.dob)
-            })
-
-    return result
+    today_date = getdate(today())
+    return [
+        {
+            "employee_name": emp["employee_name"],
+            "employee": emp["employee_id"],
+            "dob": emp["dob"]
+        }
+        for emp in get_celebrations_between(today_date, today_date)["birthdays"]
+    ]
 
 
 @frappe.whitelist()
 def get_current_month_holidays():
 
     today = datetime.today()
-    current_month = today.month
-    current_year = today.year
-
-    # fetch only parent holiday lists for the current year
-    holiday_lists = frappe.get_all("Holiday List", filters={"year": current_year}, fields=["name"])
-
-    result = []
-
-    for hl in holiday_lists:
-        doc = frappe.get_doc("Holiday List", hl.name)
-        for h in doc.holidays:
-            # Only consider current month and non-working days
-            if h.holiday_date.month == current_month and h.is_working_day == 0:
-                result.append({
-                    "holiday_date": h.holiday_date.strftime("%Y-%m-%d"),
-                    "description": h.description
-                })
-
-    return result
+    return get_month_holidays(today.month, today.year)
 
 
 @frappe.whitelist()
@@ -1428,60 +785,93 @@ def format_timedelta(td):
 
 
 
+def _get_checkin_status(attendance):
+    """Check-in badge data from today's attendance row (or None)"""
+    if not attendance:
+        return {"status": "Not Checked In", "checkin_time": None, "checkout_time": None}
+
+    return {
+        "status": attendance.status or "—",
+        "checkin_time": format_timedelta(attendance.in_time),
+        "checkout_time": format_timedelta(attendance.out_time)
+    }
+
+
 @frappe.whitelist()
 def get_today_checkin_time():
-    """Return today's check-in/out details for the logged-in employee with formatted debug logging."""
+    """Return today's check-in/out details for the logged-in employee."""
     try:
-        user = frappe.session.user
-
-        # Try both possible link fields: 'user' or 'user_id'
-        employee = frappe.db.get_value("Employee", {"user": user}, "name")
-        if not employee:
-            employee = frappe.db.get_value("Employee", {"user_id": user}, "name")
+        from company.company.employees import get_session_employee
 
+        employee = get_session_employee()
         if not employee:
-            all_emps = frappe.get_all("Employee", ["name", "user", "user_id"])
             return {"status": "Not Linked", "checkin_time": None, "checkout_time": None}
 
-
-        today = getdate()
         attendance = frappe.db.get_value(
             "Attendance",
-            {"employee": employee, "attendance_date": today},
+            {"employee": employee, "attendance_date": getdate()},
             ["in_time", "out_time", "status"],
             as_dict=True
         )
+        return _get_checkin_status(attendance)
 
-        # Format in/out times for logging
-        if attendance:
-            formatted_checkin = format_timedelta(attendance.in_time)
-            formatted_checkout = format_timedelta(attendance.out_time)
-            # frappe.log_error(
-            #     f"Today's attendance (formatted): "
-            #     f"in_time={formatted_checkin}, "
-            #     f"out_time={formatted_checkout}, "
-            #     f"status={attendance.status}",
-            #     "Checkin Debug"
-            # )
-        else:
-            # frappe.log_error("Today's attendance: None", "Checkin Debug")
-            pass
+    except Exception as e:
+        return {"status": "Error", "checkin_time": None, "checkout_time": None}
 
-        if not attendance:
-            return {"status": "Not Checked In", "checkin_time": None, "checkout_time": None}
 
-        checkin_time = format_timedelta(attendance.in_time)
-        checkout_time = format_timedelta(attendance.out_time)
-        status = attendance.status or "—"
+def _get_recent_attendance(employee, start_date, end_date):
+    """Attendance rows of one employee keyed by date string"""
+    attendance_records = frappe.get_all(
+        "Attendance",
+        filters={
+            "employee": employee,
+            "attendance_date": ["between", [start_date, end_date]]
+        },
+        fields=["attendance_date", "in_time", "out_time", "status"],
+        order_by="attendance_date asc"
+    )
+    return {str(rec.attendance_date): rec for rec in attendance_records}
 
-        return {
-            "status": status,
+
+def _build_seven_day_timeline(attendance_dict, start_date):
+    """Timeline rows for 7 days from start_date, latest first"""
+    from company.company.holidays import get_day
+
+    timeline_data = []
+
+    # Build timeline (oldest to newest)
+    for i in range(7):
+        date = start_date + timedelta(days=i)
+        date_str = str(date)
+
+        att_rec = attendance_dict.get(date_str)
+        hol_rec = get_day(date)
+
+        checkin_time = str(att_rec.in_time) if att_rec and att_rec.in_time else None
+        checkout_time = str(att_rec.out_time) if att_rec and att_rec.out_time else None
+        status = att_rec.status if att_rec else "Absent"
+
+        # Holiday info
+        if hol_rec:
+            is_holiday, description = hol_rec
+            if not is_holiday:
+                holiday_info = f"Working Day: {description}"
+            else:
+                holiday_info = f"Holiday: {description}"
+        else:
+            holiday_info = "—"
+
+        timeline_data.append({
+            "date": date_str,
             "checkin_time": checkin_time,
-            "checkout_time": checkout_time
-        }
+            "checkout_time": checkout_time,
+            "status": status,
+            "holiday_info": holiday_info
+        })
 
-    except Exception as e:
-        return {"status": "Error", "checkin_time": None, "checkout_time": None}
+    # ✅ Reverse the order (latest first)
+    timeline_data.reverse()
+    return timeline_data
 
 
 @frappe.whitelist()
@@ -1491,77 +881,19 @@ def get_employee_last_seven_days_attendance():
     including holidays and working day info — in reverse order (latest first).
     """
     try:
-        from datetime import datetime, timedelta
-
-        user = frappe.session.user
+        from company.company.employees import get_session_employee
 
         # Get employee linked to logged-in user
-        employee = frappe.db.get_value("Employee", {"user": user}, "name") or \
-                   frappe.db.get_value("Employee", {"user_id": user}, "name")
+        employee = get_session_employee()
 
         if not employee:
             return {"status": "Not Linked", "timeline": []}
 
-        today_date = datetime.today().date()
+        today_date = getdate()
         start_date = today_date - timedelta(days=6)  # last 7 days including today
-        end_date = today_date
 
-        # Fetch attendance records
-        attendance_records = frappe.get_all(
-            "Attendance",
-            filters={
-                "employee": employee,
-                "attendance_date": ["between", [start_date, end_date]]
-            },
-            fields=["attendance_date", "in_time", "out_time", "status"],
-            order_by="attendance_date asc"
-        )
-        attendance_dict = {str(rec.attendance_date): rec for rec in attendance_records}
-
-        # Fetch holidays
-        holidays = frappe.get_all(
-            "Holidays",
-            filters={"holiday_date": ["between", [start_date, end_date]]},
-            fields=["holiday_date", "description", "is_working_day"]
-        )
-        holiday_dict = {str(h["holiday_date"]): h for h in holidays}
-
-        timeline_data = []
-
-        # Build timeline (oldest to newest)
-        for i in range(7):
-            date = start_date + timedelta(days=i)
-            date_str = str(date)
-
-            att_rec = attendance_dict.get(date_str)
-            hol_rec = holiday_dict.get(date_str)
-
-            checkin_time = str(att_rec.in_time) if att_rec and att_rec.in_time else None
-            checkout_time = str(att_rec.out_time) if att_rec and att_rec.out_time else None
-            status = att_rec.status if att_rec else "Absent"
-
-            # Holiday info
-            if hol_rec:
-                if hol_rec.get("is_working_day"):
-                    holiday_info = f"Working Day: {hol_rec.get('description') or ''}"
-                else:
-                    holiday_info = f"Holiday: {hol_rec.get('description') or ''}"
-            else:
-                holiday_info = "—"
-
-            timeline_data.append({
-                "date": date_str,
-                "checkin_time": checkin_time,
-                "checkout_time": checkout_time,
-                "status": status,
-                "holiday_info": holiday_info
-            })
-
-        # ✅ Reverse the order (latest first)
-        timeline_data.reverse()
-
-        # frappe.log_error(f"Last 7 Days Timeline Data (Reversed) for {employee}: {timeline_data}", "Timeline Debug")
-        return timeline_data
+        attendance_dict = _get_recent_attendance(employee, start_date, today_date)
+        return _build_seven_day_timeline(attendance_dict, start_date)
 
     except Exception as e:
         frappe.log_error(f"Error fetching last 7 days timeline: {str(e)}", "Timeline Error")
@@ -1572,25 +904,15 @@ def get_employee_last_seven_days_attendance():
 #=========Firebase Notification==========
 
 import frappe
-import requests
-from google.oauth2 import service_account
-import google.auth.transport.requests
-from typing import Optional
 
 def _get_credentials():
     """
-    Load service account credentials from site_config fcm_key_path.
-    Returns google Credentials object.
+    Service account credentials from site_config fcm_key_path
+    (cached per process, see company.company.push).
     """
-    key_relative = frappe.get_site_config().get("fcm_key_path")
-    if not key_relative:
-        frappe.throw("FCM key path not configured in site_config.json (fcm_key_path)")
-    key_path = frappe.get_site_path(key_relative)
-    creds = service_account.Credentials.from_service_account_file(
-        key_path,
-        scopes=["https://www.googleapis.com/auth/firebase.messaging"]
-    )
-    return creds
+    from company.company.push import get_credentials
+
+    return get_credentials()
 
 @frappe.whitelist(allow_guest=False)
 def save_fcm_token(token: str):
@@ -1604,45 +926,28 @@ def save_fcm_token(token: str):
 
 def _send_v1_message_to_token(token: str, title: str, body: str, data: dict = None) -> dict:
     """
-    Send a message to a device token using FCM HTTP v1.
-    Returns FCM response JSON.
+    Send a message to a device token using FCM HTTP v1, synchronously.
+    Returns FCM response JSON. Prefer send_push_notification_to_user, which queues.
     """
-    creds = _get_credentials()
-    request = google.auth.transport.requests.Request()
-    creds.refresh(request)
-    access_token = creds.token
-    project_id = creds.project_id
-
-    message = {
-        "message": {
-            "token": token,
-            "notification": {"title": title, "body": body}
-        }
-    }
-    if data:
-        # Optional custom data payload
-        message["message"]["data"] = {k: str(v) for k, v in data.items()}
-
-    url = f"https://fcm.googleapis.com/v1/projects/{project_id}/messages:send"
-    headers = {
-        "Authorization": f"Bearer {access_token}",
-        "Content-Type": "application/json; UTF-8"
-    }
-    resp = requests.post(url, headers=headers, json=message, timeout=10)
-    try:
-        return resp.json()
-    except ValueError:
-        return {"error": "non-json-response", "status_code": resp.status_code, "text": resp.text}
+    from company.company.push import send_to_token
 
-def send_push_notification_to_user(user: str, title: str, body: str, data: dict = None):
+    return send_to_token(token, title, body, data)
+
+def send_push_notification_to_user(user: str, title: str, body: str, data: dict = None,
+                                   reference_doctype=None, reference_name=None):
     """
     Public helper to send a push notification to a Frappe User (by email/ID).
+    The message is queued and delivered by a background worker after commit.
     """
+    from company.company.push import enqueue_push
+
     token = frappe.db.get_value("User", user, "fcm_token")
     if not token:
         frappe.log_error(message=f"No FCM token for user {user}", title="FCM No Token")
         return {"error": "no_token", "message": f"No token for user {user}"}
-    return _send_v1_message_to_token(token, title, body, data)
+
+    name = enqueue_push(user, title, body, data, reference_doctype, reference_name)
+    return {"status": "queued", "queue": name}
 
 def send_chat_notification_to_user(user: str, title: str, body: str):
     """
@@ -1680,73 +985,52 @@ def extend_bootinfo(bootinfo):
 
 @frappe.whitelist()
 def create_unread_entry_for_hr(doc, method=None):
-    # skip if HR created it
-    if "HR" in frappe.get_roles(doc.owner):
-        return
+    from company.company.hr_unread import create_unread_entries
 
-    # avoid duplicates
-    if frappe.db.exists("HR Read Tracker", {
-        "reference_doctype": doc.doctype,
-        "reference_name": doc.name
-    }):
-        return
+    create_unread_entries(doc)
 
-    hr_users = frappe.get_all("Has Role",
-        filters={"role": "HR", "parenttype": "User"},
-        pluck="parent"
-    )
-
-    for user in hr_users:
-        frappe.get_doc({
-            "doctype": "HR Read Tracker",
-            "reference_doctype": doc.doctype,
-            "reference_name": doc.name,
-            "read_by": user,
-            "is_read": 0
-        }).insert(ignore_permissions=True)
 
+@frappe.whitelist()
+def mark_hr_item_as_read(doctype, name):
+    """Mark document as read for logged-in HR."""
+    from company.company.hr_unread import mark_as_read
 
+    mark_as_read(frappe.session.user, doctype, name)
+    frappe.db.commit()
 
 
 @frappe.whitelist()
-def mark_hr_item_as_read(doctype, name):
-    """Mark document as read for logged-in HR."""
-    user = frappe.session.user
-    tracker = frappe.db.exists("HR Read Tracker", {
-        "reference_doctype": doctype,
-        "reference_name": name,
-        "read_by": user
-    })
-    if tracker:
-        frappe.db.set_value("HR Read Tracker", tracker, {
-            "is_read": 1,
-            "read_time": frappe.utils.now()
-        })
+def mark_all_hr_items_as_read(doctype=None):
+    """Mark every unread item (optionally of one doctype) as read for logged-in HR."""
+    from company.company.hr_unread import mark_all_as_read
+
+    count = mark_all_as_read(frappe.session.user, doctype)
     frappe.db.commit()
+    return count
 
 
 @frappe.whitelist()
 def get_unread_count():
     """Return unread count per doctype for the logged-in HR."""
-    user = frappe.session.user
-    counts = frappe.db.sql("""
-        SELECT reference_doctype, COUNT(*) as count
-        FROM `tabHR Read Tracker`
-        WHERE is_read = 0 AND read_by = %s
-        GROUP BY reference_doctype
-    """, user, as_dict=True)
+    return _get_unread_count(frappe.session.user)
+
+
+def _get_unread_count(user):
+    from company.company.hr_unread import get_unread_counts
+
+    return get_unread_counts(user)
 
-    return {row.reference_doctype: row.count for row in counts}
 
 @frappe.whitelist()
 def get_attendance_stats(range=None, from_date=None, to_date=None):
     import datetime
+    from company.company.employees import get_employee_profile
 
     # -----------------------------
     # LOGGED-IN USER
     # -----------------------------
-    user = frappe.session.user
-    employee = frappe.db.get_value("Employee", {"user": user}, "name")
+    profile = get_employee_profile()
+    employee = profile.get("name")
 
     today = frappe.utils.getdate()
 
@@ -1776,7 +1060,7 @@ def get_attendance_stats(range=None, from_date=None, to_date=None):
     # ============================================================
     # 2️⃣ EMPLOYEE-WISE ATTENDANCE
     # ============================================================
-    return get_employee_attendance_stats(employee, from_date, to_date)
+    return get_employee_attendance_stats(employee, from_date, to_date, profile.get("date_of_joining"))
 
 
 
@@ -1784,52 +1068,21 @@ def get_attendance_stats(range=None, from_date=None, to_date=None):
 # 🔹 GLOBAL ATTENDANCE (ALL EMPLOYEES)
 # ==================================================================
 def get_global_attendance_stats(from_date, to_date):
-    import datetime
-
-    # Get all possible holiday lists
-    holiday_list_names = frappe.db.get_list("Holiday List", pluck="name")
-    holidays = set()
-
-    if holiday_list_names:
-        holiday_rows = frappe.db.get_all(
-            "Holidays",
-            filters={
-                "parent": ["in", holiday_list_names],
-                "holiday_date": ["between", [from_date, to_date]],
-                "is_working_day": 0
-            },
-            fields=["holiday_date"]
-        )
-        holidays = { frappe.utils.getdate(h["holiday_date"]) for h in holiday_rows }
-
-    holiday_count = len(holidays)
-
-    # Count attendance for all employees
-    def count(status):
-        return frappe.db.count("Attendance", {
-            "status": status,
-            "attendance_date": ["between", [from_date, to_date]]
-        })
-
-    present = count("Present")
-    absent = count("Absent")
-    half_day = count("Half Day")
-    on_leave = count("On Leave")
-
-    # Add holidays into Present count
-    present_final = present + holiday_count
+    """
+    Company totals for the range from the day-bucketed analytics
+    (one GROUP BY for uncached days, missing = headcount without attendance).
+    """
+    from company.company.attendance_analytics import get_company_attendance
 
-    # Missing calculation
-    total_days = (to_date - from_date).days + 1
-    missing = total_days - (present + absent + half_day + on_leave + holiday_count)
-    missing = max(missing, 0)
+    totals = get_company_attendance(from_date, to_date)["totals"]
 
     return {
-        "present": present_final,
-        "absent": absent,
-        "half_day": half_day,
-        "on_leave": on_leave,
-        "missing": missing,
+        "present": totals["present"],
+        "absent": totals["absent"],
+        "half_day": totals["half_day"],
+        "on_leave": totals["on_leave"],
+        "missing": totals["missing"],
+        "holidays": totals["holidays"],
         "last_sync": frappe.utils.now()
     }
 
@@ -1838,76 +1091,62 @@ def get_global_attendance_stats(from_date, to_date):
 # ==================================================================
 # 🔹 EMPLOYEE-WISE ATTENDANCE
 # ==================================================================
-def get_employee_attendance_stats(employee, from_date, to_date):
+def get_employee_attendance_stats(employee, from_date, to_date, date_of_joining=None):
+    """
+    Attendance summary for one employee over any range (a day up to a full
+    financial year) in a constant number of queries:
+    one GROUP BY status + one fetch of attendance dates. Holidays come from the
+    cached holiday calendar and missing days are a set difference.
+    """
     import datetime
+    from company.company.holidays import get_holidays_between
 
     # Joining date
     doj = frappe.utils.getdate(
-        frappe.db.get_value("Employee", employee, "date_of_joining")
-    )
-
-    # Holiday list from "Holiday List" (your custom)
-    holiday_list_doc = frappe.db.get_value(
-        "Holiday List",
-        {"year": from_date.year, "month_year": from_date.month},
-        "name"
+        date_of_joining or frappe.db.get_value("Employee", employee, "date_of_joining")
     )
 
-    holidays = set()
-
-    if holiday_list_doc:
-        holiday_rows = frappe.db.get_all(
-            "Holidays",
-            filters={
-                "parent": holiday_list_doc,
-                "holiday_date": ["between", [from_date, to_date]],
-                "is_working_day": 0
-            },
-            fields=["holiday_date"]
-        )
-        holidays = { frappe.utils.getdate(h["holiday_date"]) for h in holiday_rows }
-
+    # Holidays from the cached holiday calendar
+    holidays = get_holidays_between(from_date, to_date)
     holiday_count = len(holidays)
 
-    # Attendance counts for employee
-    def count(status):
-        return frappe.db.count("Attendance", {
-            "employee": employee,
-            "status": status,
-            "attendance_date": ["between", [from_date, to_date]]
-        })
+    # Attendance counts for employee (single GROUP BY)
+    counts = {
+        row.status: row.count
+        for row in frappe.db.sql("""
+            SELECT status, COUNT(*) AS count
+            FROM `tabAttendance`
+            WHERE employee = %s
+            AND attendance_date BETWEEN %s AND %s
+            GROUP BY status
+        """, (employee, from_date, to_date), as_dict=True)
+    }
 
-    present = count("Present")
-    absent = count("Absent")
-    half_day = count("Half Day")
-    on_leave = count("On Leave")
+    present = counts.get("Present", 0)
+    absent = counts.get("Absent", 0)
+    half_day = counts.get("Half Day", 0)
+    on_leave = counts.get("On Leave", 0)
 
     # Add holidays to present
     present_final = present + holiday_count
 
-    # Missing days
-    missing = 0
-    cur = from_date
-
-    while cur <= to_date:
-
-        if cur < doj:
-            cur += datetime.timedelta(days=1)
-            continue
-
-        if cur in holidays:
-            cur += datetime.timedelta(days=1)
-            continue
-
-        exists = frappe.db.exists(
-            "Attendance",
-            {"employee": employee, "attendance_date": cur}
-        )
-
-        if not exists:
-            missing += 1
+    # Missing days = expected working days - holidays - days with attendance
+    attendance_dates = {
+        frappe.utils.getdate(d)
+        for d in frappe.db.sql_list("""
+            SELECT DISTINCT attendance_date
+            FROM `tabAttendance`
+            WHERE employee = %s
+            AND attendance_date BETWEEN %s AND %s
+        """, (employee, from_date, to_date))
+    }
 
-        cur += datetime.timedelta(days=1)
+    start = max(from_date, doj) if doj else from_date
+    expected = {
+        start + datetime.timedelta(days=i)
+        for i in range((to_date - start).days + 1)
+    }
+    missing = len(expected - holidays - attendance_dates)
 
     return {
         "present": present_final,
@@ -1924,29 +1163,19 @@ def get_month_holidays(month=None, year=None):
     """
     Fetch holidays for any given month/year.
     """
+    from company.company.holidays import get_holiday_entries, get_month_bounds
 
     today = datetime.today()
     month = int(month) if month else today.month
     year = int(year) if year else today.year
 
-    holiday_lists = frappe.get_all(
-        "Holiday List",
-        filters={"year": year},
-        fields=["name"]
-    )
-
-    result = []
-
-    for hl in holiday_lists:
-        doc = frappe.get_doc("Holiday List", hl.name)
-        for h in doc.holidays:
-            if h.holiday_date.month == month and h.holiday_date.year == year and h.is_working_day == 0:
-                result.append({
-                    "holiday_date": h.holiday_date.strftime("%Y-%m-%d"),
-                    "description": h.description
-                })
-
-    return result
+    return [
+        {
+            "holiday_date": d.strftime("%Y-%m-%d"),
+            "description": description
+        }
+        for d, description in get_holiday_entries(*get_month_bounds(year, month))
+    ]
 
 
 # Keep the file loaded in memory for performance
@@ -2082,18 +1311,11 @@ def convert_estimation_to_invoice(estimation):
     return inv.name
 
 
-@frappe.whitelist()
-def get_current_month_missing_timesheets():
-    import calendar
+def _get_missing_timesheets(employee, today):
+    """Working days of the current month (before today) without a Timesheet"""
     from datetime import date, timedelta
+    from company.company.holidays import get_month_holiday_dates
 
-    user = frappe.session.user
-    employee = frappe.db.get_value("Employee", {"user": user}, "name")
-
-    if not employee:
-        return {"error": "No employee linked"}
-
-    today = date.today()
     year = today.year
     month = today.month
 
@@ -2102,30 +1324,9 @@ def get_current_month_missing_timesheets():
     last_day = today - timedelta(days=1)
 
     # ---------------------------
-    # 1️⃣ FETCH HOLIDAYS (Your Custom DocType)
+    # 1️⃣ FETCH HOLIDAYS (cached holiday calendar, non-working days only)
     # ---------------------------
-    holiday_list_doc = frappe.get_all(
-        "Holiday List",
-        fields=["name"],
-        filters={"year": year, "month_year": month},
-        limit=1
-    )
-
-    holidays = []
-    if holiday_list_doc:
-        holiday_list_name = holiday_list_doc[0].name
-
-        holiday_rows = frappe.get_all(
-            "Holidays",
-            fields=["holiday_date", "is_working_day"],
-            filters={"parent": holiday_list_name}
-        )
-
-        holidays = [
-            h.holiday_date
-            for h in holiday_rows
-            if not h.is_working_day   # exclude working days
-        ]
+    holidays = set(get_month_holiday_dates(year, month))
 
     # ---------------------------
     # 2️⃣ FETCH EXISTING TIMESHEETS
@@ -2170,106 +1371,184 @@ def get_current_month_missing_timesheets():
 
 
 @frappe.whitelist()
-def get_leave_allocation_by_type(leave_type):
-    user = frappe.session.user
-    employee = frappe.db.get_value("Employee", {"user": user}, "name")
+def get_current_month_missing_timesheets():
+    from datetime import date
+    from company.company.employees import get_session_employee
+
+    employee = get_session_employee()
 
     if not employee:
-        return {
-            "allocated": 0,
-            "taken": 0,
-            "balance": 0
-        }
+        return {"error": "No employee linked"}
 
-    today = getdate()
-    month_start = today.replace(day=1)
-    month_end = today
+    return _get_missing_timesheets(employee, date.today())
+
+
+def _get_month_leave_allocations(employee, leave_types, on_date=None):
+    """
+    Allocated / taken / balance per leave type for allocations overlapping
+    the current month, in one grouped query.
+    """
+    on_date = getdate(on_date)
+    month_start = on_date.replace(day=1)
 
-    # Fetch allocations that match leave type AND overlap this month
-    allocations = frappe.db.get_all(
+    result = {lt: {"allocated": 0, "taken": 0, "balance": 0} for lt in leave_types}
+    for row in frappe.get_all(
         "Leave Allocation",
         filters={
             "employee": employee,
-            "leave_type": leave_type,
+            "leave_type": ["in", list(leave_types)],
             "status": "Approved",
-            "from_date": ["<=", month_end],
+            "from_date": ["<=", on_date],
             "to_date": [">=", month_start]
         },
-        fields=["total_leaves_allocated", "total_leaves_taken"]
-    )
+        fields=[
+            "leave_type",
+            "sum(total_leaves_allocated) as allocated",
+            "sum(total_leaves_taken) as taken"
+        ],
+        group_by="leave_type"
+    ):
+        allocated, taken = flt(row.allocated), flt(row.taken)
+        result[row.leave_type] = {"allocated": allocated, "taken": taken, "balance": allocated - taken}
+
+    return result
+
 
-    if not allocations:
+@frappe.whitelist()
+def get_leave_allocation_by_type(leave_type):
+    from company.company.employees import get_session_employee
+
+    employee = get_session_employee()
+
+    if not employee:
         return {
             "allocated": 0,
             "taken": 0,
             "balance": 0
         }
 
-    allocated = sum(a.total_leaves_allocated for a in allocations)
-    taken = sum(a.total_leaves_taken for a in allocations)
-    balance = allocated - taken
-
-    return {
-        "allocated": allocated,
-        "taken": taken,
-        "balance": balance
-    }
+    return _get_month_leave_allocations(employee, [leave_type])[leave_type]
 
 
 from dateutil.relativedelta import relativedelta
 
-@frappe.whitelist()
-def is_employee_in_probation():
-    user = frappe.session.user
+def _is_in_probation(date_of_joining):
+    if not date_of_joining:
+        return False
 
-    employee = frappe.db.get_value(
-        "Employee",
-        {"user": user},
-        ["date_of_joining"],
-        as_dict=True
-    )
+    # Probation ends exactly 3 months after DOJ
+    probation_end = frappe.utils.getdate(date_of_joining) + relativedelta(months=+3)
+    return frappe.utils.getdate() < probation_end
 
-    if not employee or not employee.date_of_joining:
-        return {"in_probation": False}
 
-    doj = employee.date_of_joining
-    today = frappe.utils.getdate()
+@frappe.whitelist()
+def is_employee_in_probation():
+    from company.company.employees import get_employee_profile
 
-    # Probation ends exactly 3 months after DOJ
-    probation_end = doj + relativedelta(months=+3)
+    employee = get_employee_profile()
 
     return {
-        "in_probation": today < probation_end
+        "in_probation": _is_in_probation(employee.get("date_of_joining"))
     }
 
 
 @frappe.whitelist()
 def get_today_event():
-    user = frappe.session.user
+    return _get_today_event(frappe.session.user)
 
-    event = frappe.db.get_value(
-        "Flash Message",
-        {"enabled": 1, "event_date": frappe.utils.today()},
-        ["name", "event_name", "title", "message", "music"],
-        as_dict=True
-    )
 
-    if not event:
-        return
+def _get_today_event(user):
+    from company.company.settings import get_flash_message
 
-    # Fetch child table entries
-    allowed_users = frappe.get_all(
-        "Event Popup Allowed User",
-        filters={"parent": event.name, "parenttype": "Flash Message"},
-        fields=["user"]
-    )
+    return get_flash_message(user)
+
+
+# ==================================================================
+# 🔹 EMPLOYEE HOME (one call for all desk widgets)
+# ==================================================================
+# Workflow
+# ----------------------------------------------------------------
+# Desk load → get_employee_home(known={section: hash})
+#  → Resolve employee once (cached profile)
+#  → Per-user payload cached for EMPLOYEE_HOME_TTL seconds
+#  → One attendance query covers check-in + 7 day timeline
+#  → One grouped query covers every monthly leave type
+#  → Sections whose hash matches `known` are sent back without data
+
+EMPLOYEE_HOME_VERSION = 1
+EMPLOYEE_HOME_TTL = 60
+EMPLOYEE_HOME_SECTIONS = [
+    "checkin", "timeline", "leave_allocations", "missing_timesheets",
+    "probation", "today_event", "holidays", "unread_count"
+]
+
+
+def _build_employee_home(user):
+    from company.company.employees import get_employee_profile
+    from company.company.leaves import MONTHLY_LEAVE_TYPES
+
+    profile = get_employee_profile(user)
+    employee = profile.get("name")
+    today_date = getdate()
+
+    sections = {
+        "today_event": _get_today_event(user),
+        "holidays": get_month_holidays(today_date.month, today_date.year),
+        "unread_count": _get_unread_count(user),
+    }
+
+    if not employee:
+        sections.update({
+            "checkin": {"status": "Not Linked", "checkin_time": None, "checkout_time": None},
+            "timeline": [],
+            "leave_allocations": {},
+            "missing_timesheets": [],
+            "probation": {"in_probation": False}
+        })
+        return sections
+
+    start_date = today_date - timedelta(days=6)
+    attendance_dict = _get_recent_attendance(employee, start_date, today_date)
 
-    if allowed_users:
-        allowed_list = [u.user for u in allowed_users]
-        if user not in allowed_list:
-            return  # Block popup for this user
+    sections.update({
+        "checkin": _get_checkin_status(attendance_dict.get(str(today_date))),
+        "timeline": _build_seven_day_timeline(attendance_dict, start_date),
+        "leave_allocations": _get_month_leave_allocations(employee, list(MONTHLY_LEAVE_TYPES), today_date),
+        "missing_timesheets": _get_missing_timesheets(employee, today_date),
+        "probation": {"in_probation": _is_in_probation(profile.get("date_of_joining"))}
+    })
+    return sections
+
+
+@frappe.whitelist()
+def get_employee_home(known=None):
+    """
+    Everything the employee desk widgets need in one round trip.
+    `known` is {section: hash} from the previous response; unchanged
+    sections come back as {"hash": ..., "unchanged": True}.
+    """
+    import hashlib
+
+    user = frappe.session.user
+    known = frappe.parse_json(known) if known else {}
+
+    cache_key = f"employee_home|{user}"
+    sections = frappe.cache().get_value(cache_key)
+    if sections is None:
+        sections = _build_employee_home(user)
+        frappe.cache().set_value(cache_key, sections, expires_in_sec=EMPLOYEE_HOME_TTL)
+
+    payload = {}
+    for name in EMPLOYEE_HOME_SECTIONS:
+        data = sections.get(name)
+        digest = hashlib.md5(frappe.as_json(data).encode()).hexdigest()
+
+        if known.get(name) == digest:
+            payload[name] = {"hash": digest, "unchanged": True}
+        else:
+            payload[name] = {"hash": digest, "data": data}
 
-    return event
+    return {"version": EMPLOYEE_HOME_VERSION, "sections": payload}
 
 import frappe
 import qrcode
@@ -2642,33 +1921,29 @@ def delete_customer_location(row_name):
 @frappe.whitelist()
 @frappe.validate_and_sanitize_search_inputs
 def get_unlinked_invoices(doctype, txt, searchfield, start, page_len, filters):
-    """Returns Invoices that are NOT yet linked to any Purchase (Check both directions)"""
+    """Returns Invoices that are NOT yet linked to any Purchase (Invoice Purchase Link)"""
     link_search = "%%{0}%%".format(txt)
     return frappe.db.sql("""
-        SELECT name, customer_name, grand_total 
-        FROM tabInvoice
-        WHERE (name LIKE %s OR customer_name LIKE %s)
-        AND name NOT IN (SELECT invoice_id FROM tabPurchase WHERE invoice_id IS NOT NULL)
-        AND name NOT IN (SELECT reference_invoice FROM tabPurchase WHERE reference_invoice IS NOT NULL)
-        AND purchase_id IS NULL
-        AND reference_purchase IS NULL
-        ORDER BY creation DESC
+        SELECT inv.name, inv.customer_name, inv.grand_total 
+        FROM tabInvoice inv
+        LEFT JOIN `tabInvoice Purchase Link` link ON link.invoice = inv.name
+        WHERE (inv.name LIKE %s OR inv.customer_name LIKE %s)
+        AND link.name IS NULL
+        ORDER BY inv.creation DESC
         LIMIT %s, %s
     """, (link_search, link_search, start, page_len))
 
 @frappe.whitelist()
 @frappe.validate_and_sanitize_search_inputs
 def get_unlinked_purchases(doctype, txt, searchfield, start, page_len, filters):
-    """Returns Purchases that are NOT yet linked to any Invoice (Check both directions)"""
+    """Returns Purchases that are NOT yet linked to any Invoice (Invoice Purchase Link)"""
     link_search = "%%{0}%%".format(txt)
     return frappe.db.sql("""
-        SELECT name, vendor_name, grand_total 
-        FROM tabPurchase
-        WHERE (name LIKE %s OR vendor_name LIKE %s)
-        AND name NOT IN (SELECT purchase_id FROM tabInvoice WHERE purchase_id IS NOT NULL)
-        AND name NOT IN (SELECT reference_purchase FROM tabInvoice WHERE reference_purchase IS NOT NULL)
-        AND invoice_id IS NULL
-        AND reference_invoice IS NULL
-        ORDER BY creation DESC
+        SELECT pur.name, pur.vendor_name, pur.grand_total 
+        FROM tabPurchase pur
+        LEFT JOIN `tabInvoice Purchase Link` link ON link.purchase = pur.name
+        WHERE (pur.name LIKE %s OR pur.vendor_name LIKE %s)
+        AND link.name IS NULL
+        ORDER BY pur.creation DESC
         LIMIT %s, %s
     """, (link_search, link_search, start, page_len))
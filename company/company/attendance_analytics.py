@@ -0,0 +1,173 @@
+import frappe
+from frappe.utils import getdate, add_months, add_days, today
+
+from bisect import bisect_right
+
+
+# Company Attendance Analytics
+# ----------------------------------------------------------------
+# Per-day status counts for all employees:
+#   {status: count} per attendance_date, from one
+#   GROUP BY attendance_date, status over the days not in cache
+# Closed days (before today) are cached in Redis, one hash per month
+# ("attendance_day_buckets|YYYY-MM", field = date); today is always
+# recomputed. Attendance on_update / on_trash drop the day they touch;
+# bulk imports call clear_day_buckets for their date range.
+#
+# Headcount (Active employees joined on or before the day) and holidays
+# are applied when reading, so Employee / Holiday List changes need no
+# invalidation here.
+
+ANALYTICS_CACHE_KEY = "attendance_day_buckets"
+
+STATUS_FIELDS = {
+    "Present": "present",
+    "Absent": "absent",
+    "Half Day": "half_day",
+    "On Leave": "on_leave"
+}
+
+
+def _month_key(day):
+    return f"{ANALYTICS_CACHE_KEY}|{day.strftime('%Y-%m')}"
+
+
+def _get_cached_buckets(from_date, to_date):
+    cache = frappe.cache()
+    cached = {}
+
+    month = from_date.replace(day=1)
+    while month <= to_date:
+        for field, bucket in (cache.hgetall(_month_key(month)) or {}).items():
+            field = field.decode() if isinstance(field, bytes) else field
+            cached[getdate(field)] = bucket
+        month = getdate(add_months(month, 1))
+    return cached
+
+
+def _count_days(from_date, to_date):
+    """{date: {status: count}} for every day in the range (one GROUP BY)"""
+    buckets = {}
+    for row in frappe.db.sql("""
+        SELECT attendance_date, status, COUNT(*) AS count
+        FROM `tabAttendance`
+        WHERE attendance_date BETWEEN %s AND %s
+        GROUP BY attendance_date, status
+    """, (from_date, to_date), as_dict=True):
+        buckets.setdefault(getdate(row.attendance_date), {})[row.status or ""] = row.count
+    return buckets
+
+
+def get_day_buckets(from_date, to_date):
+    """{date: {status: count}} for the range; closed days come from cache"""
+    from_date, to_date = getdate(from_date), getdate(to_date)
+    current = getdate(today())
+
+    buckets = _get_cached_buckets(from_date, to_date)
+
+    needed = []
+    day = from_date
+    while day <= min(to_date, current):
+        if day == current or day not in buckets:
+            needed.append(day)
+        day = add_days(day, 1)
+
+    if needed:
+        counted = _count_days(needed[0], needed[-1])
+        cache = frappe.cache()
+        for day in needed:
+            buckets[day] = counted.get(day, {})
+            if day < current:
+                cache.hset(_month_key(day), str(day), buckets[day])
+
+    return buckets
+
+
+def _get_headcount_counter():
+    """day → number of Active employees joined on or before it"""
+    joinings = frappe.get_all("Employee", filters={"status": "Active"}, pluck="date_of_joining")
+    without_date = sum(1 for d in joinings if not d)
+    dates = sorted(getdate(d) for d in joinings if d)
+    return lambda day: without_date + bisect_right(dates, day)
+
+
+def get_company_attendance(from_date, to_date):
+    """Day-bucketed company attendance series plus totals"""
+    from company.company.holidays import get_holidays_between
+
+    from_date, to_date = getdate(from_date), getdate(to_date)
+    current = getdate(today())
+
+    buckets = get_day_buckets(from_date, to_date)
+    holidays = get_holidays_between(from_date, to_date)
+    headcount = _get_headcount_counter()
+
+    totals = {field: 0 for field in STATUS_FIELDS.values()}
+    totals.update({"missing": 0, "holidays": 0})
+
+    days = []
+    day = from_date
+    while day <= to_date:
+        statuses = buckets.get(day, {})
+        entry = {
+            "date": str(day),
+            "is_holiday": day in holidays,
+            "headcount": headcount(day),
+            **{field: statuses.get(status, 0) for status, field in STATUS_FIELDS.items()}
+        }
+
+        # Employees with no attendance row on a past / current working day
+        marked = sum(statuses.values())
+        entry["missing"] = (
+            max(entry["headcount"] - marked, 0)
+            if day <= current and not entry["is_holiday"] else 0
+        )
+
+        for field in STATUS_FIELDS.values():
+            totals[field] += entry[field]
+        totals["missing"] += entry["missing"]
+        totals["holidays"] += int(entry["is_holiday"])
+
+        days.append(entry)
+        day = add_days(day, 1)
+
+    return {"from_date": str(from_date), "to_date": str(to_date), "totals": totals, "days": days}
+
+
+@frappe.whitelist()
+def get_company_attendance_analytics(from_date, to_date):
+    """HR: company-wide attendance per day for the range (cached closed days)"""
+    frappe.has_permission("Attendance", "read", throw=True)
+
+    result = get_company_attendance(from_date, to_date)
+    result["last_sync"] = frappe.utils.now()
+    return result
+
+
+def clear_day_bucket(doc, method=None):
+    """Hook: Attendance on_update / on_trash — forget the cached day (and the old day if moved)"""
+    days = {getdate(doc.attendance_date)} if doc.attendance_date else set()
+
+    before = doc.get_doc_before_save() if method == "on_update" else None
+    if before and before.attendance_date:
+        days.add(getdate(before.attendance_date))
+
+    # After commit, so a concurrent read can't cache the old counts again
+    frappe.db.after_commit.add(lambda: _forget_days(days))
+
+
+def clear_day_buckets(from_date, to_date):
+    """Forget the cached days of a range (bulk inserts skip the Attendance hooks); call after commit"""
+    from_date, to_date = getdate(from_date), getdate(to_date)
+    days = []
+    day = from_date
+    while day <= to_date:
+        days.append(day)
+        day = add_days(day, 1)
+    _forget_days(days)
+
+
+def _forget_days(days):
+    cache = frappe.cache()
+    for day in days:
+        cache.hdel(_month_key(day), str(day))
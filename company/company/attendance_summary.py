@@ -0,0 +1,203 @@
+import frappe
+from frappe.utils import getdate, get_first_day, get_last_day, add_months, now, flt
+
+from datetime import timedelta
+
+
+# Attendance Monthly Summary
+# ----------------------------------------------------------------
+# One row per (employee, year, month) holding status counts and
+# worked / overtime minutes.
+#  → Attendance on_update: remove the old row's contribution, add the new one
+#  → Attendance on_trash: remove the row's contribution
+#  → Deltas are applied with INSERT … ON DUPLICATE KEY UPDATE x = x + delta
+#  → rebuild_attendance_summary recomputes history (bench command / patch)
+
+SUMMARY_DOCTYPE = "Attendance Monthly Summary"
+
+COUNTER_FIELDS = [
+    "present_days", "absent_days", "half_days", "leave_days",
+    "worked_days", "worked_minutes", "overtime_minutes"
+]
+
+STATUS_COUNTERS = {
+    "Present": "present_days",
+    "Absent": "absent_days",
+    "Half Day": "half_days",
+    "On Leave": "leave_days",
+    "Leave": "leave_days"
+}
+
+
+def get_summary_name(employee, year, month):
+    """Same as the doctype's naming expression {employee}-{year}-{month}"""
+    return f"{employee}-{int(year)}-{int(month)}"
+
+
+def _to_minutes(value):
+    """Convert timedelta / 'HH:MM:SS' string to minutes"""
+    if not value:
+        return 0
+    if isinstance(value, timedelta):
+        return value.total_seconds() / 60
+    h, m, *_ = map(int, str(value).split(":"))
+    return h * 60 + m
+
+
+def get_worked_minutes(row):
+    """Worked minutes for one attendance row (same rules as the Monthly Attendance Report)"""
+    if row.get("status") in ["Absent", "On Leave"]:
+        return 0
+    if not row.get("in_time") or not row.get("out_time"):
+        return 0
+
+    start_minutes = _to_minutes(row.get("in_time"))
+    end_minutes = _to_minutes(row.get("out_time"))
+    if end_minutes < start_minutes:
+        end_minutes += 24 * 60
+
+    minutes = int(end_minutes - start_minutes)
+    if row.get("status") == "Half Day" and row.get("half_day_status") == "Present":
+        minutes /= 2
+    return int(minutes)
+
+
+def get_contribution(row):
+    """Counter values a single attendance row adds to its month"""
+    values = dict.fromkeys(COUNTER_FIELDS, 0)
+
+    counter = STATUS_COUNTERS.get(row.get("status"))
+    if counter:
+        values[counter] = 1
+
+    minutes = get_worked_minutes(row)
+    values["worked_minutes"] = minutes
+    values["worked_days"] = 1 if minutes > 0 else 0
+    values["overtime_minutes"] = int(round(flt(row.get("overtime_decimal")) * 60))
+    return values
+
+
+def apply_delta(employee, attendance_date, values, sign=1):
+    """Atomically add (sign=1) or remove (sign=-1) counter values for one month"""
+    if not employee or not attendance_date:
+        return
+
+    attendance_date = getdate(attendance_date)
+    year, month = attendance_date.year, attendance_date.month
+    deltas = [sign * values[f] for f in COUNTER_FIELDS]
+
+    timestamp = now()
+    user = frappe.session.user
+    employee_name = frappe.db.get_value("Employee", employee, "employee_name")
+
+    columns = ", ".join(f"`{f}`" for f in COUNTER_FIELDS)
+    placeholders = ", ".join(["%s"] * len(COUNTER_FIELDS))
+    updates = ", ".join(f"`{f}` = `{f}` + VALUES(`{f}`)" for f in COUNTER_FIELDS)
+
+    frappe.db.sql(f"""
+        INSERT INTO `tab{SUMMARY_DOCTYPE}`
+            (`name`, `owner`, `modified_by`, `creation`, `modified`, `docstatus`,
+             `employee`, `employee_name`, `year`, `month`, {columns})
+        VALUES (%s, %s, %s, %s, %s, 0, %s, %s, %s, %s, {placeholders})
+        ON DUPLICATE KEY UPDATE {updates}, `modified` = VALUES(`modified`)
+    """, [
+        get_summary_name(employee, year, month), user, user, timestamp, timestamp,
+        employee, employee_name, year, month, *deltas
+    ])
+
+
+# =================== DOC EVENT HOOKS ===================
+
+def update_attendance_summary(doc, method=None):
+    """Hook: Attendance on_update"""
+    before = doc.get_doc_before_save()
+    if before:
+        apply_delta(before.employee, before.attendance_date, get_contribution(before), sign=-1)
+    apply_delta(doc.employee, doc.attendance_date, get_contribution(doc), sign=1)
+
+
+def remove_from_attendance_summary(doc, method=None):
+    """Hook: Attendance on_trash"""
+    apply_delta(doc.employee, doc.attendance_date, get_contribution(doc), sign=-1)
+
+
+# =================== READ ===================
+
+def get_monthly_summaries(year, month, employee=None):
+    """One summary row per employee for the month"""
+    filters = {"year": int(year), "month": int(month)}
+    if employee:
+        filters["employee"] = employee
+
+    return frappe.get_all(
+        SUMMARY_DOCTYPE,
+        filters=filters,
+        fields=["employee", "employee_name"] + COUNTER_FIELDS
+    )
+
+
+# =================== REBUILD ===================
+
+def rebuild_attendance_summary(from_date=None, to_date=None, employees=None):
+    """
+    Recompute summaries from tabAttendance for every month touching the range
+    (all history when no range is given), optionally only for some employees.
+    Returns the number of summary rows written.
+    """
+    if not from_date:
+        from_date = frappe.db.sql("SELECT MIN(attendance_date) FROM `tabAttendance`")[0][0]
+    if not to_date:
+        to_date = frappe.db.sql("SELECT MAX(attendance_date) FROM `tabAttendance`")[0][0]
+    if not from_date or not to_date:
+        return 0
+
+    month_start = getdate(get_first_day(from_date))
+    last_month = getdate(get_first_day(to_date))
+
+    written = 0
+    while month_start <= last_month:
+        written += _rebuild_month(month_start, getdate(get_last_day(month_start)), employees)
+        frappe.db.commit()
+        month_start = getdate(add_months(month_start, 1))
+
+    return written
+
+
+def _rebuild_month(month_start, month_end, employees=None):
+    filters = {"attendance_date": ["between", [month_start, month_end]]}
+    if employees:
+        filters["employee"] = ["in", list(employees)]
+
+    rows = frappe.get_all(
+        "Attendance",
+        filters=filters,
+        fields=["employee", "employee_name", "status", "half_day_status",
+                "in_time", "out_time", "overtime_decimal"]
+    )
+
+    totals = {}
+    for row in rows:
+        entry = totals.setdefault(row.employee, {"employee_name": row.employee_name, **dict.fromkeys(COUNTER_FIELDS, 0)})
+        for field, value in get_contribution(row).items():
+            entry[field] += value
+
+    delete_filters = {"year": month_start.year, "month": month_start.month}
+    if employees:
+        delete_filters["employee"] = ["in", list(employees)]
+    frappe.db.delete(SUMMARY_DOCTYPE, delete_filters)
+
+    if not totals:
+        return 0
+
+    timestamp = now()
+    user = frappe.session.user
+    fields = ["name", "owner", "modified_by", "creation", "modified", "docstatus",
+              "employee", "employee_name", "year", "month"] + COUNTER_FIELDS
+    values = [
+        [get_summary_name(emp, month_start.year, month_start.month), user, user, timestamp, timestamp, 0,
+         emp, entry["employee_name"], month_start.year, month_start.month]
+        + [entry[f] for f in COUNTER_FIELDS]
+        for emp, entry in totals.items()
+    ]
+    frappe.db.bulk_insert(SUMMARY_DOCTYPE, fields, values)
+    return len(values)
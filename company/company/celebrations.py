@@ -0,0 +1,117 @@
+import frappe
+from frappe.utils import getdate, get_first_day, get_last_day, add_days
+
+from calendar import isleap
+
+
+# Birthdays & Work Anniversaries
+# ----------------------------------------------------------------
+# Day-of-year index of active employees, cached in Redis:
+#   birthdays:     {"MM-DD": [employee, ...]}
+#   anniversaries: {"MM-DD": [employee, ...]}
+# Rebuilt lazily after Employee on_update / on_trash clears it.
+# "today" is one dict lookup, "this week" / "this month" at most 31.
+# 29 Feb is celebrated on 28 Feb in non-leap years.
+# get_celebrations returns the full entries (dob, user, employee_id) to HR
+# only; everyone else gets the name and the day.
+
+CELEBRATIONS_CACHE_KEY = "employee_celebrations"
+
+EMPLOYEE_FIELDS = ["name", "employee_name", "employee_id", "user", "dob", "date_of_joining"]
+
+# Roles that see the full celebration entries
+CELEBRATION_HR_ROLES = {"HR", "System Manager"}
+
+# Fields every employee may see (plus is_self)
+PUBLIC_FIELDS = ["employee", "employee_name", "date", "years"]
+
+
+def _build_index():
+    index = {"birthdays": {}, "anniversaries": {}}
+
+    for emp in frappe.get_all("Employee", filters={"status": "Active"}, fields=EMPLOYEE_FIELDS):
+        entry = {
+            "employee": emp.name,
+            "employee_name": emp.employee_name,
+            "employee_id": emp.employee_id,
+            "user": emp.user
+        }
+        if emp.dob:
+            dob = getdate(emp.dob)
+            index["birthdays"].setdefault(dob.strftime("%m-%d"), []).append(
+                {**entry, "dob": str(dob)}
+            )
+        if emp.date_of_joining:
+            doj = getdate(emp.date_of_joining)
+            index["anniversaries"].setdefault(doj.strftime("%m-%d"), []).append(
+                {**entry, "date_of_joining": str(doj), "joining_year": doj.year}
+            )
+
+    return index
+
+
+def get_celebration_index():
+    return frappe.cache().get_value(CELEBRATIONS_CACHE_KEY, generator=_build_index)
+
+
+def clear_celebration_index(doc=None, method=None):
+    """Hook: Employee on_update / on_trash"""
+    frappe.cache().delete_value(CELEBRATIONS_CACHE_KEY)
+
+
+def _day_keys(day):
+    keys = [day.strftime("%m-%d")]
+    if day.month == 2 and day.day == 28 and not isleap(day.year):
+        keys.append("02-29")
+    return keys
+
+
+def get_celebrations_between(from_date, to_date):
+    """Birthdays and work anniversaries (1 year or more) falling in the range, ordered by date"""
+    index = get_celebration_index()
+    from_date, to_date = getdate(from_date), getdate(to_date)
+
+    result = {"birthdays": [], "anniversaries": []}
+    day = from_date
+    while day <= to_date:
+        for key in _day_keys(day):
+            for emp in index["birthdays"].get(key, []):
+                result["birthdays"].append({**emp, "date": str(day)})
+
+            for emp in index["anniversaries"].get(key, []):
+                years = day.year - emp["joining_year"]
+                if years > 0:
+                    result["anniversaries"].append({**emp, "date": str(day), "years": years})
+        day = add_days(day, 1)
+
+    return result
+
+
+def get_period_bounds(period="today", on_date=None):
+    """(from_date, to_date) for today / week (Mon–Sun) / month"""
+    day = getdate(on_date)
+    if period == "week":
+        start = add_days(day, -day.weekday())
+        return start, add_days(start, 6)
+    if period == "month":
+        return getdate(get_first_day(day)), getdate(get_last_day(day))
+    return day, day
+
+
+def _public_entry(entry):
+    public = {field: entry[field] for field in PUBLIC_FIELDS if field in entry}
+    public["is_self"] = entry.get("user") == frappe.session.user
+    return public
+
+
+@frappe.whitelist()
+def get_celebrations(period="today"):
+    """Birthdays and work anniversaries for today / week / month (birthday animation, HR dashboard)"""
+    from_date, to_date = get_period_bounds(period)
+    result = get_celebrations_between(from_date, to_date)
+
+    if not CELEBRATION_HR_ROLES.intersection(frappe.get_roles()):
+        result = {kind: [_public_entry(e) for e in entries] for kind, entries in result.items()}
+
+    result.update({"period": period, "from_date": str(from_date), "to_date": str(to_date)})
+    return result
@@ -0,0 +1,253 @@
+import frappe
+from frappe.utils import getdate
+
+from bisect import bisect_right
+from datetime import date
+
+
+# Conflict Checker
+# ----------------------------------------------------------------
+# "Does [from, to] overlap an existing item?" for
+#   leave        Leave Application (not Permission)   per employee
+#   permission   Leave Application (Permission)       per employee
+#   wfh          WFH Attendance                       per employee
+#   attendance   Attendance                           per employee
+#   asset        Asset Assignment (open = no return)  per asset
+#
+# returned_on is the handover day: the asset is free again from that day,
+# so a new assignment may start on it ("end_exclusive").
+#
+# Rows are loaded with one query per kind (composite (key, start) index),
+# kept sorted by start per employee / asset, and reused for the rest of
+# the request. Saves of these doctypes drop the cached index of that key
+# (and of the previous key when the employee / asset changed).
+# check_conflicts only returns the rows the user may read.
+
+OPEN_END = date.max
+
+# Workflow states that still block another application
+LEAVE_PENDING_STATES = ["Pending", "Pending Approval", "Clarification Requested"]
+
+SOURCES = {
+    "leave": {
+        "doctype": "Leave Application",
+        "key": "employee",
+        "start": "from_date",
+        "end": "to_date",
+        "condition": "docstatus < 2 AND leave_type != 'Permission'",
+        "states": ["Approved"]
+    },
+    "permission": {
+        "doctype": "Leave Application",
+        "key": "employee",
+        "start": "from_date",
+        "end": "to_date",
+        "condition": "docstatus < 2 AND leave_type = 'Permission'",
+        "states": ["Approved"] + LEAVE_PENDING_STATES
+    },
+    "wfh": {
+        "doctype": "WFH Attendance",
+        "key": "employee",
+        "start": "date",
+        "end": "date",
+        "condition": "docstatus < 2"
+    },
+    "attendance": {
+        "doctype": "Attendance",
+        "key": "employee",
+        "start": "attendance_date",
+        "end": "attendance_date",
+        "condition": "1 = 1"
+    },
+    "asset": {
+        "doctype": "Asset Assignment",
+        "key": "asset",
+        "start": "assigned_on",
+        "end": "returned_on",
+        "end_exclusive": True,
+        "condition": "1 = 1"
+    }
+}
+
+
+def _cache():
+    if getattr(frappe.local, "conflict_index", None) is None:
+        frappe.local.conflict_index = {}
+    return frappe.local.conflict_index
+
+
+def _get_source(kind):
+    source = SOURCES.get(kind)
+    if not source:
+        frappe.throw(f"Unknown conflict kind: {kind}")
+    return source
+
+
+def _load(kind, keys, from_date, to_date):
+    """Load rows of `kind` for the keys overlapping [from_date, to_date] into the request cache"""
+    source = _get_source(kind)
+    has_workflow = "states" in source
+
+    rows = frappe.db.sql(f"""
+        SELECT name, `{source['key']}` AS `key`,
+            `{source['start']}` AS from_date, `{source['end']}` AS to_date,
+            docstatus{", workflow_state" if has_workflow else ""}
+        FROM `tab{source['doctype']}`
+        WHERE `{source['key']}` IN %(keys)s
+        AND IFNULL(`{source['start']}`, '0001-01-01') <= %(to_date)s
+        AND (`{source['end']}` IS NULL OR `{source['end']}` >= %(from_date)s)
+        AND {source['condition']}
+    """, {"keys": tuple(keys), "from_date": from_date, "to_date": to_date}, as_dict=True)
+
+    grouped = {key: [] for key in keys}
+    for row in rows:
+        grouped.setdefault(row.key, []).append(frappe._dict({
+            "name": row.name,
+            "from_date": getdate(row.from_date) if row.from_date else date.min,
+            "to_date": getdate(row.to_date) if row.to_date else OPEN_END,
+            "state": row.get("workflow_state"),
+            "docstatus": row.docstatus
+        }))
+
+    cache = _cache()
+    for key, items in grouped.items():
+        items.sort(key=lambda i: i.from_date)
+        cache[(kind, key)] = {
+            "from_date": from_date,
+            "to_date": to_date,
+            "starts": [i.from_date for i in items],
+            "items": items
+        }
+
+
+def _get_index(kind, key, from_date, to_date):
+    index = _cache().get((kind, key))
+    if not index or index["from_date"] > from_date or index["to_date"] < to_date:
+        if index:
+            from_date = min(from_date, index["from_date"])
+            to_date = max(to_date, index["to_date"])
+        _load(kind, [key], from_date, to_date)
+        index = _cache()[(kind, key)]
+    return index
+
+
+def _normalise(from_date, to_date):
+    from_date = getdate(from_date) if from_date else date.min
+    to_date = getdate(to_date) if to_date else OPEN_END
+    return from_date, to_date
+
+
+def get_conflicts(kind, key, from_date, to_date=None, exclude=None, states=None):
+    """
+    Items of `kind` for the employee / asset `key` overlapping [from_date, to_date]
+    (to_date None = same day, except for assets where it means still assigned).
+    `states` overrides the blocking workflow states of leave / permission.
+    """
+    if kind != "asset" and not to_date:
+        to_date = from_date
+    from_date, to_date = _normalise(from_date, to_date)
+
+    source = _get_source(kind)
+    states = states or source.get("states")
+    index = _get_index(kind, key, from_date, to_date)
+
+    conflicts = []
+    for item in index["items"][:bisect_right(index["starts"], to_date)]:
+        if item.name == exclude:
+            continue
+        if source.get("end_exclusive"):
+            # Returned the day the other starts (either way round) is a handover
+            if item.to_date <= from_date or item.from_date >= to_date > from_date:
+                continue
+        elif item.to_date < from_date:
+            continue
+        if states and item.state not in states:
+            continue
+        conflicts.append(item)
+    return conflicts
+
+
+def has_conflict(kind, key, from_date, to_date=None, exclude=None, states=None):
+    """Name of the first overlapping item, or None"""
+    conflicts = get_conflicts(kind, key, from_date, to_date, exclude=exclude, states=states)
+    return conflicts[0].name if conflicts else None
+
+
+def check_ranges(ranges):
+    """
+    Bulk check: ranges = [{kind, key, from_date, to_date, exclude}].
+    Loads each kind once for all keys and the combined window.
+    """
+    windows = {}
+    for r in ranges:
+        from_date, to_date = _normalise(r.get("from_date"), r.get("to_date") or r.get("from_date"))
+        current = windows.setdefault(r["kind"], {"keys": set(), "from_date": from_date, "to_date": to_date})
+        current["keys"].add(r["key"])
+        current["from_date"] = min(current["from_date"], from_date)
+        current["to_date"] = max(current["to_date"], to_date)
+
+    for kind, window in windows.items():
+        _load(kind, window["keys"], window["from_date"], window["to_date"])
+
+    return [
+        get_conflicts(
+            r["kind"], r["key"], r.get("from_date"), r.get("to_date"),
+            exclude=r.get("exclude"), states=r.get("states")
+        )
+        for r in ranges
+    ]
+
+
+@frappe.whitelist()
+def check_conflicts(ranges):
+    """
+    Team calendar: validate many ranges in one call.
+    ranges: [{"kind": "leave", "employee": "EMP-0001", "from_date": ..., "to_date": ..., "exclude": ...}]
+    ("asset" ranges pass "asset" instead of "employee")
+    """
+    ranges = frappe.parse_json(ranges) if isinstance(ranges, str) else ranges
+
+    for kind in {r.get("kind") for r in ranges}:
+        frappe.has_permission(_get_source(kind)["doctype"], "read", throw=True)
+
+    for r in ranges:
+        r["key"] = r.get("asset") if r.get("kind") == "asset" else r.get("employee")
+
+    readable = {}
+
+    def can_read(kind, name):
+        doctype = _get_source(kind)["doctype"]
+        if (doctype, name) not in readable:
+            readable[(doctype, name)] = frappe.has_permission(doctype, "read", doc=name)
+        return readable[(doctype, name)]
+
+    return [
+        {
+            **r,
+            "conflicts": [
+                {
+                    "name": c.name,
+                    "from_date": str(c.from_date) if c.from_date != date.min else None,
+                    "to_date": str(c.to_date) if c.to_date != OPEN_END else None,
+                    "state": c.state
+                }
+                for c in conflicts
+                if can_read(r["kind"], c.name)
+            ]
+        }
+        for r, conflicts in zip(ranges, check_ranges(ranges))
+    ]
+
+
+def clear_conflict_index(doc, method=None):
+    """Hook: on_change / on_trash of the checked doctypes — drop the cached index of that key"""
+    cache = getattr(frappe.local, "conflict_index", None)
+    if not cache:
+        return
+
+    before = doc.get_doc_before_save()
+    for kind, source in SOURCES.items():
+        if source["doctype"] == doc.doctype:
+            cache.pop((kind, doc.get(source["key"])), None)
+            if before:
+                cache.pop((kind, before.get(source["key"])), None)
@@ -0,0 +1,125 @@
+import frappe
+from frappe.utils import getdate, now
+
+
+# Customer Invoice Stats
+# ----------------------------------------------------------------
+# Kept on Customer so reports read a column instead of grouping tabInvoice:
+#   first_invoice       earliest Invoice by creation (the "NEW" one)
+#   invoice_count       number of invoices
+#   last_invoice_date   latest invoice_date
+#   is_old_customer     invoice_count > 1
+#  → Invoice after_insert: count + 1, first_invoice if not set yet (one UPDATE)
+#  → Invoice on_trash: count - 1, first / last re-read only if this invoice was one
+#  → Invoice customer / date change: both customers recomputed
+# Every UPDATE bumps modified, so a Customer form opened before the change
+# can't save the old stats back.
+# rebuild_customer_invoice_stats backfills history (patch / bench execute).
+
+
+def _recompute(customers=None, exclude=None):
+    """One UPDATE … JOIN over tabInvoice for the customers (all when None)"""
+    invoice_filter = "AND customer_id IN %(customers)s" if customers else ""
+    customer_filter = "WHERE c.name IN %(customers)s" if customers else ""
+    if exclude:
+        invoice_filter += " AND name != %(exclude)s"
+
+    frappe.db.sql(f"""
+        UPDATE `tabCustomer` c
+        LEFT JOIN (
+            SELECT customer_id, COUNT(*) AS invoice_count, MAX(invoice_date) AS last_invoice_date
+            FROM `tabInvoice`
+            WHERE customer_id IS NOT NULL {invoice_filter}
+            GROUP BY customer_id
+        ) s ON s.customer_id = c.name
+        SET c.invoice_count = IFNULL(s.invoice_count, 0),
+            c.last_invoice_date = s.last_invoice_date,
+            c.is_old_customer = IFNULL(s.invoice_count, 0) > 1,
+            c.modified = %(modified)s,
+            c.first_invoice = (
+                SELECT i.name FROM `tabInvoice` i
+                WHERE i.customer_id = c.name {"AND i.name != %(exclude)s" if exclude else ""}
+                ORDER BY i.creation, i.name
+                LIMIT 1
+            )
+        {customer_filter}
+    """, {"customers": tuple(customers or ()), "exclude": exclude, "modified": now()})
+
+
+def refresh_customer_invoice_stats(customers, exclude=None):
+    """Recompute the stats of the given customers (optionally ignoring an invoice being deleted)"""
+    customers = [c for c in set(customers) if c]
+    if customers:
+        _recompute(customers, exclude=exclude)
+
+
+def rebuild_customer_invoice_stats():
+    """Backfill first_invoice / invoice_count / last_invoice_date for every customer"""
+    _recompute()
+    frappe.db.commit()
+
+
+# =================== INVOICE HOOKS ===================
+
+def add_invoice(doc):
+    """Invoice after_insert — the newest invoice never replaces first_invoice"""
+    if not doc.customer_id:
+        return
+
+    # MySQL applies SET left to right: is_old_customer sees the new invoice_count
+    frappe.db.sql("""
+        UPDATE `tabCustomer`
+        SET invoice_count = IFNULL(invoice_count, 0) + 1,
+            first_invoice = IFNULL(NULLIF(first_invoice, ''), %(invoice)s),
+            last_invoice_date = CASE
+                WHEN last_invoice_date IS NULL OR last_invoice_date < %(invoice_date)s
+                THEN %(invoice_date)s ELSE last_invoice_date
+            END,
+            is_old_customer = invoice_count > 1,
+            modified = %(modified)s
+        WHERE name = %(customer)s
+    """, {
+        "modified": now(),
+        "customer": doc.customer_id,
+        "invoice": doc.name,
+        "invoice_date": doc.invoice_date
+    })
+
+
+def remove_invoice(doc):
+    """Invoice on_trash"""
+    if not doc.customer_id:
+        return
+
+    stats = frappe.db.get_value(
+        "Customer", doc.customer_id, ["first_invoice", "last_invoice_date"], as_dict=True
+    )
+    if not stats:
+        return
+
+    if stats.first_invoice == doc.name or (
+        doc.invoice_date and stats.last_invoice_date
+        and getdate(stats.last_invoice_date) == getdate(doc.invoice_date)
+    ):
+        refresh_customer_invoice_stats([doc.customer_id], exclude=doc.name)
+        return
+
+    frappe.db.sql("""
+        UPDATE `tabCustomer`
+        SET invoice_count = GREATEST(IFNULL(invoice_count, 0) - 1, 0),
+            is_old_customer = invoice_count > 1,
+            modified = %s
+        WHERE name = %s
+    """, (now(), doc.customer_id))
+
+
+def update_invoice(doc):
+    """Invoice on_update — only a changed customer / invoice date touches the stats"""
+    before = doc.get_doc_before_save()
+    if not before:
+        return
+
+    old_date = getdate(before.invoice_date) if before.invoice_date else None
+    new_date = getdate(doc.invoice_date) if doc.invoice_date else None
+    if before.customer_id != doc.customer_id or old_date != new_date:
+        refresh_customer_invoice_stats([before.customer_id, doc.customer_id])
@@ -5,22 +5,20 @@
 import frappe
 from frappe.model.document import Document
 
+from company.company.conflicts import has_conflict
+
 class AssetAssignment(Document):
     def validate(self):
         self.check_asset_availability()
 
     def check_asset_availability(self):
         """
-        Check if the Asset is already assigned and not yet returned
+        Check if the Asset is assigned to someone else for any part of
+        [assigned_on, returned_on] (an open assignment runs until returned)
         """
         if self.asset:
-            existing = frappe.db.exists(
-                "Asset Assignment",
-                {
-                    "asset": self.asset,
-                    "returned_on": None,
-                    "name": ["!=", self.name]  # exclude current doc
-                }
-            )
-            if existing:
-                frappe.throw(f"Asset '{self.asset}' is already assigned and not returned yet!")
\ No newline at end of file
+            if has_conflict("asset", self.asset, self.assigned_on, self.returned_on, exclude=self.name):
+                frappe.throw(f"Asset '{self.asset}' is already assigned for the selected period and not returned yet!")
+
+def on_doctype_update():
+    frappe.db.add_index("Asset Assignment", ["asset", "assigned_on"])
@@ -2,6 +2,11 @@ from datetime import datetime, timedelta
 import frappe
 from frappe.model.document import Document
 
+# Worked minutes below this mark the day as Half Day
+HALF_DAY_MINUTES = 5 * 60
+# Standard working day — minutes beyond this are overtime
+FULL_DAY_MINUTES = 9 * 60
+
 class Attendance(Document):
     def validate(self):
         self.calculate_working_hours()
@@ -86,7 +91,7 @@ class Attendance(Document):
         #------------------------------
         # Only auto-set if user did NOT pick a leave type
         if not self.leave_type:
-            if total_minutes < 5 * 60:
+            if total_minutes < HALF_DAY_MINUTES:
                 self.status = "Half Day"
             else:
                 self.status = "Present"
@@ -95,9 +100,14 @@ class Attendance(Document):
         # ------------------------------
         # 5️⃣ OVERTIME CALCULATION
         #------------------------------
-        overtime_minutes = max(0, total_minutes - 9 * 60)
+        overtime_minutes = max(0, total_minutes - FULL_DAY_MINUTES)
         ot_hours = overtime_minutes // 60
         ot_minutes = overtime_minutes % 60
 
         self.overtime_display = f"{ot_hours}:{ot_minutes:02d}"
         self.overtime_decimal = round(overtime_minutes / 60, 2)
+
+
+def on_doctype_update():
+    frappe.db.add_index("Attendance", ["employee", "attendance_date"])
+    frappe.db.add_index("Attendance", ["attendance_date", "status"])
@@ -1,8 +1,9 @@
 # Copyright (c) 2025, deepak and Contributors
 # See license.txt
 
-# import frappe
+import frappe
 from frappe.tests import IntegrationTestCase
+from frappe.utils import get_first_day, get_last_day, today
 
 
 # On IntegrationTestCase, the doctype test records and all
@@ -19,4 +20,44 @@ class IntegrationTestAttendance(IntegrationTestCase):
 	Use this class for testing interactions between multiple components.
 	"""
 
-	pass
+	def test_delete_leave_attendance(self):
+		leave_type = "_Test Attendance Leave"
+		if not frappe.db.exists("Leave Type", leave_type):
+			frappe.get_doc({"doctype": "Leave Type", "leave_type_name": leave_type, "status": "Active"}).insert()
+
+		employee = frappe.get_doc({
+			"doctype": "Employee",
+			"employee_id": "_TEST-ATT-LEAVE",
+			"employee_name": "_Test Attendance Leave",
+			"email": "test_attendance_leave@example.com",
+			"status": "Active"
+		}).insert()
+
+		allocation = frappe.get_doc({
+			"doctype": "Leave Allocation",
+			"employee": employee.name,
+			"leave_type": leave_type,
+			"status": "Approved",
+			"from_date": get_first_day(today()),
+			"to_date": get_last_day(today()),
+			"total_leaves_allocated": 2
+		}).insert()
+
+		attendance = frappe.get_doc({
+			"doctype": "Attendance",
+			"employee": employee.name,
+			"attendance_date": today(),
+			"leave_type": leave_type,
+			"status": "On Leave"
+		}).insert()
+
+		allocation.reload()
+		self.assertEqual(allocation.total_leaves_taken, 1)
+
+		# on_trash posts a Credit linked to the Attendance; the delete must still go through
+		frappe.delete_doc("Attendance", attendance.name)
+
+		self.assertFalse(frappe.db.exists("Attendance", attendance.name))
+		allocation.reload()
+		self.assertEqual(allocation.total_leaves_taken, 0)
+		self.assertEqual(allocation.leave_balance, 2)
@@ -0,0 +1,13 @@
+# Copyright (c) 2026, deepak and contributors
+# For license information, please see license.txt
+
+import frappe
+from frappe.model.document import Document
+
+
+class AttendanceMonthlySummary(Document):
+	pass
+
+
+def on_doctype_update():
+	frappe.db.add_index("Attendance Monthly Summary", ["year", "month"])
@@ -1,8 +1,9 @@
 import frappe
 from frappe.model.document import Document
-from frappe.model.naming import make_autoname
 from frappe.utils import getdate
 
+from company.company.series import set_series_number
+
 class Estimation(Document):
     
     def validate(self):
@@ -21,24 +22,8 @@ class Estimation(Document):
             self.name = self.ref_no
 
     def before_insert(self):
-        today = getdate()
-        year = today.year
-
-        # Financial Year (April → March)
-        if today.month < 4:
-            start_year = year - 1
-            end_year = year
-        else:
-            start_year = year
-            end_year = year + 1
-
-        fy = f"{str(start_year)[-2:]}-{str(end_year)[-2:]}"
-
-        # ✅ Use correct make_autoname format with dot
-        seq = make_autoname(".###", doc=self)  # IB-E/.001, .002, etc.
-
-        # Assign to ref_no (which will also become name)
-        self.ref_no = f"IB-E/{fy}/{seq.split('.')[-1]}"
+        # <prefix>/<FY>/### from the atomic series counter
+        set_series_number(self)
         
         
     def calculate_child_rows(self):
@@ -1,9 +1,14 @@
 import frappe
 from frappe import _
 from frappe.model.document import Document
-from frappe.model.naming import make_autoname
 from frappe.utils import getdate, flt
 
+from company.company.series import set_series_number
+from company.company.purchase_links import sync_invoice, remove_links
+from company.company.customers import (
+    add_invoice, remove_invoice, update_invoice, refresh_customer_invoice_stats
+)
+
 class Invoice(Document):
     
     def validate(self):
@@ -73,15 +78,9 @@ class Invoice(Document):
         if self.purchase_id:
             frappe.db.set_value("Purchase", self.purchase_id, "reference_invoice", None)
             
-        # Update Customer 'OLD' status when deleting invoice
-        if self.customer_id:
-            # Count remaining invoices (excluding this one)
-            remaining_count = frappe.db.count("Invoice", filters={
-                "customer_id": self.customer_id,
-                "name": ["!=", self.name]
-            })
-            if remaining_count <= 1:
-                frappe.db.set_value("Customer", self.customer_id, "is_old_customer", 0)
+        # Customer first_invoice / invoice_count / last_invoice_date
+        remove_invoice(self)
+        remove_links(invoice=self.name)
     
     def autoname(self):
         # Set name = ref_no
@@ -89,24 +88,8 @@ class Invoice(Document):
             self.name = self.ref_no
 
     def before_insert(self):
-        today = getdate()
-        year = today.year
-
-        # Financial Year (April → March)
-        if today.month < 4:
-            start_year = year - 1
-            end_year = year
-        else:
-            start_year = year
-            end_year = year + 1
-
-        fy = f"{str(start_year)[-2:]}-{str(end_year)[-2:]}"
-
-        # ✅ Use correct make_autoname format with dot
-        seq = make_autoname(".###", doc=self)  # IB-I/.001, .002, etc.
-
-        # Assign to ref_no (which will also become name)
-        self.ref_no = f"IB-I/{fy}/{seq.split('.')[-1]}"
+        # <prefix>/<FY>/### from the atomic series counter
+        set_series_number(self)
         
     def calculate_child_rows(self):
         for item in self.table_qecz:
@@ -163,22 +146,17 @@ class Invoice(Document):
             old_doc = self.get_doc_before_save()
             if old_doc and old_doc.purchase_id:
                 frappe.db.set_value("Purchase", old_doc.purchase_id, "reference_invoice", None)
+
+        update_invoice(self)
+        sync_invoice(self)
     
     def after_insert(self):
         # Update Purchase with Invoice reference
         if self.purchase_id:
             frappe.db.set_value("Purchase", self.purchase_id, "reference_invoice", self.name)
         
-        if not self.customer_id:
-            return
-
-        # Count confirmed invoices for this customer
-        invoice_count = frappe.db.count("Invoice", filters={"customer_id": self.customer_id})
-
-        # Update status (1 if more than one invoice, 0 otherwise)
-        is_old = 1 if invoice_count > 1 else 0
-        frappe.db.set_value("Customer", self.customer_id, "is_old_customer", is_old)
-
+        # Customer first_invoice / invoice_count / last_invoice_date
+        add_invoice(self)
 
 
 @frappe.whitelist()
@@ -221,13 +199,8 @@ def add_customer_location(customer, location_name, address=None):
 def refresh_customer_status(customer):
     if not customer:
         return False
-    
-    # Count confirmed invoices
-    invoice_count = frappe.db.count("Invoice", filters={"customer_id": customer})
-    
-    # Update status (1 if more than one invoice, 0 otherwise)
-    is_old = 1 if invoice_count > 1 else 0
-    frappe.db.set_value("Customer", customer, "is_old_customer", is_old)
+
+    refresh_customer_invoice_stats([customer])
     return True
 
 
@@ -255,3 +228,7 @@ def get_customer_locations(customer):
         fields=["location_name"], 
         distinct=True
     )
+
+
+def on_doctype_update():
+    frappe.db.add_index("Invoice", ["customer_id", "creation"])
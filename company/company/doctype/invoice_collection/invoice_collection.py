@@ -32,41 +32,6 @@ class InvoiceCollection(Document):
 		if latest_collection and latest_collection != self.name:
 			frappe.throw(_("Only the last collection ({0}) for Invoice {1} can be modified or deleted.").format(latest_collection, self.invoice))
 
-	def after_insert(self):
-		"""Update Invoice amounts after creating a new collection"""
-		self.update_invoice_amounts()
-	
-	def on_update(self):
-		"""Update Invoice amounts after modifying a collection"""
-		self.update_invoice_amounts()
-	
-	def after_delete(self):
-		"""Update Invoice amounts after deleting a collection"""
-		self.update_invoice_amounts()
-	
-	def update_invoice_amounts(self):
-		"""Recalculate and update received_amount and balance_amount in the Invoice"""
-		if not self.invoice:
-			return
-		
-		# Get the Invoice document
-		invoice = frappe.get_doc("Invoice", self.invoice)
-		
-		# Calculate total collected amount from all Invoice Collection records
-		total_collected = frappe.utils.flt(frappe.db.sql("""
-			SELECT SUM(amount_collected) as total
-			FROM `tabInvoice Collection`
-			WHERE invoice = %s
-		""", (self.invoice,))[0][0] or 0)
-		
-		grand_total = frappe.utils.flt(invoice.grand_total)
-		balance = grand_total - total_collected
-		
-		# Update Invoice fields atomically
-		frappe.db.set_value("Invoice", self.invoice, {
-			"received_amount": total_collected,
-			"balance_amount": balance
-		})
-		
-		frappe.db.commit()
 
+def on_doctype_update():
+	frappe.db.add_index("Invoice Collection", ["invoice", "creation"])
@@ -1,41 +1,31 @@
 import frappe
 from frappe.model.document import Document
 
+from company.company.notifications import queue_notification
+from company.company.settings import get_company_email_settings
+
 class JobApplicant(Document):
 
     def after_insert(self):
-        self.notify_hr_on_creation()
+        # Settings are checked here so the warning reaches the user;
+        # the mail itself is built and sent after commit
+        if not get_company_email_settings().get("hr_email"):
+            frappe.msgprint("⚠️ HR Email (To) is not configured in 'Company Email Settings'.")
+            return
+
+        queue_notification(self, "created", "notify_hr_on_creation")
 
     def notify_hr_on_creation(self):
         """Send email to HR when a new Job Applicant is created"""
 
-        # Fetch HR email settings
-        hr_settings = frappe.get_all(
-            "Company Email Settings",
-            fields=["hr_email", "hr_cc_emails"],
-            limit=1
-        )
-
-        if not hr_settings:
-            frappe.msgprint("⚠️ No HR Email Settings found in 'Company Email Settings'.")
-            return
-
-        hr_email = hr_settings[0].get("hr_email")
-        cc_emails = hr_settings[0].get("hr_cc_emails")
+        hr_settings = get_company_email_settings()
+        hr_email = hr_settings.get("hr_email")
 
         if not hr_email:
-            frappe.msgprint("⚠️ HR Email (To) is not configured in 'Company Email Settings'.")
             return
 
         recipients = [hr_email]
-        cc_list = []
-
-        if cc_emails:
-            cc_list = [
-                email.strip() 
-                for email in cc_emails.replace("\n", ",").split(",") 
-                if email.strip()
-            ]
+        cc_list = hr_settings.cc_list
 
         # Email HTML Template
         message = f"""
@@ -1,9 +1,15 @@
 # Copyright (c) 2025, deepak and contributors
 # For license information, please see license.txt
 
-# import frappe
+import frappe
 from frappe.model.document import Document
+from frappe.utils import flt
 
 
 class LeaveAllocation(Document):
-	pass
+	def validate(self):
+		self.leave_balance = flt(self.total_leaves_allocated) - flt(self.total_leaves_taken)
+
+
+def on_doctype_update():
+	frappe.db.add_index("Leave Allocation", ["employee", "leave_type", "status", "from_date"])
@@ -0,0 +1,13 @@
+# Copyright (c) 2026, deepak and contributors
+# For license information, please see license.txt
+
+import frappe
+from frappe.model.document import Document
+
+
+class LeaveLedgerEntry(Document):
+	pass
+
+
+def on_doctype_update():
+	frappe.db.add_index("Leave Ledger Entry", ["reference_doctype", "reference_name"])
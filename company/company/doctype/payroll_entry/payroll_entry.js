@@ -1,8 +1,56 @@
 // Copyright (c) 2025, deepak and contributors
 // For license information, please see license.txt
 
-// frappe.ui.form.on("Payroll Entry", {
-// 	refresh(frm) {
+frappe.ui.form.on("Payroll Entry", {
+	setup(frm) {
+		frappe.realtime.on("payroll_progress", (data) => {
+			if (frm.is_new() || !data) return;
 
-// 	},
-// });
+			frappe.show_progress(
+				__("Generating Salary Slips"),
+				data.done,
+				data.total,
+				__("Created: {0}, Skipped: {1}", [data.created, data.skipped])
+			);
+
+			if (data.completed) {
+				frappe.hide_progress();
+				frappe.show_alert({
+					message: __("Salary Slips Created: {0}, Skipped: {1}", [data.created, data.skipped]),
+					indicator: data.failed ? "orange" : "green",
+				});
+				frm.reload_doc();
+			}
+		});
+	},
+
+	refresh(frm) {
+		if (frm.is_new() || !frm.doc.pay_period_start) return;
+		if (!frappe.user_roles.some((role) => ["HR", "System Manager"].includes(role))) return;
+
+		frm.add_custom_button(__("Generate Salary Slips"), () => {
+			frappe.call({
+				method: "company.company.payroll.start_payroll_run",
+				args: { payroll_entry: frm.doc.name },
+				callback(r) {
+					if (!r.message) return;
+					frappe.show_progress(__("Generating Salary Slips"), 0, r.message.shards);
+				},
+			});
+		});
+
+		frm.add_custom_button(__("Release Salary Slips"), () => {
+			frappe.call({
+				method: "company.company.salary_release.release_payroll",
+				args: { payroll_entry: frm.doc.name },
+				callback(r) {
+					if (!r.message) return;
+					frappe.show_alert({
+						message: __("{0} Salary Slips queued for release", [r.message.queued]),
+						indicator: "green",
+					});
+				},
+			});
+		});
+	},
+});
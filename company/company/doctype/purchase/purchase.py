@@ -4,6 +4,8 @@
 import frappe
 from frappe.model.document import Document
 
+from company.company.purchase_links import sync_purchase, remove_links
+
 
 class Purchase(Document):
     
@@ -69,6 +71,7 @@ class Purchase(Document):
         # Clear Invoice reference when Purchase is deleted
         if self.invoice_id:
             frappe.db.set_value("Invoice", self.invoice_id, "reference_purchase", None)
+        remove_links(purchase=self.name)
 
     def on_update(self):
         """Ensure Invoice reference is synchronized with this Purchase"""
@@ -80,6 +83,8 @@ class Purchase(Document):
             old_doc = self.get_doc_before_save()
             if old_doc and old_doc.invoice_id:
                 frappe.db.set_value("Invoice", old_doc.invoice_id, "reference_purchase", None)
+
+        sync_purchase(self)
     
     def after_insert(self):
         # Update Invoice with Purchase reference
@@ -116,16 +121,11 @@ class Purchase(Document):
 
         self.grand_total = total + (frappe.utils.flt(self.roundoff) if hasattr(self, 'roundoff') else 0)
         
-        # Sync Paid Amount and Balance Amount (Final Authority - Always recalculate on save)
-        if self.name:
-            total_paid = frappe.db.sql("""
-                SELECT SUM(amount_paid) FROM `tabPurchase Collection`
-                WHERE purchase = %s
-            """, (self.name,))[0][0] or 0
-            self.paid_amount = frappe.utils.flt(total_paid)
-        else:
+        # paid_amount is kept by Purchase Collection deltas (company.company.payables)
+        if self.is_new():
             self.paid_amount = 0
-            
+        self.paid_amount = frappe.utils.flt(self.paid_amount)
+
         self.balance_amount = frappe.utils.flt(self.grand_total) - self.paid_amount
         
         # Update status
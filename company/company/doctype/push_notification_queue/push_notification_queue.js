@@ -0,0 +1,8 @@
+// Copyright (c) 2026, deepak and contributors
+// For license information, please see license.txt
+
+// frappe.ui.form.on("Push Notification Queue", {
+// 	refresh(frm) {
+
+// 	},
+// });
@@ -1,13 +1,16 @@
 import frappe
 from frappe.model.document import Document
 
+from company.company.notifications import queue_notification, get_user_contact
+from company.company.settings import get_company_email_settings
+
 class ReimbursementClaim(Document):
 
     # ----------------------------------------
     # 1️⃣ Notify HR when employee submits claim
     # ----------------------------------------
     def on_submit(self):
-        self.notify_hr_on_submission()
+        queue_notification(self, "submitted", "notify_hr_on_submission")
 
     # ----------------------------------------
     # 2️⃣ + 3️⃣ + 4️⃣ Handle workflow updates after submit
@@ -18,56 +21,56 @@ class ReimbursementClaim(Document):
         previous_state = self.get_db_value("workflow_state")
         user = frappe.session.user
 
-        approver_name = frappe.db.get_value("User", user, "full_name")
-        approver_email = frappe.db.get_value("User", user, "email")
+        approver_name, approver_email = get_user_contact(user)
 
 		# ----------------------------------------
 		# 2️⃣ Send approval email ONLY once
 		# ----------------------------------------
         if current_state == "Approved" and previous_state != "Paid":
             frappe.db.set_value(self.doctype, self.name, "approved_by", user, update_modified=False)
-            self.notify_employee_on_approval(approver_name, approver_email)
+            queue_notification(
+                self, "approved", "notify_employee_on_approval",
+                approver_name=approver_name, approver_email=approver_email
+            )
 
 		# ----------------------------------------
 		# 4️⃣ Send Paid mail — ONLY when state is PAID
 		# ----------------------------------------
         if current_state == "Paid":
             frappe.db.set_value(self.doctype, self.name, "paid_by", user, update_modified=False)
-            self.notify_employee_on_payment(approver_name, approver_email)
+            queue_notification(
+                self, "paid", "notify_employee_on_payment",
+                approver_name=approver_name, approver_email=approver_email
+            )
 
     def on_cancel(self):
         current_state = self.workflow_state
         previous_state = self.get_db_value("workflow_state")
         user = frappe.session.user
 
-        approver_name = frappe.db.get_value("User", user, "full_name")
-        approver_email = frappe.db.get_value("User", user, "email")
+        approver_name, approver_email = get_user_contact(user)
 		
         # ----------------------------------------
 		# 3️⃣ Send Rejection mail normally
 		# ----------------------------------------
         if current_state == "Rejected":
             frappe.db.set_value(self.doctype, self.name, "approved_by", user, update_modified=False)
-            self.notify_employee_on_rejection(approver_name, approver_email)
+            queue_notification(
+                self, "rejected", "notify_employee_on_rejection",
+                rejector_name=approver_name, rejector_email=approver_email
+            )
 
 
     # -------------------------------------------------------------------
     # 1️⃣ Email — Notify HR on Submission (Blue Theme)
     # -------------------------------------------------------------------
     def notify_hr_on_submission(self):
-        settings = frappe.get_all(
-            "Company Email Settings",
-            fields=["hr_email", "hr_cc_emails"],
-            limit=1
-        )
+        settings = get_company_email_settings()
+        hr_email = settings.get("hr_email")
 
-        if not settings:
+        if not hr_email:
             return
 
-        hr_email = settings[0].get("hr_email")
-        cc_raw = settings[0].get("hr_cc_emails") or ""
-        cc_emails = [e.strip() for e in cc_raw.replace("\n", ",").split(",") if e.strip()]
-
         message = f"""
         <div style="font-family:'Poppins',Arial;background:#e6f3ff;padding:40px;">
             <div style="max-width:600px;margin:auto;background:white;border-radius:14px;
@@ -108,7 +111,7 @@ class ReimbursementClaim(Document):
 
         frappe.sendmail(
             recipients=[hr_email],
-            cc=cc_emails,
+            cc=settings.cc_list,
             subject=f"🧾 Reimbursement Claim Submitted - {self.employee_name}",
             message=message,
             reference_doctype=self.doctype,
@@ -1,9 +1,14 @@
 # Copyright (c) 2025, deepak and contributors
 # For license information, please see license.txt
 
-# import frappe
+import frappe
 from frappe.model.document import Document
 
 
 class ReminderQueue(Document):
 	pass
+
+
+def on_doctype_update():
+	frappe.db.add_index("Reminder Queue", ["status", "trigger_at"])
+	frappe.db.add_index("Reminder Queue", ["status", "next_attempt_at"])
@@ -1,6 +1,12 @@
 import frappe
 from frappe.model.document import Document
-from frappe.utils import formatdate, get_url
+
+from company.company.notifications import (
+    queue_notification,
+    get_user_contact,
+    render_workflow_email
+)
+from company.company.settings import get_company_email_settings
 
 
 class Request(Document):
@@ -10,7 +16,7 @@ class Request(Document):
     # =================================================
     def on_submit(self):
         """Triggered when an Employee submits the Request"""
-        self.notify_hr_on_submission()
+        queue_notification(self, "submitted", "notify_hr_on_submission")
 
     # =================================================
     # ALL WORKFLOW CHANGES AFTER SUBMIT
@@ -25,8 +31,7 @@ class Request(Document):
         # 1️⃣ Handle Approval Action
         if self.workflow_state == "Approved":
             current_user = frappe.session.user
-            approver_full_name = frappe.db.get_value("User", current_user, "full_name")
-            approver_email = frappe.db.get_value("User", current_user, "email")
+            approver_full_name, approver_email = get_user_contact(current_user)
 
             frappe.db.set_value(
                 self.doctype,
@@ -35,11 +40,25 @@ class Request(Document):
                 current_user,
                 update_modified=False
             )
-            self.notify_employee_on_approval(approver_full_name, approver_email)
+            queue_notification(
+                self,
+                "approved",
+                "notify_employee_on_approval",
+                approver_name=approver_full_name,
+                approver_email=approver_email
+            )
             return
 
         # 2️⃣ Handle Other Workflow Transitions (Clarification, Pending)
-        self.send_workflow_mail()
+        if not before or before.workflow_state == self.workflow_state:
+            return
+
+        queue_notification(
+            self,
+            f"workflow:{self.workflow_state}",
+            "send_workflow_mail",
+            previous_state=before.workflow_state
+        )
 
     # =================================================
     # HANDLE REJECTION / CANCELLATION
@@ -48,8 +67,7 @@ class Request(Document):
         """Triggered when HR rejects the request"""
         if self.workflow_state == "Rejected":
             current_user = frappe.session.user
-            rejector_full_name = frappe.db.get_value("User", current_user, "full_name")
-            rejector_email = frappe.db.get_value("User", current_user, "email")
+            rejector_full_name, rejector_email = get_user_contact(current_user)
 
             frappe.db.set_value(
                 self.doctype,
@@ -58,40 +76,27 @@ class Request(Document):
                 current_user,
                 update_modified=False
             )
-            self.notify_employee_on_rejection(rejector_full_name, rejector_email)
-
-    # =================================================
-    # GET HR EMAIL SETTINGS
-    # =================================================
-    def get_hr_settings(self):
-        """Fetch HR email and CC from Company Email Settings"""
-        settings = frappe.get_all(
-            "Company Email Settings",
-            fields=["hr_email", "hr_cc_emails"],
-            limit=1
-        )
-        if settings:
-            return settings[0]
-        return {}
+            queue_notification(
+                self,
+                "rejected",
+                "notify_employee_on_rejection",
+                rejector_name=rejector_full_name,
+                rejector_email=rejector_email
+            )
 
     # =================================================
     # 1️⃣ EMPLOYEE SUBMIT → HR (Blue Theme)
     # =================================================
     def notify_hr_on_submission(self):
-        hr_settings = self.get_hr_settings()
+        hr_settings = get_company_email_settings()
         hr_email = hr_settings.get("hr_email")
-        cc_emails = hr_settings.get("hr_cc_emails")
 
         if not hr_email:
             return
 
-        cc_list = []
-        if cc_emails:
-            cc_list = [e.strip() for e in cc_emails.replace("\n", ",").split(",") if e.strip()]
-
         self.send_email(
             recipients=[hr_email],
-            cc=cc_list,
+            cc=hr_settings.cc_list,
             subject=f"📩 New Request - {self.employee_name}",
             header="New Request Submitted",
             icon="📩",
@@ -105,9 +110,8 @@ class Request(Document):
     # 2️⃣ HR → APPROVE → EMPLOYEE (Green Theme)
     # =================================================
     def notify_employee_on_approval(self, approver_name=None, approver_email=None):
-        hr_settings = self.get_hr_settings()
-        hr_email = hr_settings.get("hr_email")
-        
+        hr_email = get_company_email_settings().get("hr_email")
+
         employee_email = frappe.db.get_value("Employee", self.employee_id, "personal_email")
         if not employee_email: return
 
@@ -133,9 +137,8 @@ class Request(Document):
     # 3️⃣ HR → REJECT → EMPLOYEE (Red Theme)
     # =================================================
     def notify_employee_on_rejection(self, rejector_name=None, rejector_email=None):
-        hr_settings = self.get_hr_settings()
-        hr_email = hr_settings.get("hr_email")
-        
+        hr_email = get_company_email_settings().get("hr_email")
+
         employee_email = frappe.db.get_value("Employee", self.employee_id, "personal_email")
         if not employee_email: return
 
@@ -158,23 +161,14 @@ class Request(Document):
         )
 
     # =================================================
-    # WORKFLOW MAIL HANDLER (Clarification / Reply)
+    # WORKFLOW MAIL HANDLER (Clarification / Reply, background job)
     # =================================================
-    def send_workflow_mail(self):
-        before = self.get_doc_before_save()
-        if not before:
-            return
-
-        previous_state = before.workflow_state
+    def send_workflow_mail(self, previous_state=None):
         current_state = self.workflow_state
 
-        # 🚫 Skip if no workflow transition
-        if previous_state == current_state:
-            return
-
-        hr_settings = self.get_hr_settings()
+        hr_settings = get_company_email_settings()
         hr_email = hr_settings.get("hr_email")
-        
+
         employee_email = frappe.db.get_value("Employee", self.employee_id, "personal_email")
 
         # -------------------------------------------------
@@ -200,15 +194,10 @@ class Request(Document):
         # -------------------------------------------------
         elif current_state == "Pending" and previous_state == "Clarification Requested":
             emp_reply = self.get_latest_employee_reply()
-            
-            cc_emails = hr_settings.get("hr_cc_emails")
-            cc_list = []
-            if cc_emails:
-                cc_list = [e.strip() for e in cc_emails.replace("\n", ",").split(",") if e.strip()]
 
             self.send_email(
                 recipients=[hr_email],
-                cc=cc_list,
+                cc=hr_settings.cc_list,
                 subject=f"📩 Reply from Employee - {self.employee_name}",
                 header="Reply Received",
                 icon="📩",
@@ -301,73 +290,21 @@ class Request(Document):
         sender=None,
         reply_to=None
     ):
-        
-        # Determine background color for details block
-        bg_color = "#f0fff4" # default green-ish
-        if color == "#dc3545": bg_color = "#fff5f5" # red-ish
-        elif color == "#ffc107": bg_color = "#fffdeb" # yellow-ish
-        elif color == "#0062cc": bg_color = "#f0f7ff" # blue-ish
-
-        details = f"""
-        <div style="background:{bg_color}; padding:15px; border-radius:8px; margin-top:20px; border:1px solid rgba(0,0,0,0.05);">
-            <table style="width:100%; border-collapse:collapse;">
-                <tr style="border-bottom: 1px solid rgba(0,0,0,0.05);">
-                    <td style="padding:10px 0; color:#555; width:120px;"><b>Employee</b></td>
-                    <td style="padding:10px 0; text-align:right;">{self.employee_name}</td>
-                </tr>
-                <tr style="border-bottom: 1px solid rgba(0,0,0,0.05);">
-                    <td style="padding:10px 0; color:#555;"><b>Subject</b></td>
-                    <td style="padding:10px 0; text-align:right;">{self.subject or '-'}</td>
-                </tr>
-                <tr>
-                    <td style="padding:10px 0; color:#555; vertical-align:top;"><b>Message</b></td>
-                    <td style="padding:10px 0; text-align:right; font-size:13px; color:#666;">
-                        <div style="max-height:100px; overflow:hidden;">{self.message or '-'}</div>
-                    </td>
-                </tr>
-            </table>
-        </div>
-        """
-
-        message_html = f"""
-        <div style="font-family: 'Segoe UI', Tahoma, Geneva, Verdana, sans-serif; background-color: #f4f7f6; padding: 40px 20px;">
-            <div style="max-width: 600px; margin: 0 auto; background-color: #ffffff; border-radius: 12px; overflow: hidden; box-shadow: 0 4px 12px rgba(0,0,0,0.1);">
-                <!-- Header -->
-                <div style="background-color: {color}; padding: 15px 20px; color: #ffffff; border-bottom: 4px solid rgba(0,0,0,0.1);">
-                    <table style="width:100%; border-collapse:collapse;">
-                        <tr>
-                            <td style="vertical-align: middle; width: 30px; font-size: 22px; line-height: 1;">
-                                {icon}
-                            </td>
-                            <td style="vertical-align: middle; padding-left: 8px; font-size: 18px; font-weight: bold; line-height: 1;">
-                                {header}
-                            </td>
-                        </tr>
-                    </table>
-                </div>
-                
-                <div style="padding: 30px; color: #333;">
-                    <p style="font-size: 16px; margin-bottom: 5px;">Hello,</p>
-                    <p style="font-size: 15px; line-height: 1.5; color: #555;">{intro}</p>
-                    
-                    {details}
-                    
-                    {extra_message}
-                    
-                    <!-- Action Button -->
-                    <div style="text-align: center; margin-top: 30px;">
-                        <a href="{get_url('/app/request/' + self.name)}" 
-                           style="background-color: {color}; color: #ffffff; padding: 12px 25px; text-decoration: none; border-radius: 8px; font-weight: 600; display: inline-block;">
-                            View Request
-                        </a>
-                    </div>
-                </div>
-            </div>
-            <div style="text-align: center; margin-top: 20px; color: #888; font-size: 12px;">
-                This is an automated notification from Innoblitz ERP.
-            </div>
-        </div>
-        """
+        message_html = render_workflow_email(
+            self,
+            header=header,
+            intro=intro,
+            color=color,
+            icon=icon,
+            extra_message=extra_message,
+            details=[
+                ("Employee", self.employee_name),
+                ("Subject", self.subject or "-"),
+                ("Message", '<div style="max-height:100px; overflow:hidden; font-size:13px; color:#666;">'
+                            f"{self.message or '-'}</div>")
+            ],
+            button_label="View Request"
+        )
 
         frappe.sendmail(
             recipients=[r for r in recipients if r],
@@ -2,6 +2,31 @@
 // For license information, please see license.txt
 
 frappe.ui.form.on("Upload Attendance", {
+    setup: function(frm) {
+        frappe.realtime.on("attendance_import_done", function(data) {
+            if (!data) return;
+
+            if (data.error) {
+                frappe.msgprint({
+                    title: __("Attendance Import Failed"),
+                    message: data.error,
+                    indicator: "red"
+                });
+                return;
+            }
+
+            frappe.msgprint({
+                title: __("Attendance Import Summary"),
+                message: `✅ Created: ${data.created}<br>
+                          ⚪ Skipped: ${data.skipped}<br>
+                          🔴 Errors: ${data.errors}<br><br>
+                          <a href="${data.file_url}" target="_blank">${__("Download row-wise result")}</a>`,
+                indicator: data.errors ? "orange" : "green"
+            });
+            frm.reload_doc();
+        });
+    },
+
     refresh: function(frm) {
         if (frm.doc.attendance_file) {
             frm.add_custom_button(__('Import Attendance'), function() {
@@ -10,8 +35,7 @@ frappe.ui.form.on("Upload Attendance", {
                     args: { docname: frm.doc.name },
                     callback: function(r) {
                         if (r.message) {
-                            frappe.msgprint(r.message);
-                            frm.reload_doc();
+                            frappe.show_alert({ message: r.message, indicator: "blue" });
                         }
                     }
                 });
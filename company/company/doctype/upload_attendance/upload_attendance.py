@@ -1,173 +1,396 @@
 import frappe
 import pandas as pd
 from frappe.model.document import Document
+from frappe.utils import getdate
 from datetime import datetime, time
 import os
 import re
 import numpy as np
 
+from company.company.utils import bulk_insert_docs
+from company.company.attendance_summary import rebuild_attendance_summary
+from company.company.attendance_analytics import clear_day_buckets
+from company.company.doctype.attendance.attendance import HALF_DAY_MINUTES, FULL_DAY_MINUTES
+
 
 class UploadAttendance(Document):
     pass
 
 
+IMPORT_BATCH_SIZE = 500
+BLANK_VALUES = ["-", "–", "", "None", "none", "nan", "NaN", "NaT"]
+TIME_FORMATS = ["%H:%M:%S", "%H:%M", "%I:%M%p", "%I:%M:%S%p", "%H.%M"]
+
+
+# Workflow
+# ----------------------------------------------------------------
+# Import Attendance (button)
+#  → enqueue run_attendance_import (long queue)
+#  → read file → normalize ids / dates / times with vectorized pandas ops
+#  → preload existing (employee, attendance_date) pairs for the file's date span
+#  → compute status + working hours for all rows at once
+#  → bulk insert new Attendance in committed batches
+#  → attach a per-row result CSV to the Upload Attendance and notify the form
+
+
 @frappe.whitelist()
 def import_attendance(docname):
     """
-    Import attendance from uploaded CSV/XLSX file into ERPNext.
+    Queue the attendance import for the uploaded CSV/XLSX file.
+    The result (summary + per-row result file) is pushed to the form when done.
+    """
+    doc = frappe.get_doc("Upload Attendance", docname)
+    if not doc.attendance_file:
+        frappe.throw("Please attach the attendance file first.")
+
+    frappe.enqueue(
+        "company.company.doctype.upload_attendance.upload_attendance.run_attendance_import",
+        queue="long",
+        timeout=3600,
+        job_id=f"attendance_import::{docname}",
+        deduplicate=True,
+        enqueue_after_commit=True,
+        docname=docname,
+        user=frappe.session.user
+    )
+
+    return "⏳ Attendance import has been queued. You will be notified when it completes."
+
+
+def run_attendance_import(docname, user=None):
+    """
+    Background job: import attendance rows from the uploaded file.
     - Match Excel 'Person ID' exactly with Employee.employee_id (no leading zero correction)
     - Create new Attendance even if in_time or out_time is '-' or missing
-    - Skip existing or manual attendance records
+    - Skip existing attendance records and duplicate rows in the file
     - Provide detailed reason if employee not found
     """
     try:
-        # --- Get uploaded file ---
         doc = frappe.get_doc("Upload Attendance", docname)
-        file_doc = frappe.get_doc("File", {"file_url": doc.attendance_file})
-        file_url = file_doc.file_url
-
-        # --- Determine file path ---
-        if file_url.startswith("/private/"):
-            file_path = frappe.get_site_path(file_url.lstrip("/"))
-        elif file_url.startswith("/files/"):
-            file_path = frappe.get_site_path("public", file_url.lstrip("/files/"))
-        else:
-            frappe.throw(f"Unsupported file path: {file_url}")
-
-        if not os.path.exists(file_path):
-            frappe.throw(f"File not found: {file_url}")
-
-        # --- Read Excel or CSV ---
-        file_name = file_doc.file_name.lower()
-        if file_name.endswith(".csv"):
-            df = pd.read_csv(file_path, header=4, dtype=str, keep_default_na=False)
-        elif file_name.endswith(".xlsx"):
-            df = pd.read_excel(file_path, engine="openpyxl", header=4, dtype=str, keep_default_na=False)
-        else:
-            frappe.throw("Unsupported file format! Please upload CSV or XLSX.")
-
-        if df.empty:
-            frappe.throw("No data found in the uploaded file.")
-
-        # --- Normalize headers ---
-        df.columns = [c.strip().lower() for c in df.columns]
-        column_map = {
-            "person id": "person_id",
-            "name": "employee_name",
-            "date": "attendance_date",
-            "check-in": "in_time",
-            "check-out": "out_time"
+        df = read_attendance_file(doc.attendance_file)
+
+        results = prepare_attendance_rows(df)
+        created = insert_attendance_rows(results)
+        frappe.db.commit()
+
+        # Bulk inserts skip Attendance hooks — refresh the monthly summaries
+        # and the cached analytics days they touched
+        if created:
+            inserted = results[results["result"] == "Created"]
+            rebuild_attendance_summary(
+                inserted["attendance_date"].min(),
+                inserted["attendance_date"].max(),
+                inserted["employee"].unique().tolist()
+            )
+            clear_day_buckets(inserted["attendance_date"].min(), inserted["attendance_date"].max())
+
+        file_url = attach_result_file(docname, results)
+
+        counts = results["result"].value_counts().to_dict()
+        summary = {
+            "created": created,
+            "skipped": int(counts.get("Skipped", 0)),
+            "errors": int(counts.get("Error", 0)),
+            "file_url": file_url
+        }
+
+    except Exception as e:
+        frappe.db.rollback()
+        frappe.log_error(frappe.get_traceback(), "Attendance Import Error")
+        summary = {"error": str(e)}
+
+    frappe.publish_realtime(
+        "attendance_import_done",
+        summary,
+        doctype="Upload Attendance",
+        docname=docname,
+        user=user,
+        after_commit=True
+    )
+    return summary
+
+
+def read_attendance_file(file_url):
+    """Load the uploaded CSV/XLSX into a DataFrame with normalized headers"""
+    file_doc = frappe.get_doc("File", {"file_url": file_url})
+
+    # --- Determine file path ---
+    if file_url.startswith("/private/"):
+        file_path = frappe.get_site_path(file_url.lstrip("/"))
+    elif file_url.startswith("/files/"):
+        file_path = frappe.get_site_path("public", file_url.lstrip("/"))
+    else:
+        frappe.throw(f"Unsupported file path: {file_url}")
+
+    if not os.path.exists(file_path):
+        frappe.throw(f"File not found: {file_url}")
+
+    # --- Read Excel or CSV ---
+    file_name = file_doc.file_name.lower()
+    if file_name.endswith(".csv"):
+        df = pd.read_csv(file_path, header=4, dtype=str, keep_default_na=False)
+    elif file_name.endswith(".xlsx"):
+        df = pd.read_excel(file_path, engine="openpyxl", header=4, dtype=str, keep_default_na=False)
+    else:
+        frappe.throw("Unsupported file format! Please upload CSV or XLSX.")
+
+    if df.empty:
+        frappe.throw("No data found in the uploaded file.")
+
+    # --- Normalize headers ---
+    df.columns = [str(c).strip().lower() for c in df.columns]
+    column_map = {
+        "person id": "person_id",
+        "name": "employee_name",
+        "date": "attendance_date",
+        "check-in": "in_time",
+        "check-out": "out_time"
+    }
+    df.rename(columns=lambda x: column_map.get(x, x), inplace=True)
+
+    if "person_id" not in df.columns:
+        frappe.throw("CSV must contain 'Person ID' column!")
+
+    for col in ["attendance_date", "in_time", "out_time"]:
+        if col not in df.columns:
+            df[col] = ""
+
+    return df
+
+
+def prepare_attendance_rows(df):
+    """
+    Vectorized validation of the whole file.
+    Returns a DataFrame with one row per input row and
+    columns: row, person_id, employee, attendance_date, in_time, out_time,
+    status, working hours / overtime, result, reason.
+    """
+    out = pd.DataFrame({"row": np.arange(1, len(df) + 1)}, index=df.index)
+    out["result"] = ""
+    out["reason"] = ""
+
+    # --- Clean Person IDs ---
+    out["person_id"] = (
+        df["person_id"]
+        .astype(str)
+        .str.strip()
+        .str.replace(r"\.0$", "", regex=True)
+        .replace({"None": "", "nan": ""})
+    )
+
+    # --- Employee lookup ---
+    employees = frappe.db.get_all("Employee", ["name", "employee_id", "employee_name"])
+    emp_df = pd.DataFrame(
+        [dict(e) for e in employees if e["employee_id"]],
+        columns=["name", "employee_id", "employee_name"]
+    )
+    emp_df["employee_id"] = emp_df["employee_id"].astype(str).str.strip()
+    emp_df = emp_df.drop_duplicates("employee_id").set_index("employee_id")
+
+    out["employee"] = out["person_id"].map(emp_df["name"])
+    out["employee_id"] = out["person_id"].where(out["employee"].notna())
+    out["employee_name"] = out["person_id"].map(emp_df["employee_name"])
+
+    # --- Dates (parse each distinct value once) ---
+    raw_dates = df["attendance_date"].astype(str).str.strip()
+    date_map = {}
+    for value in raw_dates.unique():
+        try:
+            date_map[value] = getdate(value) if value not in BLANK_VALUES else None
+        except Exception:
+            date_map[value] = None
+    out["attendance_date"] = raw_dates.map(date_map)
+
+    # --- Times ---
+    out["in_time"] = normalize_time_series(df["in_time"])
+    out["out_time"] = normalize_time_series(df["out_time"])
+
+    # --- Row level checks (first failing reason wins) ---
+    missing_id = out["person_id"] == ""
+    no_employee = ~missing_id & out["employee"].isna()
+    no_date = ~missing_id & ~no_employee & out["attendance_date"].isna()
+
+    out.loc[missing_id, "reason"] = "❌ Missing Person ID"
+    out.loc[no_employee, "reason"] = out.loc[no_employee, "person_id"].map(
+        lambda pid: f"❌ {employee_not_found_reason(pid, emp_df.index)} → Person ID '{pid}'"
+    )
+    out.loc[no_date, "reason"] = "⚠️ Missing Attendance Date"
+
+    valid = ~(missing_id | no_employee | no_date)
+
+    # --- Existing attendance for the file's employees / date span ---
+    existing = set()
+    if valid.any():
+        dates = out.loc[valid, "attendance_date"]
+        existing = {
+            (r.employee, getdate(r.attendance_date))
+            for r in frappe.get_all(
+                "Attendance",
+                filters={
+                    "employee": ["in", out.loc[valid, "employee"].unique().tolist()],
+                    "attendance_date": ["between", [min(dates), max(dates)]]
+                },
+                fields=["employee", "attendance_date"]
+            )
         }
-        df.rename(columns=lambda x: column_map.get(x, x), inplace=True)
-
-        if "person_id" not in df.columns:
-            frappe.throw("CSV must contain 'Person ID' column!")
-
-        # --- Clean Person IDs ---
-        df["person_id"] = (
-            df["person_id"]
-            .astype(str)
-            .str.strip()
-            .str.replace(r"\.0$", "", regex=True)
-            .replace({"None": "", "nan": ""})
-        )
 
-        # --- Cache employee table for faster lookup ---
-        employees = frappe.db.get_all("Employee", ["name", "employee_id", "employee_name"])
-        emp_dict = {str(e["employee_id"]).strip(): e for e in employees if e["employee_id"]}
-
-        created, skipped, errors = [], [], []
-
-        for idx, row in df.iterrows():
-            try:
-                person_id = str(row.get("person_id", "")).strip()
-
-                if not person_id:
-                    skipped.append(f"Row {idx+1}: ❌ Missing Person ID")
-                    continue
-
-                # --- Exact match only ---
-                emp = emp_dict.get(person_id)
-
-                if not emp:
-                    pid_no_zero = person_id.lstrip("0")
-                    similar = next((e for e in emp_dict.keys() if e == pid_no_zero), None)
-                    reason = "No matching Employee.employee_id found"
-
-                    if similar:
-                        reason += f" (Found '{similar}' without leading zeros)"
-                    elif any(e.lower() == person_id.lower() for e in emp_dict.keys()):
-                        reason += " (Case mismatch)"
-                    else:
-                        reason += " (Completely missing in Employee table)"
-
-                    skipped.append(f"Row {idx+1}: ❌ {reason} → Person ID '{person_id}'")
-                    continue
-
-                emp_name = emp["name"]
-                emp_employee_id = emp["employee_id"]
-                emp_employee_name = emp["employee_name"]
-
-                # --- Attendance Date ---
-                attendance_date = row.get("attendance_date")
-                if not attendance_date:
-                    skipped.append(f"Row {idx+1}: ⚠️ Missing Attendance Date for {emp_name}")
-                    continue
-
-                # --- Normalize Times (accept '-' or empty) ---
-                in_time_raw = str(row.get("in_time", "")).strip()
-                out_time_raw = str(row.get("out_time", "")).strip()
-                in_time = None if in_time_raw in ["-", "", "None", "nan"] else normalize_time(in_time_raw)
-                out_time = None if out_time_raw in ["-", "", "None", "nan"] else normalize_time(out_time_raw)
-
-                # --- Skip if attendance already exists ---
-                exists = frappe.db.exists({
-                    "doctype": "Attendance",
-                    "employee": emp_name,
-                    "attendance_date": attendance_date
-                })
-                if exists:
-                    skipped.append(f"Row {idx+1}: ⚪ Attendance already exists for {emp_name} on {attendance_date}")
-                    continue
-
-                # --- Create new Attendance (even with missing times) ---
-                new_doc = frappe.get_doc({
-                    "doctype": "Attendance",
-                    "employee": emp_name,
-                    "employee_id": emp_employee_id,
-                    "employee_name": emp_employee_name,
-                    "attendance_date": attendance_date,
-                    "in_time": in_time,
-                    "out_time": out_time
-                })
-                new_doc.insert(ignore_permissions=True)
-                created.append(
-                    f"✅ {emp_name} | {attendance_date} inserted (In: {in_time or '-'}, Out: {out_time or '-'})"
-                )
-
-            except Exception as e:
-                errors.append(f"Row {idx+1}: ❌ {str(e)}")
+    pairs = pd.Series(list(zip(out["employee"], out["attendance_date"])), index=out.index)
+    already_exists = valid & pairs.map(lambda pair: pair in existing)
+    duplicate = valid & ~already_exists & pairs.duplicated()
+
+    out.loc[already_exists, "reason"] = "⚪ Attendance already exists"
+    out.loc[duplicate, "reason"] = "⚪ Duplicate row in file"
+
+    to_create = valid & ~already_exists & ~duplicate
+    out.loc[to_create, "result"] = "Created"
+    out.loc[~to_create, "result"] = "Skipped"
+
+    compute_working_hours(out)
+    return out
+
+
+def employee_not_found_reason(person_id, employee_ids):
+    """Explain why a Person ID did not match any Employee"""
+    reason = "No matching Employee.employee_id found"
+    pid_no_zero = person_id.lstrip("0")
+
+    if pid_no_zero in employee_ids:
+        reason += f" (Found '{pid_no_zero}' without leading zeros)"
+    elif any(e.lower() == person_id.lower() for e in employee_ids):
+        reason += " (Case mismatch)"
+    else:
+        reason += " (Completely missing in Employee table)"
+    return reason
 
-        frappe.db.commit()
 
-        # --- Summary ---
-        summary = (
-            f"<b>Attendance Import Summary</b><br>"
-            f"✅ Created: {len(created)}<br>"
-            f"⚪ Skipped: {len(skipped)}<br>"
-            f"🔴 Errors: {len(errors)}<br><br>"
+def normalize_time_series(values):
+    """Vectorized version of normalize_time: returns 'HH:MM:SS' strings or None"""
+    s = values.astype(str).str.strip().str.replace("\xa0", "", regex=False).str.replace(" ", "", regex=False)
+    result = pd.Series([None] * len(s), index=s.index, dtype=object)
+
+    blank = s.isin(BLANK_VALUES)
+
+    # Excel fractions of a day (e.g. 0.375 → 09:00:00)
+    numeric = ~blank & s.str.fullmatch(r"\d+(\.\d+)?")
+    if numeric.any():
+        seconds = (pd.to_numeric(s[numeric]) % 1 * 86400).round().astype(int)
+        result[numeric] = (
+            (seconds // 3600).map("{:02d}".format) + ":"
+            + (seconds % 3600 // 60).map("{:02d}".format) + ":"
+            + (seconds % 60).map("{:02d}".format)
         )
-        if created:
-            summary += "<b>✅ Created:</b><br>" + "<br>".join(created[:20]) + "<br><br>"
-        if skipped:
-            summary += "<b>⚪ Skipped (with reasons):</b><br>" + "<br>".join(skipped[:30]) + "<br><br>"
-        if errors:
-            summary += "<b>🔴 Errors:</b><br>" + "<br>".join(errors[:20]) + "<br>"
 
-        return summary
+    # Known formats
+    pending = ~blank & result.isna()
+    for fmt in TIME_FORMATS:
+        if not pending.any():
+            break
+        parsed = pd.to_datetime(s[pending].str.upper(), format=fmt, errors="coerce")
+        ok = parsed.notna()
+        result[ok[ok].index] = parsed[ok].dt.strftime("%H:%M:%S")
+        pending = ~blank & result.isna()
+
+    # Anything that still carries an H:MM pattern
+    if pending.any():
+        parts = s[pending].str.extract(r"(\d{1,2})[:.](\d{2})(?::(\d{2}))?")
+        ok = parts[0].notna()
+        if ok.any():
+            p = parts[ok].fillna("0").astype(int)
+            result[p.index] = (
+                p[0].map("{:02d}".format) + ":" + p[1].map("{:02d}".format) + ":" + p[2].map("{:02d}".format)
+            )
+
+    unrecognized = ~blank & result.isna()
+    if unrecognized.any():
+        frappe.log_error(
+            f"Unrecognized time formats: {s[unrecognized].unique().tolist()[:20]}",
+            "Attendance Import"
+        )
 
-    except Exception as e:
-        frappe.throw(f"Error importing attendance: {e}")
+    return result
+
+
+def compute_working_hours(out):
+    """
+    Status, working hours and overtime for every row at once.
+    Mirrors Attendance.calculate_working_hours for rows without a leave type.
+    """
+    in_t = out["in_time"].where(~out["in_time"].isin(["00:00:00"]))
+    out_t = out["out_time"].where(~out["out_time"].isin(["00:00:00"]))
+
+    start = pd.to_timedelta(in_t, errors="coerce")
+    end = pd.to_timedelta(out_t, errors="coerce")
+
+    # Overnight shift support
+    end = end.where(~(end < start), end + pd.Timedelta(days=1))
+    minutes = ((end - start).dt.total_seconds() // 60).fillna(0).astype(int)
+
+    has_in = start.notna()
+    has_out = end.notna()
+
+    out["status"] = np.select(
+        [
+            ~has_in & ~has_out,
+            has_in ^ has_out,
+            minutes <= 0,
+            minutes < HALF_DAY_MINUTES
+        ],
+        ["Absent", "Missing", "Missing", "Half Day"],
+        default="Present"
+    )
+
+    worked = minutes.where(out["status"].isin(["Present", "Half Day"]), 0)
+    overtime = (worked - FULL_DAY_MINUTES).clip(lower=0)
+
+    out["working_hours_decimal"] = (worked / 60).round(2)
+    out["working_hours_display"] = (worked // 60).astype(str) + ":" + (worked % 60).map("{:02d}".format)
+    out["overtime_decimal"] = (overtime / 60).round(2)
+    out["overtime_display"] = (overtime // 60).astype(str) + ":" + (overtime % 60).map("{:02d}".format)
+
+
+def insert_attendance_rows(results):
+    """Bulk insert the rows marked Created, committing after each batch"""
+    fields = [
+        "employee", "employee_id", "employee_name", "attendance_date", "in_time", "out_time",
+        "status", "working_hours_display", "working_hours_decimal",
+        "overtime_display", "overtime_decimal"
+    ]
+    rows = results.loc[results["result"] == "Created", fields]
+    rows = rows.astype(object).where(rows.notna(), None).to_dict("records")
+
+    created = 0
+    for i in range(0, len(rows), IMPORT_BATCH_SIZE):
+        batch = rows[i:i + IMPORT_BATCH_SIZE]
+        try:
+            bulk_insert_docs("Attendance", batch)
+            frappe.db.commit()
+            created += len(batch)
+        except Exception as e:
+            frappe.db.rollback()
+            frappe.log_error(frappe.get_traceback(), "Attendance Import Batch Error")
+            batch_index = results.index[results["result"] == "Created"][i:i + IMPORT_BATCH_SIZE]
+            results.loc[batch_index, "result"] = "Error"
+            results.loc[batch_index, "reason"] = f"🔴 {str(e)}"
+
+    return created
+
+
+def attach_result_file(docname, results):
+    """Save the per-row import result as a private CSV on the Upload Attendance"""
+    columns = ["row", "person_id", "employee", "attendance_date", "in_time", "out_time", "status", "result", "reason"]
+    content = results[columns].to_csv(index=False)
+
+    file_doc = frappe.get_doc({
+        "doctype": "File",
+        "file_name": f"attendance_import_result_{docname}_{frappe.utils.now_datetime().strftime('%Y%m%d%H%M%S')}.csv",
+        "attached_to_doctype": "Upload Attendance",
+        "attached_to_name": docname,
+        "is_private": 1,
+        "content": content
+    })
+    file_doc.save(ignore_permissions=True)
+    frappe.db.commit()
+    return file_doc.file_url
 
 
 # === Robust Time Normalizer ===
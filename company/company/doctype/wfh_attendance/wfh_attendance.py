@@ -2,6 +2,10 @@ import frappe
 from frappe.model.document import Document
 from datetime import datetime, timedelta, date, time
 
+from company.company.conflicts import has_conflict
+from company.company.notifications import queue_notification
+from company.company.settings import get_company_email_settings
+
 class WFHAttendance(Document):
     def validate(self):
         """Automatically set date and calculate total hours"""
@@ -9,17 +13,8 @@ class WFHAttendance(Document):
             self.date = date.today()
 
         # 🚫 Check for duplicate request on same date for same employee
-        existing = frappe.db.exists(
-            "WFH Attendance",
-            {
-                "employee": self.employee,
-                "date": self.date,
-                "name": ["!=", self.name],  # exclude current record (for edits)
-                "docstatus": ["<", 2]       # exclude cancelled
-            }
-        )
-
-        if existing:
+        # exclude current record (for edits); cancelled ones don't count
+        if has_conflict("wfh", self.employee, self.date, exclude=self.name):
             frappe.throw(
                 f"A WFH Attendance request already exists for <b>{self.date}</b> "
             )
@@ -46,7 +41,7 @@ class WFHAttendance(Document):
                 frappe.db.commit()  # ensure insert is saved before submit
                 self.submit()
                 frappe.msgprint("✅ WFH Attendance Submitted.")
-                self.notify_hr_for_approval()
+                queue_notification(self, "submitted", "notify_hr_for_approval")
         except Exception as e:
             frappe.log_error(frappe.get_traceback(), "WFH Auto Submit Failed")
 
@@ -68,7 +63,7 @@ class WFHAttendance(Document):
 
             # ✅ Create or update Attendance record
             self.create_or_update_attendance()
-            self.notify_employee_on_approval()
+            queue_notification(self, "approved", "notify_employee_on_approval")
 
     def on_cancel(self):
         """Triggered when HR rejects (docstatus=2)"""
@@ -80,14 +75,11 @@ class WFHAttendance(Document):
                 frappe.session.user,
                 update_modified=False
             )
-            self.notify_employee_on_rejection()
+            queue_notification(self, "rejected", "notify_employee_on_rejection")
 
     def create_or_update_attendance(self):
         """Creates or updates Attendance record when HR approves"""
-        existing_attendance = frappe.db.exists(
-            "Attendance",
-            {"employee": self.employee, "attendance_date": self.date}
-        )
+        existing_attendance = has_conflict("attendance", self.employee, self.date)
 
         # Helper: ensure string format for time fields
         def to_str_time(t):
@@ -138,32 +130,15 @@ class WFHAttendance(Document):
             return datetime.combine(date.today(), t)
         frappe.throw(f"Unsupported type for time: {type(t)}")
 
-    def get_hr_settings(self):
-        """Fetch HR email and CC from Company Email Settings"""
-        settings = frappe.get_all(
-            "Company Email Settings",
-            fields=["hr_email", "hr_cc_emails"],
-            limit=1
-        )
-        if settings:
-            return settings[0]
-        return {}
-
     def notify_hr_for_approval(self):
         """Send email notification to HR when employee submits WFH Attendance"""
 
-        hr_settings = self.get_hr_settings()
+        hr_settings = get_company_email_settings()
         hr_email = hr_settings.get("hr_email")
-        cc_emails = hr_settings.get("hr_cc_emails")
 
         if not hr_email:
             return
 
-        cc_list = []
-        if cc_emails:
-            cc_list = [e.strip() for e in cc_emails.replace("\n", ",").split(",") if e.strip()]
-
-
         # Build sleek purple-styled table
         attendance_details = f"""
             <table style="width:100%; border-collapse:collapse; font-size:14px; border-radius:8px; overflow:hidden;">
@@ -239,7 +214,7 @@ class WFHAttendance(Document):
         try:
             frappe.sendmail(
                 recipients=[hr_email],
-                cc=cc_list,
+                cc=hr_settings.cc_list,
                 subject=f"WFH Approval Request - {self.employee_name} ({frappe.utils.formatdate(self.date)})",
                 message=message,
                 sender=hr_email,
@@ -308,8 +283,7 @@ class WFHAttendance(Document):
         </div>
         """
 
-        hr_settings = self.get_hr_settings()
-        hr_email = hr_settings.get("hr_email")
+        hr_email = get_company_email_settings().get("hr_email")
 
         frappe.sendmail(
             recipients=recipients,
@@ -375,8 +349,7 @@ class WFHAttendance(Document):
         </div>
         """
 
-        hr_settings = self.get_hr_settings()
-        hr_email = hr_settings.get("hr_email")
+        hr_email = get_company_email_settings().get("hr_email")
 
         frappe.sendmail(
             recipients=recipients,
@@ -387,3 +360,7 @@ class WFHAttendance(Document):
             reference_doctype=self.doctype,
             reference_name=self.name
         )
+
+
+def on_doctype_update():
+    frappe.db.add_index("WFH Attendance", ["employee", "date"])
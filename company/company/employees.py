@@ -0,0 +1,50 @@
+import frappe
+
+
+# Session User → Employee
+# ----------------------------------------------------------------
+# Self-service endpoints all need "which Employee is the logged-in user".
+# The profile is cached per user in one Redis hash:
+#   employee_profile → {user: {name, employee_name, employee_id,
+#                              date_of_joining, email, personal_email}}
+# Users without an Employee are cached as {} so they do not hit the db either.
+# Cleared from Employee on_update / on_trash for the old and new user.
+
+EMPLOYEE_PROFILE_CACHE_KEY = "employee_profile"
+
+PROFILE_FIELDS = ["name", "employee_name", "employee_id", "date_of_joining", "email", "personal_email"]
+
+
+def _load_profile(user):
+    profile = frappe.db.get_value("Employee", {"user": user}, PROFILE_FIELDS, as_dict=True)
+    return dict(profile) if profile else {}
+
+
+def get_employee_profile(user=None):
+    """Cached Employee profile of a user (session user by default), empty _dict if not linked"""
+    user = user or frappe.session.user
+    if not user or user == "Guest":
+        return frappe._dict()
+
+    return frappe._dict(frappe.cache().hget(
+        EMPLOYEE_PROFILE_CACHE_KEY,
+        user,
+        generator=lambda: _load_profile(user)
+    ) or {})
+
+
+def get_session_employee(user=None):
+    """Employee name linked to the user (session user by default), or None"""
+    return get_employee_profile(user).get("name")
+
+
+def clear_employee_profile_cache(doc, method=None):
+    """Hook: Employee on_update / on_trash"""
+    users = {doc.get("user")}
+
+    before = doc.get_doc_before_save() if method != "on_trash" else None
+    if before:
+        users.add(before.get("user"))
+
+    for user in users - {None, ""}:
+        frappe.cache().hdel(EMPLOYEE_PROFILE_CACHE_KEY, user)
@@ -582,35 +582,34 @@ def get_hr_dashboard_data():
     except Exception:
         data["todays_leaves"] = []
 
-    # 6. Today's Birthdays
+    # 6. Today's Birthdays (cached day-of-year index)
     try:
-        # Match day and month
-        data["todays_birthdays"] = frappe.db.sql("""
-            SELECT employee_name, name as employee
-            FROM `tabEmployee`
-            WHERE status = 'Active'
-            AND DAY(date_of_birth) = DAY(%s)
-            AND MONTH(date_of_birth) = MONTH(%s)
-        """, (today, today), as_dict=True)
+        from company.company.celebrations import get_celebrations_between
+
+        celebrations = get_celebrations_between(today, today)
+        data["todays_birthdays"] = [
+            {"employee_name": b["employee_name"], "employee": b["employee"]}
+            for b in celebrations["birthdays"]
+        ]
+        data["todays_anniversaries"] = [
+            {"employee_name": a["employee_name"], "employee": a["employee"], "years": a["years"]}
+            for a in celebrations["anniversaries"]
+        ]
     except Exception:
         data["todays_birthdays"] = []
+        data["todays_anniversaries"] = []
 
     # 7. Holidays (Current Month)
     try:
+        from company.company.holidays import get_holiday_entries
+
         first_day = frappe.utils.get_first_day(today)
         last_day = frappe.utils.get_last_day(today)
-        
-        holiday_list = frappe.db.get_value("Holiday List", {"is_default": 1}, "name")
-            
-        if holiday_list:
-            data["holidays"] = frappe.db.sql("""
-                SELECT holiday_date as date, description
-                FROM `tabHoliday`
-                WHERE parent = %s
-                AND holiday_date BETWEEN %s AND %s
-            """, (holiday_list, first_day, last_day), as_dict=True)
-        else:
-            data["holidays"] = []
+
+        data["holidays"] = [
+            {"date": d, "description": description}
+            for d, description in get_holiday_entries(first_day, last_day)
+        ]
     except Exception:
         data["holidays"] = []
 
@@ -0,0 +1,109 @@
+import frappe
+from frappe.utils import getdate
+
+from datetime import date, timedelta
+
+
+# Holiday Calendar
+# ----------------------------------------------------------------
+# Per-year index built from every Holiday List row of that year:
+#   dates: {date: (is_holiday, description)}
+#   lists: {month: holiday list name}
+# Cached in Redis, cleared from Holiday List on_update / on_trash.
+# All holiday checks go through here so they are dict lookups.
+
+HOLIDAY_CACHE_KEY = "holiday_calendar"
+
+
+def _build_year_index(year):
+    year = int(year)
+
+    rows = frappe.db.sql("""
+        SELECT h.holiday_date, h.description, h.is_working_day
+        FROM `tabHolidays` h
+        WHERE h.parenttype = 'Holiday List'
+        AND h.holiday_date BETWEEN %s AND %s
+        ORDER BY h.holiday_date, h.idx
+    """, (date(year, 1, 1), date(year, 12, 31)), as_dict=True)
+
+    dates = {}
+    for row in rows:
+        d = getdate(row.holiday_date)
+        is_holiday = not row.is_working_day
+        current = dates.get(d)
+
+        # A non-working day in any list wins over a working-day row
+        if current is None or (is_holiday and not current[0]):
+            dates[d] = (is_holiday, row.description or "")
+
+    lists = {}
+    for hl in frappe.get_all(
+        "Holiday List",
+        filters={"year": year},
+        fields=["name", "month_year"],
+        order_by="creation asc"
+    ):
+        if hl.month_year:
+            lists.setdefault(int(hl.month_year), hl.name)
+
+    return {"dates": dates, "lists": lists}
+
+
+def get_year_index(year):
+    """Cached holiday index for one calendar year"""
+    year = int(year)
+    return frappe.cache().hget(
+        HOLIDAY_CACHE_KEY,
+        str(year),
+        generator=lambda: _build_year_index(year)
+    )
+
+
+def get_day(day):
+    """Return (is_holiday, description) for a date, or None if it is not in any Holiday List"""
+    day = getdate(day)
+    return get_year_index(day.year)["dates"].get(day)
+
+
+def is_holiday(day):
+    entry = get_day(day)
+    return bool(entry and entry[0])
+
+
+def get_holiday_entries(from_date, to_date):
+    """Ordered list of (date, description) for non-working days in the range"""
+    from_date = getdate(from_date)
+    to_date = getdate(to_date)
+
+    result = []
+    for year in range(from_date.year, to_date.year + 1):
+        for d, (holiday, description) in sorted(get_year_index(year)["dates"].items()):
+            if holiday and from_date <= d <= to_date:
+                result.append((d, description))
+    return result
+
+
+def get_holidays_between(from_date, to_date):
+    """Set of non-working dates in the range"""
+    return {d for d, _ in get_holiday_entries(from_date, to_date)}
+
+
+def get_month_bounds(year, month):
+    start = date(int(year), int(month), 1)
+    end = (start.replace(day=28) + timedelta(days=4)).replace(day=1) - timedelta(days=1)
+    return start, end
+
+
+def get_month_holiday_dates(year, month):
+    """Sorted list of non-working dates of a month"""
+    return [d for d, _ in get_holiday_entries(*get_month_bounds(year, month))]
+
+
+def get_holiday_list_name(year, month):
+    """Name of the Holiday List configured for the month (None if not set up)"""
+    return get_year_index(year)["lists"].get(int(month))
+
+
+def clear_holiday_cache(doc=None, method=None):
+    """Hook: Holiday List on_update / on_trash"""
+    frappe.cache().delete_value(HOLIDAY_CACHE_KEY)
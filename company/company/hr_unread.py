@@ -0,0 +1,165 @@
+import frappe
+from frappe.utils import now
+
+
+# HR Unread Tracker
+# ----------------------------------------------------------------
+# Submit (Leave Application / WFH Attendance / Request)
+#  → One multi-row INSERT of HR Read Tracker rows (one per HR user)
+#  → After commit: +1 on each HR user's counter for that doctype
+# Open / mark all read
+#  → One UPDATE of the unread rows → counter decremented / reset
+# Badge poll
+#  → One MGET of the user's counters (seeded by a GROUP BY on a miss)
+#
+# Counters are plain redis integers (get / incrby), one key per
+# (user, doctype), and expire after UNREAD_COUNTER_TTL so any drift heals.
+
+TRACKER_DOCTYPE = "HR Read Tracker"
+HR_ROLE = "HR"
+TRACKED_DOCTYPES = ["Leave Application", "WFH Attendance", "Request"]
+UNREAD_COUNTER_TTL = 24 * 60 * 60
+
+
+def _counter_key(user, doctype):
+    return frappe.cache().make_key(f"hr_unread|{user}|{doctype}")
+
+
+def get_hr_users():
+    return frappe.get_all(
+        "Has Role",
+        filters={"role": HR_ROLE, "parenttype": "User"},
+        pluck="parent",
+        distinct=True
+    )
+
+
+def _count_unread(user):
+    return {
+        row.reference_doctype: row.count
+        for row in frappe.db.sql(f"""
+            SELECT reference_doctype, COUNT(*) AS count
+            FROM `tab{TRACKER_DOCTYPE}`
+            WHERE is_read = 0 AND read_by = %s
+            GROUP BY reference_doctype
+        """, user, as_dict=True)
+    }
+
+
+def _seed_counters(user):
+    """Load the user's counters from the tracker table (cache miss)"""
+    counts = _count_unread(user)
+    cache = frappe.cache()
+    for doctype in TRACKED_DOCTYPES:
+        cache.set(_counter_key(user, doctype), counts.get(doctype, 0), ex=UNREAD_COUNTER_TTL, nx=True)
+    return counts
+
+
+def _change_counter(user, doctype, delta):
+    cache = frappe.cache()
+    key = _counter_key(user, doctype)
+
+    if cache.get(key) is None:
+        # Seeding reads the committed rows, which already include this change
+        _seed_counters(user)
+        return
+
+    if cache.incrby(key, delta) < 0:
+        cache.set(key, 0, ex=UNREAD_COUNTER_TTL)
+    else:
+        cache.expire(key, UNREAD_COUNTER_TTL)
+
+
+def _reset_counters(user, doctypes):
+    cache = frappe.cache()
+    for doctype in doctypes:
+        cache.set(_counter_key(user, doctype), 0, ex=UNREAD_COUNTER_TTL)
+
+
+# =================== FAN-OUT ===================
+
+def create_unread_entries(doc):
+    """One unread tracker row per HR user for a submitted document (bulk insert)"""
+    hr_users = get_hr_users()
+
+    # skip if HR created it (Administrator has every role)
+    if not hr_users or doc.owner in hr_users or doc.owner == "Administrator":
+        return
+
+    # avoid duplicates
+    if frappe.db.exists(TRACKER_DOCTYPE, {
+        "reference_doctype": doc.doctype,
+        "reference_name": doc.name
+    }):
+        return
+
+    timestamp = now()
+    owner = frappe.session.user
+    frappe.db.bulk_insert(
+        TRACKER_DOCTYPE,
+        ["name", "owner", "modified_by", "creation", "modified", "docstatus",
+         "reference_doctype", "reference_name", "read_by", "is_read"],
+        [
+            [frappe.generate_hash(length=10), owner, owner, timestamp, timestamp, 0,
+             doc.doctype, doc.name, user, 0]
+            for user in hr_users
+        ]
+    )
+
+    def increment_counters():
+        for user in hr_users:
+            _change_counter(user, doc.doctype, 1)
+
+    frappe.db.after_commit.add(increment_counters)
+
+
+# =================== MARK AS READ ===================
+
+def mark_as_read(user, doctype, name):
+    """Mark one document read for the user; returns the number of rows changed"""
+    frappe.db.sql(f"""
+        UPDATE `tab{TRACKER_DOCTYPE}`
+        SET is_read = 1, read_time = %s, modified = %s
+        WHERE reference_doctype = %s AND reference_name = %s
+        AND read_by = %s AND is_read = 0
+    """, (now(), now(), doctype, name, user))
+
+    changed = frappe.db.sql("SELECT ROW_COUNT()")[0][0]
+    if changed:
+        frappe.db.after_commit.add(lambda: _change_counter(user, doctype, -changed))
+    return changed
+
+
+def mark_all_as_read(user, doctype=None):
+    """Mark every unread item (optionally of one doctype) read for the user"""
+    conditions = "read_by = %s AND is_read = 0"
+    values = [now(), now(), user]
+    if doctype:
+        conditions += " AND reference_doctype = %s"
+        values.append(doctype)
+
+    frappe.db.sql(f"""
+        UPDATE `tab{TRACKER_DOCTYPE}`
+        SET is_read = 1, read_time = %s, modified = %s
+        WHERE {conditions}
+    """, values)
+
+    changed = frappe.db.sql("SELECT ROW_COUNT()")[0][0]
+    doctypes = [doctype] if doctype else TRACKED_DOCTYPES
+    frappe.db.after_commit.add(lambda: _reset_counters(user, doctypes))
+    return changed
+
+
+# =================== READ ===================
+
+def get_unread_counts(user):
+    """{doctype: unread count} for the user, from the redis counters"""
+    keys = [_counter_key(user, doctype) for doctype in TRACKED_DOCTYPES]
+    values = frappe.cache().mget(keys)
+
+    if any(v is None for v in values):
+        counts = _seed_counters(user)
+    else:
+        counts = dict(zip(TRACKED_DOCTYPES, (int(v) for v in values)))
+
+    return {doctype: count for doctype, count in counts.items() if count}
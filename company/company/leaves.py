@@ -0,0 +1,254 @@
+import frappe
+from frappe.utils import getdate, get_first_day, get_last_day, add_months, flt
+
+from datetime import datetime
+
+from company.company.utils import bulk_insert_docs
+
+
+# Workflow
+# ----------------------------------------------------------------
+# Auto Allocate (start year/month, number of months)
+#  → Load active employees
+#  → Load existing + previous-month allocations for the whole span (1 query)
+#  → Load approved allocation counts per (employee, leave type) (1 GROUP BY)
+#  → For every month in order, compute allocations + carry-forward in memory
+#  → Bulk insert new Leave Allocation rows
+
+MONTHLY_LEAVE_TYPES = {
+    "Sick Leave - Paid": 1,
+    "Unpaid Leave": 30,
+    "Permission": 120
+}
+
+# Sick Leave - Paid carries forward, and resets after every N allocations
+SICK_LEAVE_RESET_EVERY = 3
+
+
+def get_month_bounds(year, month):
+    """Return (first_day, last_day) as dates for the given month"""
+    start = getdate(get_first_day(datetime(int(year), int(month), 1)))
+    return start, getdate(get_last_day(start))
+
+
+def compute_leave_count(leave_type, base_leave_count, allocation_count, prev_alloc):
+    """
+    Leaves to allocate for one employee and leave type.
+    Sick Leave - Paid: carries forward the unused balance, resets every 3 allocations.
+    Unpaid Leave / Permission: fixed every month, no carry-forward.
+    """
+    carry_forward_balance = 0
+
+    if leave_type == "Sick Leave - Paid":
+        if allocation_count > 0 and allocation_count % SICK_LEAVE_RESET_EVERY == 0:
+            # Restart after every 3 months
+            carry_forward_balance = 0
+        elif prev_alloc:
+            balance = flt(prev_alloc.total_leaves_allocated) - flt(prev_alloc.total_leaves_taken)
+            if balance > 0:
+                carry_forward_balance = balance
+
+    return base_leave_count + carry_forward_balance
+
+
+def allocate_monthly_leaves(year, month, months=1, leave_types=None):
+    """
+    Allocate monthly leaves to all active employees for `months` consecutive
+    months starting at year/month. Months already allocated are skipped, so the
+    same call can backfill a range safely.
+
+    Returns {"created": int, "skipped": int}
+    """
+    leave_types = leave_types or MONTHLY_LEAVE_TYPES
+    months = max(int(months or 1), 1)
+
+    periods = [
+        get_month_bounds(d.year, d.month)
+        for d in (add_months(datetime(int(year), int(month), 1), i) for i in range(months))
+    ]
+    span_start = getdate(add_months(periods[0][0], -1))
+    span_end = periods[-1][1]
+
+    employees = frappe.get_all("Employee", filters={"status": "Active"}, pluck="name")
+    if not employees:
+        return {"created": 0, "skipped": 0}
+
+    # === Existing allocations for the span, keyed by exact month ===
+    existing = {}
+    for row in frappe.get_all(
+        "Leave Allocation",
+        filters={
+            "employee": ["in", employees],
+            "leave_type": ["in", list(leave_types)],
+            "status": "Approved",
+            "from_date": [">=", span_start],
+            "to_date": ["<=", span_end]
+        },
+        fields=["employee", "leave_type", "from_date", "to_date",
+                "total_leaves_allocated", "total_leaves_taken"]
+    ):
+        key = (row.employee, row.leave_type, getdate(row.from_date), getdate(row.to_date))
+        existing.setdefault(key, row)
+
+    # === Approved allocation counts per employee & leave type ===
+    counts = {
+        (row.employee, row.leave_type): row.count
+        for row in frappe.get_all(
+            "Leave Allocation",
+            filters={
+                "employee": ["in", employees],
+                "leave_type": ["in", list(leave_types)],
+                "status": "Approved"
+            },
+            fields=["employee", "leave_type", "count(name) as count"],
+            group_by="employee, leave_type"
+        )
+    }
+
+    new_rows = []
+    skipped = 0
+
+    for month_start, month_end in periods:
+        prev_start, prev_end = get_month_bounds(
+            getdate(add_months(month_start, -1)).year,
+            getdate(add_months(month_start, -1)).month
+        )
+
+        for emp in employees:
+            for leave_type, base_leave_count in leave_types.items():
+                key = (emp, leave_type, month_start, month_end)
+                if key in existing:
+                    skipped += 1
+                    continue
+
+                allocation_count = counts.get((emp, leave_type), 0)
+                prev_alloc = existing.get((emp, leave_type, prev_start, prev_end))
+
+                row = frappe._dict({
+                    "employee": emp,
+                    "leave_type": leave_type,
+                    "from_date": month_start,
+                    "to_date": month_end,
+                    "total_leaves_allocated": compute_leave_count(
+                        leave_type, base_leave_count, allocation_count, prev_alloc
+                    ),
+                    "total_leaves_taken": 0,
+                    "status": "Approved"
+                })
+                row.leave_balance = row.total_leaves_allocated
+                new_rows.append(row)
+
+                # Later months in the same run see this allocation
+                existing[key] = row
+                counts[(emp, leave_type)] = allocation_count + 1
+
+    bulk_insert_docs("Leave Allocation", new_rows)
+
+    return {"created": len(new_rows), "skipped": skipped}
+
+
+# =================== LEAVE LEDGER ===================
+# Every debit / credit against a Leave Allocation is an append-only
+# Leave Ledger Entry linked to the document that caused it.
+# Leave Allocation.total_leaves_taken / leave_balance are a cached total
+# moved with atomic UPDATE … SET x = x + delta (never read-modify-write).
+# Callers state the desired net for their reference document, so re-running
+# a hook (on_change, repeated saves) never debits twice.
+
+LEDGER_DOCTYPE = "Leave Ledger Entry"
+
+
+def find_allocation(employee, leave_type, on_date=None):
+    """Approved allocation covering `on_date` (any approved allocation when no date)"""
+    filters = {
+        "employee": employee,
+        "leave_type": leave_type,
+        "status": "Approved"
+    }
+    if on_date:
+        filters.update({"from_date": ["<=", on_date], "to_date": [">=", on_date]})
+
+    return frappe.db.get_value("Leave Allocation", filters, "name", order_by="from_date desc")
+
+
+def get_reference_net(reference_doctype, reference_name):
+    """Net leaves currently debited for a reference document, per allocation"""
+    return {
+        row.leave_allocation: flt(row.leaves)
+        for row in frappe.db.sql("""
+            SELECT leave_allocation, SUM(leaves) AS leaves
+            FROM `tabLeave Ledger Entry`
+            WHERE reference_doctype = %s AND reference_name = %s
+            GROUP BY leave_allocation
+        """, (reference_doctype, reference_name), as_dict=True)
+    }
+
+
+def post_leave_entry(allocation, leaves, reference_doctype, reference_name, posting_date=None, remarks=None):
+    """
+    Move `leaves` (positive = debit, negative = credit) on an allocation.
+    The balance guard is part of the UPDATE, so concurrent approvals can never
+    overdraw or go below zero. Returns True if the entry was posted.
+    """
+    leaves = flt(leaves)
+    if not allocation or not leaves:
+        return False
+
+    frappe.db.sql("""
+        UPDATE `tabLeave Allocation`
+        SET leave_balance = IFNULL(leave_balance, 0) - %(leaves)s,
+            total_leaves_taken = IFNULL(total_leaves_taken, 0) + %(leaves)s
+        WHERE name = %(allocation)s
+        AND IFNULL(total_leaves_taken, 0) + %(leaves)s BETWEEN 0 AND IFNULL(total_leaves_allocated, 0)
+    """, {"leaves": leaves, "allocation": allocation})
+
+    # Rows matched by the guarded UPDATE itself (0 = guard failed)
+    if not frappe.db._cursor.rowcount:
+        return False
+
+    alloc = frappe.db.get_value("Leave Allocation", allocation, ["employee", "leave_type"], as_dict=True)
+    frappe.get_doc({
+        "doctype": LEDGER_DOCTYPE,
+        "employee": alloc.employee,
+        "leave_type": alloc.leave_type,
+        "leave_allocation": allocation,
+        "entry_type": "Debit" if leaves > 0 else "Credit",
+        "leaves": leaves,
+        "posting_date": posting_date or getdate(),
+        "reference_doctype": reference_doctype,
+        "reference_name": reference_name,
+        "remarks": remarks
+    }).insert(ignore_permissions=True)
+    return True
+
+
+def sync_reference_debit(reference_doctype, reference_name, allocation, desired, posting_date=None, remarks=None):
+    """
+    Make the net debit of a reference document equal `desired` on `allocation`
+    (and zero on any other allocation it touched before).
+    Returns the change applied on `allocation`.
+    """
+    current = get_reference_net(reference_doctype, reference_name)
+
+    # Give back anything posted against a different allocation (dates / type changed)
+    for other, net in current.items():
+        if other != allocation and net:
+            post_leave_entry(other, -net, reference_doctype, reference_name, posting_date, remarks)
+
+    delta = flt(desired) - current.get(allocation, 0)
+    if allocation and delta and post_leave_entry(allocation, delta, reference_doctype, reference_name, posting_date, remarks):
+        return delta
+    return 0
+
+
+def get_leave_balance(employee, leave_type, from_date, to_date):
+    """
+    Remaining balance on approved allocations overlapping the range —
+    a single indexed lookup on the cached balance.
+    """
+    return flt(frappe.db.sql("""
+        SELECT SUM(leave_balance)
+        FROM `tabLeave Allocation`
+        WHERE employee = %s AND leave_type = %s AND status = 'Approved'
+        AND from_date <= %s AND to_date >= %s
+    """, (employee, leave_type, getdate(to_date), getdate(from_date)))[0][0])
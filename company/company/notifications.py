@@ -0,0 +1,111 @@
+import frappe
+
+
+# HR Workflow Notifications
+# ----------------------------------------------------------------
+# Controller event (save / submit / workflow change / cancel)
+#  → queue_notification(doc, transition, method, **kwargs)
+#  → Kept in frappe.local, one entry per (doctype, name, transition)
+#  → After commit: one background job for everything queued in the request
+#  → Worker loads each doc once and calls doc.<method>(**kwargs)
+# Rolled back transactions send nothing.
+#
+# Anything that depends on the save itself (previous workflow state,
+# approver) is decided in the request and passed as kwargs — the worker
+# only sees the committed document.
+
+EMAIL_TEMPLATE_PATH = "company/templates/emails/{0}.html"
+STATE_COLORS = {
+    "#dc3545": "#fff5f5",
+    "#ffc107": "#fffdeb",
+    "#0062cc": "#f0f7ff"
+}
+
+_compiled_templates = {}
+
+
+def _pending():
+    if getattr(frappe.local, "company_notifications", None) is None:
+        frappe.local.company_notifications = {}
+        frappe.db.after_commit.add(_flush)
+        frappe.db.after_rollback.add(_discard)
+    return frappe.local.company_notifications
+
+
+def queue_notification(doc, transition, method, **kwargs):
+    """Send doc.<method>(**kwargs) after commit, once per (doc, transition)"""
+    _pending()[(doc.doctype, doc.name, transition)] = {
+        "doctype": doc.doctype,
+        "name": doc.name,
+        "transition": transition,
+        "method": method,
+        "kwargs": kwargs
+    }
+
+
+def _discard():
+    frappe.local.company_notifications = None
+
+
+def _flush():
+    items = list((getattr(frappe.local, "company_notifications", None) or {}).values())
+    frappe.local.company_notifications = None
+    if not items:
+        return
+
+    frappe.enqueue(
+        "company.company.notifications.deliver_notifications",
+        queue="short",
+        items=items
+    )
+
+
+def deliver_notifications(items):
+    docs = {}
+    for item in items:
+        key = (item["doctype"], item["name"])
+        try:
+            if key not in docs:
+                docs[key] = frappe.get_doc(*key)
+            getattr(docs[key], item["method"])(**(item.get("kwargs") or {}))
+        except Exception:
+            frappe.log_error(
+                frappe.get_traceback(),
+                f"Notification Error: {item['doctype']} {item['name']} ({item['transition']})"
+            )
+
+
+# =================== SHARED LOOKUPS ===================
+
+def get_user_contact(user=None):
+    """(full_name, email) of a user — one query"""
+    user = user or frappe.session.user
+    contact = frappe.db.get_value("User", user, ["full_name", "email"], as_dict=True) or {}
+    return contact.get("full_name"), contact.get("email")
+
+
+# =================== TEMPLATES ===================
+
+def render_email(template, context):
+    """Render company/templates/emails/<template>.html, compiling it once per process"""
+    compiled = _compiled_templates.get(template)
+    if compiled is None:
+        compiled = frappe.get_jenv().get_template(EMAIL_TEMPLATE_PATH.format(template))
+        _compiled_templates[template] = compiled
+    return compiled.render(context)
+
+
+def render_workflow_email(doc, header, intro, details, color="#28a745", icon="✅",
+                          extra_message="", button_label=None):
+    """Shared Leave Application / Request layout"""
+    return render_email("hr_workflow", {
+        "color": color,
+        "bg_color": STATE_COLORS.get(color, "#f0fff4"),
+        "icon": icon,
+        "header": header,
+        "intro": intro,
+        "details": details,
+        "extra_message": extra_message,
+        "url": frappe.utils.get_url(f"/app/{frappe.scrub(doc.doctype).replace('_', '-')}/{doc.name}"),
+        "button_label": button_label or f"View {doc.doctype}"
+    })
@@ -0,0 +1,121 @@
+import frappe
+from frappe.utils import flt, now
+
+
+# Purchase Payables
+# ----------------------------------------------------------------
+# Purchase.paid_amount / balance_amount / purchase_status follow the
+# Purchase Collections by delta instead of re-summing every collection:
+#  → Collection validate: lock the Purchase row (SELECT … FOR UPDATE),
+#    set amount_pending (balance after this payment)
+#  → Collection on_update: remove the saved row's amount, add the new one
+#  → Collection on_trash: remove the row's amount
+#  → Deltas are applied with UPDATE … SET paid_amount = paid_amount + delta,
+#    balance and status derived in the same statement
+# rebuild_purchase_payables re-sums history (bench execute / patch).
+
+PURCHASE_STATUS_SQL = """
+    CASE
+        WHEN IFNULL(paid_amount, 0) = 0 THEN 'Pending'
+        WHEN balance_amount > 0 THEN 'Partially Paid'
+        ELSE 'Fully Paid'
+    END
+"""
+
+
+def _get_deltas(doc):
+    """{purchase: amount change} of this save (the purchase itself may change)"""
+    deltas = {}
+    before = doc.get_doc_before_save() if not doc.is_new() else None
+    if before and before.purchase:
+        deltas[before.purchase] = -flt(before.amount_paid)
+    if doc.purchase:
+        deltas[doc.purchase] = deltas.get(doc.purchase, 0) + flt(doc.amount_paid)
+    return {purchase: delta for purchase, delta in deltas.items() if delta}
+
+
+def _lock_purchases(purchases):
+    """Lock Purchase rows (sorted, so two savers never wait on each other)"""
+    if not purchases:
+        return {}
+    return {
+        row.name: row
+        for row in frappe.db.sql("""
+            SELECT name, grand_total, paid_amount
+            FROM `tabPurchase`
+            WHERE name IN %s
+            ORDER BY name
+            FOR UPDATE
+        """, (tuple(sorted(purchases)),), as_dict=True)
+    }
+
+
+def apply_delta(purchase, delta):
+    """Atomically add `delta` to paid_amount and refresh balance_amount / purchase_status"""
+    if not purchase or not delta:
+        return
+
+    # MySQL applies SET left to right: later columns see the new paid_amount
+    frappe.db.sql(f"""
+        UPDATE `tabPurchase`
+        SET paid_amount = IFNULL(paid_amount, 0) + %s,
+            balance_amount = IFNULL(grand_total, 0) - paid_amount,
+            purchase_status = {PURCHASE_STATUS_SQL},
+            modified = %s
+        WHERE name = %s
+    """, (flt(delta), now(), purchase))
+
+
+# =================== DOC EVENT HOOKS ===================
+
+def validate_purchase_collection(doc, method=None):
+    """Hook: Purchase Collection validate — lock the Purchase and set amount_pending"""
+    if not doc.purchase:
+        return
+
+    deltas = _get_deltas(doc)
+    purchase = _lock_purchases(set(deltas) | {doc.purchase}).get(doc.purchase)
+    if not purchase:
+        return
+
+    paid = flt(purchase.paid_amount) + deltas.get(doc.purchase, 0)
+    doc.amount_pending = flt(purchase.grand_total) - paid
+
+
+def update_purchase_paid_balance(doc, method=None):
+    """Hook: Purchase Collection on_update — apply the amount change to the Purchase"""
+    for purchase, delta in _get_deltas(doc).items():
+        apply_delta(purchase, delta)
+
+
+def remove_purchase_collection(doc, method=None):
+    """Hook: Purchase Collection on_trash — take the amount off the Purchase"""
+    apply_delta(doc.purchase, -flt(doc.amount_paid))
+
+
+# =================== REBUILD ===================
+
+def rebuild_purchase_payables(purchases=None):
+    """
+    Recompute paid_amount, balance_amount and purchase_status from the
+    collections, for all purchases or the given list (one UPDATE … JOIN).
+    """
+    condition = "WHERE p.name IN %(purchases)s" if purchases else ""
+
+    frappe.db.sql(f"""
+        UPDATE `tabPurchase` p
+        LEFT JOIN (
+            SELECT purchase, SUM(amount_paid) AS total
+            FROM `tabPurchase Collection`
+            GROUP BY purchase
+        ) c ON c.purchase = p.name
+        SET p.paid_amount = IFNULL(c.total, 0),
+            p.balance_amount = IFNULL(p.grand_total, 0) - IFNULL(c.total, 0),
+            p.purchase_status = CASE
+                WHEN IFNULL(c.total, 0) = 0 THEN 'Pending'
+                WHEN IFNULL(p.grand_total, 0) - IFNULL(c.total, 0) > 0 THEN 'Partially Paid'
+                ELSE 'Fully Paid'
+            END
+        {condition}
+    """, {"purchases": tuple(purchases or ())})
+    frappe.db.commit()
@@ -0,0 +1,437 @@
+import frappe
+from frappe import _
+from frappe.utils import getdate, flt
+
+from datetime import timedelta
+from calendar import monthrange
+
+from company.company.utils import bulk_insert_docs
+
+
+# Workflow
+# ----------------------------------------------------------------
+# Generate Salary Slips (year, month, employees)
+#  → Load the whole month in bulk
+#       - existing slips for the period
+#       - attendance keyed by (employee, date)
+#       - approved leave allocations per (employee, leave type)
+#       - approved leave applications per (employee, leave type)
+#  → Compute present / LOP / paid leave days in memory
+#  → Bulk insert Salary Slip rows
+
+EMPLOYEE_PAY_FIELDS = [
+    "name", "employee_name", "basic_pay", "hra", "conveyance_allowances",
+    "medical_allowances", "other_allowances", "pf", "health_insurance",
+    "professional_tax", "loan_recovery", "email", "personal_email", "user"
+]
+
+
+def get_pay_period(year, month):
+    """Return (start_date, end_date) of the given payroll month"""
+    year = int(year)
+    month = int(month)
+    start_date = getdate(f"{year}-{month}-01")
+    end_date = getdate(f"{year}-{month}-{monthrange(year, month)[1]}")
+    return start_date, end_date
+
+
+def get_payroll_employees(employees=None):
+    """Fetch pay details for the selected employees (all employees if none selected)"""
+    employee_filters = {"name": ["in", employees]} if employees else {}
+
+    return frappe.get_all(
+        "Employee",
+        filters=employee_filters,
+        fields=EMPLOYEE_PAY_FIELDS
+    )
+
+
+def get_existing_slip_employees(employee_names, start_date, end_date):
+    """Employees that already have a Salary Slip for the pay period"""
+    if not employee_names:
+        return set()
+
+    return set(frappe.get_all(
+        "Salary Slip",
+        filters={
+            "employee": ["in", employee_names],
+            "pay_period_start": start_date,
+            "pay_period_end": end_date,
+        },
+        pluck="employee"
+    ))
+
+
+def load_month_context(employee_names, start_date, end_date):
+    """
+    Load everything needed to evaluate a payroll month in a fixed number of queries.
+
+    Returns a dict with:
+        attendance:   {(employee, date): attendance row}
+        allocations:  {(employee, leave_type): [allocation rows]}
+        applications: {(employee, leave_type): [(from_date, to_date)]}
+    """
+    attendance = {}
+    allocations = {}
+    applications = {}
+
+    if not employee_names:
+        return {"attendance": attendance, "allocations": allocations, "applications": applications}
+
+    # Attendance — first record wins, same as the old per-day scan
+    for row in frappe.get_all(
+        "Attendance",
+        filters={
+            "employee": ["in", employee_names],
+            "attendance_date": ["between", [start_date, end_date]],
+            "docstatus": ["in", [0, 1]]
+        },
+        fields=["employee", "status", "leave_type", "attendance_date"]
+    ):
+        attendance.setdefault((row.employee, getdate(row.attendance_date)), row)
+
+    # Approved allocations overlapping the month
+    for row in frappe.get_all(
+        "Leave Allocation",
+        filters={
+            "employee": ["in", employee_names],
+            "status": "Approved",
+            "from_date": ["<=", end_date],
+            "to_date": [">=", start_date]
+        },
+        fields=["name", "employee", "leave_type", "from_date", "to_date",
+                "total_leaves_allocated", "total_leaves_taken"]
+    ):
+        allocations.setdefault((row.employee, row.leave_type), []).append(row)
+
+    # Approved leave applications overlapping the month
+    for row in frappe.get_all(
+        "Leave Application",
+        filters={
+            "employee": ["in", employee_names],
+            "workflow_state": "Approved",
+            "from_date": ["<=", end_date],
+            "to_date": [">=", start_date]
+        },
+        fields=["employee", "leave_type", "from_date", "to_date"]
+    ):
+        applications.setdefault((row.employee, row.leave_type), []).append(
+            (getdate(row.from_date), getdate(row.to_date))
+        )
+
+    return {"attendance": attendance, "allocations": allocations, "applications": applications}
+
+
+def has_available_allocation(context, employee, leave_type, day):
+    """True if an approved allocation covering `day` still has balance"""
+    for a in context["allocations"].get((employee, leave_type), []):
+        if getdate(a.from_date) <= day <= getdate(a.to_date) \
+                and flt(a.total_leaves_taken) < flt(a.total_leaves_allocated):
+            return True
+    return False
+
+
+def has_approved_application(context, employee, leave_type, day):
+    """True if an approved Leave Application covers `day`"""
+    return any(
+        from_date <= day <= to_date
+        for from_date, to_date in context["applications"].get((employee, leave_type), [])
+    )
+
+
+def compute_leave_summary(employee, start_date, end_date, holiday_dates, context):
+    """
+    Walk the pay period for one employee and count present / absent / leave days.
+    Pure in-memory evaluation of the preloaded month context.
+    """
+    total_days = (end_date - start_date).days + 1
+    present_days = 0
+    absent_days = 0
+    paid_leave_days = 0
+    total_leave_days = 0
+
+    for single_day in [start_date + timedelta(days=i) for i in range(total_days)]:
+        if single_day in holiday_dates:
+            present_days += 1  # count holiday as present
+            continue
+
+        record = context["attendance"].get((employee, single_day))
+
+        if not record:
+            # No attendance record → absent
+            absent_days += 1
+            total_leave_days += 1
+            continue
+
+        status = record.get("status")
+        leave_type = record.get("leave_type")
+
+        if status == "Present":
+            present_days += 1
+
+        elif status == "Half Day":
+            total_leave_days += 0.5
+            if leave_type == "Unpaid Leave":
+                absent_days += 0.5  # unpaid leave
+            else:
+                present_days += 0.5
+                paid_leave_days += 0.5
+
+        elif status == "Absent":
+            absent_days += 1
+            total_leave_days += 1
+
+        elif status in ["On Leave", "Leave"] and leave_type:
+            total_leave_days += 1
+            if has_available_allocation(context, employee, leave_type, single_day) \
+                    or has_approved_application(context, employee, leave_type, single_day):
+                paid_leave_days += 1
+                present_days += 1
+            else:
+                absent_days += 1
+
+    return {
+        "total_days": total_days,
+        "present_days": present_days,
+        "absent_days": absent_days,
+        "paid_leave_days": paid_leave_days,
+        "total_leave_days": total_leave_days
+    }
+
+
+def build_salary_slip(emp, start_date, end_date, summary):
+    """Return the Salary Slip field values for one employee"""
+    working_days = summary["total_days"]
+    paid_leave_days = summary["paid_leave_days"]
+    total_leave_days = summary["total_leave_days"]
+    unpaid_leave_days = total_leave_days - paid_leave_days
+
+    # Earnings
+    gross_pay = (
+        flt(emp.basic_pay)
+        + flt(emp.hra)
+        + flt(emp.conveyance_allowances)
+        + flt(emp.medical_allowances)
+        + flt(emp.other_allowances)
+    )
+
+    # Deductions
+    base_deductions = (
+        flt(emp.pf)
+        + flt(emp.health_insurance)
+        + flt(emp.professional_tax)
+        + flt(emp.loan_recovery)
+    )
+
+    # Prorate based on attendance
+    grand_gross_pay = gross_pay * ((working_days - unpaid_leave_days) / working_days) if working_days else gross_pay
+    grand_net_pay = grand_gross_pay - base_deductions
+
+    lop_amount = gross_pay * (unpaid_leave_days / working_days) if working_days else 0
+
+    total_deductions = base_deductions + lop_amount
+
+    return {
+        "employee": emp.name,
+        "employee_name": emp.employee_name,
+        "email": emp.email,
+        "personal_email": emp.personal_email,
+        "pay_period_start": start_date,
+        "pay_period_end": end_date,
+        "no_of_leave": total_leave_days,
+        "no_of_paid_leave": paid_leave_days,
+        "gross_pay": gross_pay,
+        "grand_gross_pay": grand_gross_pay,
+        "net_pay": grand_gross_pay - base_deductions,
+        "grand_net_pay": grand_net_pay,
+        "total_deduction": total_deductions,
+        "total_working_days": working_days,
+        "lop": lop_amount,
+        "lop_days": unpaid_leave_days,
+        "basic_pay": emp.basic_pay,
+        "hra": emp.hra,
+        "conveyance_allowances": emp.conveyance_allowances,
+        "medical_allowances": emp.medical_allowances,
+        "other_allowances": emp.other_allowances,
+        "pf": emp.pf,
+        "health_insurance": emp.health_insurance,
+        "professional_tax": emp.professional_tax,
+        "loan_recovery": emp.loan_recovery
+    }
+
+
+def create_salary_slips(year, month, employees=None):
+    """
+    Set-based payroll run for one month.
+    Returns {"created": [...], "skipped": int, "errors": [...]}
+    """
+    from company.company.api import get_holiday_dates_for_month
+
+    start_date, end_date = get_pay_period(year, month)
+
+    holiday_dates = set(getdate(d) for d in get_holiday_dates_for_month(int(year), int(month)))
+
+    employee_rows = get_payroll_employees(employees)
+    employee_names = [e.name for e in employee_rows]
+
+    existing = get_existing_slip_employees(employee_names, start_date, end_date)
+    pending = [e for e in employee_rows if e.name not in existing]
+
+    context = load_month_context([e.name for e in pending], start_date, end_date)
+
+    slips = []
+    errors = []
+    for emp in pending:
+        try:
+            summary = compute_leave_summary(emp.name, start_date, end_date, holiday_dates, context)
+            slips.append(build_salary_slip(emp, start_date, end_date, summary))
+        except Exception as e:
+            errors.append(f"Error for {emp.name}: {str(e)}")
+
+    created = bulk_insert_docs("Salary Slip", slips)
+
+    return {
+        "created": created,
+        "skipped": len(existing),
+        "errors": errors
+    }
+
+
+# =================== BACKGROUND PAYROLL RUN ===================
+# Start Run (Payroll Entry / whitelisted call)
+#  → Split employees into shards of PAYROLL_BATCH_SIZE
+#  → Enqueue one RQ job per shard on the long queue
+#  → Each shard: create_salary_slips → commit → publish progress
+#  → Re-running a shard skips slips that already exist
+#  → Last shard fills the Payroll Entry employees table
+
+PAYROLL_BATCH_SIZE = 25
+PAYROLL_PROGRESS_EVENT = "payroll_progress"
+
+
+def _run_cache_key(run_id):
+    # Counters are plain redis integers (hincrby); read them back with
+    # hincrby(…, 0) — the pickling hget/hset wrappers use a different key
+    return frappe.cache().make_key(f"payroll_run|{run_id}")
+
+
+@frappe.whitelist()
+def start_payroll_run(year=None, month=None, employees=None, payroll_entry=None, batch_size=None):
+    """
+    Enqueue salary slip generation as background jobs sharded by employee batches.
+    Returns the run id and the number of shards queued.
+    """
+    import json
+
+    # Generation creates slips for every employee; same rule as creating one by hand
+    frappe.has_permission("Salary Slip", "create", throw=True)
+
+    if payroll_entry and (not year or not month):
+        start = frappe.db.get_value("Payroll Entry", payroll_entry, "pay_period_start")
+        if start:
+            start = getdate(start)
+            year, month = start.year, start.month
+
+    if not year or not month:
+        frappe.throw(_("Please provide year and month"))
+
+    if isinstance(employees, str):
+        try:
+            employees = json.loads(employees)
+        except Exception:
+            frappe.throw(_("Invalid employees data"))
+
+    if not employees:
+        employees = frappe.get_all("Employee", pluck="name")
+
+    batch_size = int(batch_size or PAYROLL_BATCH_SIZE)
+    shards = [employees[i:i + batch_size] for i in range(0, len(employees), batch_size)]
+
+    run_id = frappe.generate_hash(length=10)
+    cache = frappe.cache()
+    key = _run_cache_key(run_id)
+    cache.hincrby(key, "total", len(shards))
+    cache.expire(key, 24 * 60 * 60)
+
+    for index, shard in enumerate(shards):
+        frappe.enqueue(
+            "company.company.payroll.run_payroll_shard",
+            queue="long",
+            timeout=1500,
+            job_id=f"payroll::{year}-{month}::{run_id}::{index}",
+            deduplicate=True,
+            enqueue_after_commit=True,
+            year=int(year),
+            month=int(month),
+            employees=shard,
+            run_id=run_id,
+            shard_index=index,
+            payroll_entry=payroll_entry,
+            user=frappe.session.user
+        )
+
+    return {"run_id": run_id, "shards": len(shards), "employees": len(employees)}
+
+
+def run_payroll_shard(year, month, employees, run_id, shard_index, payroll_entry=None, user=None):
+    """
+    Generate slips for one employee batch and commit.
+    Safe to re-run: employees that already have a slip for the period are skipped.
+    """
+    try:
+        result = create_salary_slips(year, month, employees)
+        frappe.db.commit()
+    except Exception:
+        frappe.db.rollback()
+        frappe.log_error(frappe.get_traceback(), f"Payroll Shard {shard_index} Error ({run_id})")
+        result = {"created": [], "skipped": 0, "errors": [f"Shard {shard_index} failed"]}
+
+    cache = frappe.cache()
+    key = _run_cache_key(run_id)
+    cache.hincrby(key, "created", len(result["created"]))
+    cache.hincrby(key, "skipped", result["skipped"])
+    cache.hincrby(key, "failed", len(result["errors"]))
+    done = cache.hincrby(key, "done", 1)
+    total = cache.hincrby(key, "total", 0)
+
+    progress = {
+        "run_id": run_id,
+        "done": done,
+        "total": total,
+        "created": cache.hincrby(key, "created", 0),
+        "skipped": cache.hincrby(key, "skipped", 0),
+        "failed": cache.hincrby(key, "failed", 0),
+        "errors": result["errors"],
+        "completed": done >= total
+    }
+
+    if progress["completed"] and payroll_entry:
+        update_payroll_entry(payroll_entry, *get_pay_period(year, month))
+
+    publish_payroll_progress(progress, payroll_entry, user)
+
+
+def publish_payroll_progress(progress, payroll_entry=None, user=None):
+    """Push run progress to the Payroll Entry form (or to the user who started the run)"""
+    if payroll_entry:
+        frappe.publish_realtime(
+            PAYROLL_PROGRESS_EVENT,
+            progress,
+            doctype="Payroll Entry",
+            docname=payroll_entry,
+            after_commit=True
+        )
+    elif user:
+        frappe.publish_realtime(PAYROLL_PROGRESS_EVENT, progress, user=user, after_commit=True)
+
+
+def update_payroll_entry(payroll_entry, start_date, end_date):
+    """Fill the Payroll Entry employees table and totals from the generated slips"""
+    from company.company.api import fetch_salary_slips
+
+    doc = frappe.get_doc("Payroll Entry", payroll_entry)
+    doc.set("employees", fetch_salary_slips(start_date, end_date))
+    doc.total_gross_pay = sum(flt(r.get("gross_pay")) for r in doc.employees)
+    doc.total_net_pay = sum(flt(r.get("net_pay")) for r in doc.employees)
+    doc.save(ignore_permissions=True)
+    frappe.db.commit()
@@ -0,0 +1,117 @@
+import frappe
+from frappe.utils import now
+
+
+# Invoice ↔ Purchase Links
+# ----------------------------------------------------------------
+# An Invoice and a Purchase are linked from either side:
+#   Invoice.purchase_id / reference_purchase, Purchase.invoice_id / reference_invoice
+# (the controllers allow one Purchase per Invoice and vice versa).
+# Each linked pair is one Invoice Purchase Link row (name = invoice,
+# purchase unique) holding the purchase cost and the invoice's margin, so
+# reports join one indexed row instead of OR-ing the four columns.
+#  → Invoice / Purchase on_update: rewrite the pair's row (or drop it if unlinked)
+#  → Invoice / Purchase on_trash: drop the row
+# rebuild_invoice_purchase_links backfills history (patch / bench execute).
+
+LINK_DOCTYPE = "Invoice Purchase Link"
+
+
+def set_link(invoice, purchase):
+    """(Re)write the row of the pair from the current Invoice / Purchase figures"""
+    frappe.db.sql(f"""
+        DELETE FROM `tab{LINK_DOCTYPE}`
+        WHERE invoice = %(invoice)s OR purchase = %(purchase)s
+    """, {"invoice": invoice, "purchase": purchase})
+
+    frappe.db.sql(f"""
+        INSERT INTO `tab{LINK_DOCTYPE}`
+            (`name`, `owner`, `modified_by`, `creation`, `modified`, `docstatus`,
+             `invoice`, `purchase`, `bill_date`, `vendor_id`, `vendor_name`,
+             `purchase_business_person`, `sales_amount`, `purchase_amount_exclusive`,
+             `purchase_tax_amount`, `purchase_amount`, `gross_profit`, `margin_percent`)
+        SELECT
+            inv.name, %(user)s, %(user)s, %(now)s, %(now)s, 0,
+            inv.name, pur.name, pur.bill_date, pur.vendor_id, pur.vendor_name,
+            pur.business_person_name,
+            IFNULL(inv.grand_total, 0),
+            IFNULL(items.amount_exclusive, 0),
+            IFNULL(items.tax_amount, 0),
+            IFNULL(pur.grand_total, 0),
+            IFNULL(inv.grand_total, 0) - IFNULL(pur.grand_total, 0),
+            CASE
+                WHEN inv.grand_total > 0
+                THEN (inv.grand_total - IFNULL(pur.grand_total, 0)) / inv.grand_total * 100
+                ELSE 0
+            END
+        FROM `tabInvoice` inv
+        JOIN `tabPurchase` pur ON pur.name = %(purchase)s
+        LEFT JOIN (
+            SELECT parent, SUM(tax_amount) AS tax_amount, SUM(sub_total - tax_amount) AS amount_exclusive
+            FROM `tabPurchase Items`
+            WHERE parent = %(purchase)s
+            GROUP BY parent
+        ) items ON items.parent = pur.name
+        WHERE inv.name = %(invoice)s
+    """, {"invoice": invoice, "purchase": purchase, "user": frappe.session.user, "now": now()})
+
+
+def remove_links(invoice=None, purchase=None):
+    frappe.db.sql(f"""
+        DELETE FROM `tab{LINK_DOCTYPE}`
+        WHERE invoice = %(invoice)s OR purchase = %(purchase)s
+    """, {"invoice": invoice, "purchase": purchase})
+
+
+# =================== CONTROLLER HOOKS ===================
+
+def sync_invoice(doc):
+    """Invoice on_update"""
+    purchase = doc.purchase_id or doc.reference_purchase
+    if purchase:
+        set_link(doc.name, purchase)
+    else:
+        remove_links(invoice=doc.name)
+
+
+def sync_purchase(doc):
+    """Purchase on_update"""
+    invoice = doc.invoice_id or doc.reference_invoice
+    if invoice:
+        set_link(invoice, doc.name)
+    else:
+        remove_links(purchase=doc.name)
+
+
+# =================== REBUILD ===================
+
+def rebuild_invoice_purchase_links():
+    """
+    Rebuild every row from the four link columns. Where old data links an
+    invoice / purchase twice, the Invoice-side link wins, then the first seen.
+    """
+    pairs = frappe.db.sql("""
+        SELECT name AS invoice, purchase_id AS purchase FROM `tabInvoice`
+        WHERE IFNULL(purchase_id, '') != ''
+        UNION ALL
+        SELECT name, reference_purchase FROM `tabInvoice`
+        WHERE IFNULL(reference_purchase, '') != ''
+        UNION ALL
+        SELECT invoice_id, name FROM `tabPurchase`
+        WHERE IFNULL(invoice_id, '') != ''
+        UNION ALL
+        SELECT reference_invoice, name FROM `tabPurchase`
+        WHERE IFNULL(reference_invoice, '') != ''
+    """, as_dict=True)
+
+    frappe.db.sql(f"DELETE FROM `tab{LINK_DOCTYPE}`")
+
+    invoices, purchases = set(), set()
+    for pair in pairs:
+        if pair.invoice in invoices or pair.purchase in purchases:
+            continue
+        invoices.add(pair.invoice)
+        purchases.add(pair.purchase)
+        set_link(pair.invoice, pair.purchase)
+
+    frappe.db.commit()
@@ -0,0 +1,336 @@
+import frappe
+from frappe.utils import now_datetime, add_to_date
+
+import json
+import time
+import threading
+from datetime import datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor
+
+
+# Push Notifications (Firebase Cloud Messaging HTTP v1)
+# ----------------------------------------------------------------
+# enqueue_push (any request / doc event)
+#  → Insert Push Notification Queue row (Pending) in the caller's transaction
+#  → After commit: enqueue drain_push_queue (deduplicated: skipped while a drain is queued / running)
+# drain_push_queue (worker, also every minute from the scheduler)
+#  → Loop until no due rows are left or PUSH_DRAIN_SECONDS have passed:
+#    → Claim due Pending rows (FOR UPDATE SKIP LOCKED) → mark Sending → commit
+#    → Load FCM tokens for the batch in one query
+#    → POST concurrently over one pooled HTTP session (threads do HTTP only)
+#    → Sent / retry with exponential backoff / Failed after PUSH_MAX_ATTEMPTS
+#  → Anything left after the time budget (or queued while the last batch was
+#    sending) is picked up by the next per-minute run
+#
+# Credentials and the OAuth access token are cached per process and
+# refreshed only when they are about to expire.
+#
+# site_config:
+#   fcm_key_path   service account json (relative to the site)
+#   fcm_endpoint   optional base url, e.g. http://127.0.0.1:8900 for a local stub;
+#                  without fcm_key_path the stub gets a dummy bearer token
+
+QUEUE_DOCTYPE = "Push Notification Queue"
+FCM_ENDPOINT = "https://fcm.googleapis.com"
+FCM_SCOPES = ["https://www.googleapis.com/auth/firebase.messaging"]
+
+PUSH_BATCH_SIZE = 100
+PUSH_CONCURRENCY = 8
+PUSH_TIMEOUT = 10
+PUSH_MAX_ATTEMPTS = 5
+PUSH_BACKOFF_SECONDS = 30
+PUSH_MAX_BACKOFF_SECONDS = 60 * 60
+PUSH_STALE_SENDING_MINUTES = 10
+
+# A drain stops claiming new batches after this (short queue timeout is 300s)
+PUSH_DRAIN_SECONDS = 240
+
+# Token is refreshed when it has less than this left
+TOKEN_REFRESH_MARGIN = timedelta(minutes=5)
+
+# FCM error statuses that will never succeed on retry
+PERMANENT_ERRORS = {"INVALID_ARGUMENT", "NOT_FOUND", "UNREGISTERED", "PERMISSION_DENIED", "SENDER_ID_MISMATCH"}
+
+_lock = threading.Lock()
+_credentials = {}
+_session = None
+
+
+# =================== CREDENTIALS & SESSION ===================
+
+def _get_key_path():
+    key_relative = frappe.get_site_config().get("fcm_key_path")
+    return frappe.get_site_path(key_relative) if key_relative else None
+
+
+def get_credentials():
+    """Service account credentials, loaded from disk once per process and key file"""
+    key_path = _get_key_path()
+    if not key_path:
+        frappe.throw("FCM key path not configured in site_config.json (fcm_key_path)")
+
+    with _lock:
+        creds = _credentials.get(key_path)
+        if not creds:
+            from google.oauth2 import service_account
+
+            creds = service_account.Credentials.from_service_account_file(key_path, scopes=FCM_SCOPES)
+            _credentials[key_path] = creds
+    return creds
+
+
+def get_access_token():
+    """Return (access_token, project_id), refreshing the OAuth token only near expiry"""
+    if not _get_key_path() and frappe.get_site_config().get("fcm_endpoint"):
+        return "stub-token", frappe.get_site_config().get("fcm_project_id") or "stub"
+
+    creds = get_credentials()
+    with _lock:
+        expiry = creds.expiry
+        if not creds.token or not expiry or expiry - datetime.utcnow() < TOKEN_REFRESH_MARGIN:
+            import google.auth.transport.requests
+
+            creds.refresh(google.auth.transport.requests.Request(session=get_session()))
+    return creds.token, creds.project_id
+
+
+def get_session():
+    """One pooled HTTP session per process"""
+    global _session
+    if _session is None:
+        import requests
+        from requests.adapters import HTTPAdapter
+
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=PUSH_CONCURRENCY)
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        _session = session
+    return _session
+
+
+def build_message(token, title, body, data=None):
+    message = {
+        "message": {
+            "token": token,
+            "notification": {"title": title, "body": body}
+        }
+    }
+    if data:
+        # Optional custom data payload (FCM only accepts string values)
+        message["message"]["data"] = {k: str(v) for k, v in data.items()}
+    return message
+
+
+def get_endpoint():
+    return frappe.get_site_config().get("fcm_endpoint") or FCM_ENDPOINT
+
+
+def post_message(message, access_token, project_id, base_url=FCM_ENDPOINT):
+    """
+    Send one FCM v1 message. Safe to call from worker threads
+    (no frappe.local / frappe.db access — everything is passed in).
+    Returns {"ok": bool, "permanent": bool, "response": dict | None, "error": str | None}
+    """
+    import requests
+
+    url = f"{base_url}/v1/projects/{project_id}/messages:send"
+    headers = {
+        "Authorization": f"Bearer {access_token}",
+        "Content-Type": "application/json; UTF-8"
+    }
+
+    try:
+        resp = get_session().post(url, headers=headers, json=message, timeout=PUSH_TIMEOUT)
+    except requests.RequestException as e:
+        return {"ok": False, "permanent": False, "response": None, "error": str(e)}
+
+    try:
+        payload = resp.json()
+    except ValueError:
+        payload = {"error": "non-json-response", "status_code": resp.status_code, "text": resp.text}
+
+    if resp.ok:
+        return {"ok": True, "permanent": False, "response": payload, "error": None}
+
+    status = (payload.get("error") or {}).get("status") if isinstance(payload.get("error"), dict) else None
+    return {
+        "ok": False,
+        # 429 / 5xx are retried; other 4xx are not
+        "permanent": status in PERMANENT_ERRORS or (400 <= resp.status_code < 500 and resp.status_code != 429),
+        "response": payload,
+        "error": f"{resp.status_code} {status or ''}".strip(),
+        "unregistered": status in {"UNREGISTERED", "NOT_FOUND"}
+    }
+
+
+def send_to_token(token, title, body, data=None):
+    """Synchronous send (cached credentials, pooled session). Returns the FCM response JSON."""
+    access_token, project_id = get_access_token()
+    result = post_message(build_message(token, title, body, data), access_token, project_id, get_endpoint())
+    return result["response"] or {"error": result["error"]}
+
+
+# =================== OUTBOX ===================
+
+def enqueue_push(user, title, body, data=None, reference_doctype=None, reference_name=None):
+    """Queue a push notification for a user; delivery happens after commit in a worker"""
+    if not user:
+        return
+
+    queue = frappe.get_doc({
+        "doctype": QUEUE_DOCTYPE,
+        "user": user,
+        "title": title,
+        "body": body,
+        "data": json.dumps(data) if data else None,
+        "status": "Pending",
+        "attempts": 0,
+        "next_attempt_at": now_datetime(),
+        "reference_doctype": reference_doctype,
+        "reference_name": reference_name
+    })
+    queue.insert(ignore_permissions=True)
+
+    schedule_drain()
+    return queue.name
+
+
+def schedule_drain():
+    frappe.enqueue(
+        "company.company.push.drain_push_queue",
+        queue="short",
+        job_id="push_queue_drain",
+        deduplicate=True,
+        enqueue_after_commit=True
+    )
+
+
+def get_backoff(attempts):
+    return min(PUSH_BACKOFF_SECONDS * (2 ** max(attempts - 1, 0)), PUSH_MAX_BACKOFF_SECONDS)
+
+
+def _claim_batch(limit):
+    now = now_datetime()
+
+    # Rows left in Sending by a crashed worker go back to Pending
+    frappe.db.sql(f"""
+        UPDATE `tab{QUEUE_DOCTYPE}`
+        SET status = 'Pending'
+        WHERE status = 'Sending' AND modified < %s
+    """, add_to_date(now, minutes=-PUSH_STALE_SENDING_MINUTES))
+
+    rows = frappe.db.sql(f"""
+        SELECT name, user, title, body, data, attempts
+        FROM `tab{QUEUE_DOCTYPE}`
+        WHERE status = 'Pending' AND next_attempt_at <= %s
+        ORDER BY next_attempt_at
+        LIMIT %s
+        FOR UPDATE SKIP LOCKED
+    """, (now, int(limit)), as_dict=True)
+
+    if rows:
+        frappe.db.sql(f"""
+            UPDATE `tab{QUEUE_DOCTYPE}`
+            SET status = 'Sending', modified = %s
+            WHERE name IN %s
+        """, (now, tuple(r.name for r in rows)))
+    frappe.db.commit()
+    return rows
+
+
+def _update_row(name, values):
+    frappe.db.set_value(QUEUE_DOCTYPE, name, values, update_modified=True)
+
+
+def drain_push_queue(limit=PUSH_BATCH_SIZE):
+    """Deliver due notifications batch after batch until none are left (or the time budget is used)"""
+    deadline = time.monotonic() + PUSH_DRAIN_SECONDS
+    sent = 0
+
+    while True:
+        rows = _claim_batch(limit)
+        if not rows:
+            return sent
+
+        batch_sent = _send_batch(rows)
+        if batch_sent is None:
+            # Credentials problem: the batch is back in backoff, stop here
+            return sent
+        sent += batch_sent
+
+        if len(rows) < int(limit) or time.monotonic() >= deadline:
+            return sent
+
+
+def _send_batch(rows):
+    """Send claimed rows; None if no access token could be obtained"""
+    tokens = dict(frappe.get_all(
+        "User",
+        filters={"name": ["in", list({r.user for r in rows})]},
+        fields=["name", "fcm_token"],
+        as_list=True
+    ))
+
+    try:
+        access_token, project_id = get_access_token()
+    except Exception as e:
+        # Credentials problem: put the whole batch back with backoff
+        frappe.log_error(frappe.get_traceback(), "FCM Credentials Error")
+        for row in rows:
+            _schedule_retry(row, str(e))
+        frappe.db.commit()
+        return None
+
+    base_url = get_endpoint()
+    sendable = [r for r in rows if tokens.get(r.user)]
+    for row in rows:
+        if not tokens.get(row.user):
+            _update_row(row.name, {"status": "Failed", "last_error": f"No FCM token for user {row.user}"})
+
+    def send(row):
+        data = json.loads(row.data) if row.data else None
+        message = build_message(tokens[row.user], row.title, row.body, data)
+        return post_message(message, access_token, project_id, base_url)
+
+    with ThreadPoolExecutor(max_workers=PUSH_CONCURRENCY) as pool:
+        results = list(pool.map(send, sendable))
+
+    sent = 0
+    for row, result in zip(sendable, results):
+        if result["ok"]:
+            sent += 1
+            _update_row(row.name, {
+                "status": "Sent",
+                "attempts": row.attempts + 1,
+                "sent_at": now_datetime(),
+                "last_error": None
+            })
+        elif result["permanent"]:
+            _update_row(row.name, {
+                "status": "Failed",
+                "attempts": row.attempts + 1,
+                "last_error": f"{result['error']}: {result['response']}"
+            })
+            if result.get("unregistered"):
+                # Stale device token; the browser saves a fresh one on next login
+                frappe.db.set_value("User", row.user, "fcm_token", None, update_modified=False)
+        else:
+            _schedule_retry(row, result["error"])
+
+    frappe.db.commit()
+    return sent
+
+
+def _schedule_retry(row, error):
+    attempts = row.attempts + 1
+    if attempts >= PUSH_MAX_ATTEMPTS:
+        _update_row(row.name, {"status": "Failed", "attempts": attempts, "last_error": error})
+        return
+
+    _update_row(row.name, {
+        "status": "Pending",
+        "attempts": attempts,
+        "last_error": error,
+        "next_attempt_at": add_to_date(now_datetime(), seconds=get_backoff(attempts))
+    })
@@ -0,0 +1,147 @@
+import frappe
+from frappe import _
+from frappe.utils import flt, now
+
+
+# Invoice Receivables
+# ----------------------------------------------------------------
+# Invoice.received_amount / balance_amount follow the Invoice Collections
+# by delta instead of re-summing every collection of the invoice:
+#  → Collection validate: lock the Invoice row (SELECT … FOR UPDATE),
+#    refuse over-collection, set amount_pending (balance after this one)
+#  → Collection on_update: remove the saved row's amount, add the new one
+#  → Collection on_trash: remove the row's amount
+#  → Deltas are applied with UPDATE … SET received_amount = received_amount + delta
+# The row lock is held until commit, so concurrent collections on the
+# same invoice are checked one after another.
+# reconcile_invoice_balances (daily) re-sums and fixes any drift.
+
+
+def _get_deltas(doc):
+    """{invoice: amount change} of this save (the invoice itself may change)"""
+    deltas = {}
+    before = doc.get_doc_before_save() if not doc.is_new() else None
+    if before and before.invoice:
+        deltas[before.invoice] = -flt(before.amount_collected)
+    if doc.invoice:
+        deltas[doc.invoice] = deltas.get(doc.invoice, 0) + flt(doc.amount_collected)
+    return {invoice: delta for invoice, delta in deltas.items() if delta}
+
+
+def _lock_invoices(invoices):
+    """Lock Invoice rows (sorted, so two savers never wait on each other)"""
+    if not invoices:
+        return {}
+    return {
+        row.name: row
+        for row in frappe.db.sql("""
+            SELECT name, grand_total, received_amount
+            FROM `tabInvoice`
+            WHERE name IN %s
+            ORDER BY name
+            FOR UPDATE
+        """, (tuple(sorted(invoices)),), as_dict=True)
+    }
+
+
+def apply_delta(invoice, delta):
+    """Atomically add `delta` to received_amount and refresh balance_amount"""
+    if not invoice or not delta:
+        return
+
+    # MySQL applies SET left to right: balance_amount sees the new received_amount
+    frappe.db.sql("""
+        UPDATE `tabInvoice`
+        SET received_amount = IFNULL(received_amount, 0) + %s,
+            balance_amount = GREATEST(IFNULL(grand_total, 0) - received_amount, 0),
+            modified = %s
+        WHERE name = %s
+    """, (flt(delta), now(), invoice))
+
+
+# =================== DOC EVENT HOOKS ===================
+
+def validate_invoice_collection(doc, method=None):
+    """Hook: Invoice Collection validate — prevent collecting more than the Invoice grand_total"""
+    if not doc.invoice:
+        return
+
+    deltas = _get_deltas(doc)
+    invoices = _lock_invoices(set(deltas) | {doc.invoice})
+    invoice = invoices.get(doc.invoice)
+    if not invoice:
+        return
+
+    received = flt(invoice.received_amount)
+    new_total = received + deltas.get(doc.invoice, 0)
+    already_collected = new_total - flt(doc.amount_collected)
+
+    if flt(new_total, 2) > flt(invoice.grand_total, 2):
+        frappe.throw(
+            f"Collection exceeds Invoice Amount.<br><br>"
+            f"Grand Total: {invoice.grand_total}<br>"
+            f"Already Collected: {already_collected}<br>"
+            f"Trying to Add: {doc.amount_collected}<br><br>"
+            f"Remaining Balance: {flt(invoice.grand_total) - already_collected}"
+        )
+
+    # Balance right after this collection (kept as history on the row)
+    doc.amount_pending = max(flt(invoice.grand_total) - new_total, 0)
+
+
+def update_invoice_received_balance(doc, method=None):
+    """Hook: Invoice Collection on_update — apply the amount change to the Invoice"""
+    for invoice, delta in _get_deltas(doc).items():
+        apply_delta(invoice, delta)
+
+
+def remove_invoice_collection(doc, method=None):
+    """Hook: Invoice Collection on_trash — take the amount off the Invoice"""
+    apply_delta(doc.invoice, -flt(doc.amount_collected))
+
+
+# =================== RECONCILE ===================
+
+def reconcile_invoice_balances(invoices=None):
+    """
+    Scheduler (daily) / bench execute: compare received_amount with the sum of
+    collections and fix any invoice that drifted. Returns the invoices fixed.
+    """
+    condition = "AND i.name IN %(invoices)s" if invoices else ""
+
+    drifted = frappe.db.sql(f"""
+        SELECT i.name, i.received_amount, i.balance_amount,
+            IFNULL(c.total, 0) AS collected,
+            GREATEST(IFNULL(i.grand_total, 0) - IFNULL(c.total, 0), 0) AS balance
+        FROM `tabInvoice` i
+        LEFT JOIN (
+            SELECT invoice, SUM(amount_collected) AS total
+            FROM `tabInvoice Collection`
+            GROUP BY invoice
+        ) c ON c.invoice = i.name
+        WHERE (
+            ROUND(IFNULL(i.received_amount, 0) - IFNULL(c.total, 0), 2) != 0
+            OR ROUND(IFNULL(i.balance_amount, 0) - GREATEST(IFNULL(i.grand_total, 0) - IFNULL(c.total, 0), 0), 2) != 0
+        )
+        {condition}
+    """, {"invoices": tuple(invoices or ())}, as_dict=True)
+
+    for row in drifted:
+        frappe.db.sql("""
+            UPDATE `tabInvoice`
+            SET received_amount = %s, balance_amount = %s
+            WHERE name = %s
+        """, (row.collected, row.balance, row.name))
+
+    if drifted:
+        frappe.db.commit()
+        frappe.log_error(
+            "\n".join(
+                f"{r.name}: received {flt(r.received_amount)} → {flt(r.collected)}, "
+                f"balance {flt(r.balance_amount)} → {flt(r.balance)}"
+                for r in drifted
+            ),
+            _("Invoice balances reconciled ({0})").format(len(drifted))
+        )
+
+    return [r.name for r in drifted]
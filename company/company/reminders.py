@@ -1,6 +1,8 @@
 import frappe
 from frappe.utils import now_datetime, add_to_date, format_datetime, format_date, get_url_to_form, get_datetime
 
+from company.company.settings import get_reminder_settings, DEFAULT_REMIND_BEFORE_MINUTES
+
 
 # Workflow
 # ----------------------------------------------------------------
@@ -9,12 +11,34 @@ from frappe.utils import now_datetime, add_to_date, format_datetime, format_date
 #  → Calculate trigger_at
 #  → If trigger_at <= now < call_start_time → trigger_at = now
 #  → Create / Update Reminder Queue
-#  → Cron picks Pending Queue
-#  → Email sent
-#  → Queue marked Sent
+#  → After commit: ZADD queue name into the Redis schedule (score = trigger_at)
+#  → Dispatcher (every minute) reads due names (ZRANGEBYSCORE), hands them
+#    to a short-queue job and ZREMs them only once the job is enqueued
+#  → Job claims the rows (FOR UPDATE SKIP LOCKED) → Processing → commit
+#  → Calls / Meetings of the batch loaded in one query per doctype
+#  → Emails queued
+#  → One UPDATE for Sent rows, one for Failed rows (attempts + backoff)
+#  → Failed rows go back into the schedule at next_attempt_at until REMINDER_MAX_ATTEMPTS
+# Hourly: the schedule is re-seeded from the table (Redis flush, lost jobs);
+# the dispatcher also re-seeds as soon as the seeded marker is gone.
+# Both keys match persistent_cache_keys (hooks.py), so clear-cache keeps them.
 
 logger = frappe.logger("reminder")
 
+REMINDER_SCHEDULE_KEY = "reminder_schedule"
+REMINDER_SEEDED_KEY = "reminder_schedule_seeded"
+REMINDER_BATCH_SIZE = 50
+REMINDER_MAX_ATTEMPTS = 5
+REMINDER_BACKOFF_MINUTES = 5
+REMINDER_MAX_BACKOFF_MINUTES = 6 * 60
+REMINDER_STALE_MINUTES = 15
+
+# Columns the reminder emails read from each reference doctype
+REMINDER_SOURCES = {
+    "Calls": ["name", "title", "call_start_time", "outgoing_call_status"],
+    "Meeting": ["name", "title", "from", "outgoing_call_status"]
+}
+
 def get_remind_before_minutes(doc=None):
     """
     Priority:
@@ -30,12 +54,12 @@ def get_remind_before_minutes(doc=None):
             return int(value)
 
     # 2️⃣ Global setting
-    settings = frappe.get_single("Reminder Settings")
-    if settings.default_remind_before_minutes is not None:
-        return int(settings.default_remind_before_minutes)
+    default = get_reminder_settings().default_remind_before_minutes
+    if default is not None:
+        return default
 
     # 3️⃣ Fallback
-    return 15
+    return DEFAULT_REMIND_BEFORE_MINUTES
 
 
 def handle_call_reminder(call):
@@ -65,17 +89,7 @@ def get_reminder_emails():
     """
     Fetch email recipients from Reminder Settings → Email To
     """
-    settings = frappe.get_single("Reminder Settings")
-
-    emails = []
-
-    for row in settings.email_to:
-        if row.user:
-            email = frappe.db.get_value("User", row.user, "email")
-            if email:
-                emails.append(email)
-
-    return list(set(emails))  # remove duplicates
+    return list(get_reminder_settings().reminder_emails)
 
 def get_call_trigger_at(call):
     start = get_datetime(call.call_start_time)
@@ -85,14 +99,13 @@ def get_call_trigger_at(call):
 
 
 def delete_pending_queue(doctype, name):
-    frappe.db.delete(
-        "Reminder Queue",
-        {
-            "reference_doctype": doctype,
-            "reference_name": name,
-            "status": ["!=", "Sent"],
-        }
-    )
+    filters = {
+        "reference_doctype": doctype,
+        "reference_name": name,
+        "status": ["!=", "Sent"],
+    }
+    unschedule_reminders(frappe.get_all("Reminder Queue", filters=filters, pluck="name"))
+    frappe.db.delete("Reminder Queue", filters)
 
 
 def create_or_update_call_queue(call):
@@ -129,70 +142,216 @@ def create_or_update_call_queue(call):
         "attempts": 0,
     })
     queue.insert(ignore_permissions=True)
+    schedule_reminder(queue.name, queue_trigger)
 
 
-def run_email_reminders():
-    now = now_datetime()
-    logger.info(f"[CRON] Reminder job started at {now}")
-
-    queues = frappe.get_all(
-        "Reminder Queue",
-        filters={
-            "status": "Pending",
-            "trigger_at": ["<=", now],
-        },
-        fields=["name", "trigger_at", "reference_doctype", "reference_name"]
-    )
+# =================== SCHEDULE ===================
 
-    logger.info(f"[CRON] Eligible reminders: {len(queues)}")
+def _schedule_key():
+    return frappe.cache().make_key(REMINDER_SCHEDULE_KEY)
 
-    for q in queues:
-        logger.info(
-            f"[CRON] Processing {q.name} | trigger_at={q.trigger_at}"
-        )
-        if q.reference_doctype == "Calls":
-            process_call_queue_item(q)
-        elif q.reference_doctype == "Meeting":
-            process_meet_queue_item(q)
 
+def schedule_reminder(name, at):
+    """Add / move a queue row in the schedule once the transaction commits (O(log n))"""
+    score = get_datetime(at).timestamp()
+    frappe.db.after_commit.add(lambda: frappe.cache().zadd(_schedule_key(), {name: score}))
 
-def process_call_queue_item(queue_row):
 
-    queue = frappe.get_doc("Reminder Queue", queue_row.name)
+def unschedule_reminders(names):
+    if names:
+        frappe.db.after_commit.add(lambda: frappe.cache().zrem(_schedule_key(), *names))
 
-    # Avoid double-processing
-    if queue.status != "Pending":
-        return
-
-    try:
-        queue.db_set("status", "Processing")
 
-        doc = frappe.get_doc(
-            queue.reference_doctype,
-            queue.reference_name
+def _get_due(limit):
+    """Due names, left in the schedule until their job is enqueued"""
+    return [
+        m.decode() if isinstance(m, bytes) else m
+        for m in frappe.cache().zrangebyscore(
+            _schedule_key(), "-inf", now_datetime().timestamp(), start=0, num=limit
+        )
+    ]
+
+
+def dispatch_due_reminders():
+    """Cron (every minute): hand off every reminder that is due"""
+    if not frappe.cache().get_value(REMINDER_SEEDED_KEY):
+        # Schedule lost (Redis flush / restart): rebuild it before dispatching
+        run_email_reminders()
+
+    while True:
+        names = _get_due(REMINDER_BATCH_SIZE)
+        if not names:
+            return
+
+        # An enqueue failure leaves the names scheduled for the next run;
+        # a job that is lost later is covered by the hourly re-seed
+        frappe.enqueue(
+            "company.company.reminders.deliver_due_reminders",
+            queue="short",
+            at_front=True,
+            names=names
         )
+        removed = frappe.cache().zrem(_schedule_key(), *names)
 
-        if queue.reference_doctype == "Calls":
-            recipients = [r for r in queue.recipients.split(",") if r]
-            send_call_email(doc, recipients)
+        if len(names) < REMINDER_BATCH_SIZE or not removed:
+            return
 
-        else:
-            raise Exception(
-                f"Unsupported reference_doctype: {queue.reference_doctype}"
-            )
 
-        queue.db_set({
-            "status": "Sent",
-            "sent_at": now_datetime(),
-        })
+def deliver_due_reminders(names):
+    rows = _claim_reminders(names)
+    if rows:
+        logger.info(f"[REMINDER] delivering {len(rows)} reminders")
+        _deliver(rows)
+
 
-    except Exception as e:
-        queue.db_set({
-            "status": "Failed",
-            "attempts": (queue.attempts or 0) + 1,
-            "last_error": str(e),
+def run_email_reminders():
+    """Hourly: re-seed the schedule from every row that still has to be sent"""
+    rows = frappe.db.sql("""
+        SELECT name, trigger_at AS due_at FROM `tabReminder Queue`
+        WHERE status = 'Pending' AND trigger_at IS NOT NULL
+        UNION ALL
+        SELECT name, next_attempt_at AS due_at FROM `tabReminder Queue`
+        WHERE status = 'Failed' AND attempts < %s AND next_attempt_at IS NOT NULL
+    """, REMINDER_MAX_ATTEMPTS, as_dict=True)
+
+    logger.info(f"[CRON] Reminder schedule re-seeded with {len(rows)} rows")
+
+    cache = frappe.cache()
+    key = _schedule_key()
+    for start in range(0, len(rows), 500):
+        cache.zadd(key, {
+            row.name: get_datetime(row.due_at).timestamp()
+            for row in rows[start:start + 500]
         })
+    cache.set_value(REMINDER_SEEDED_KEY, 1)
+
+
+def get_backoff_minutes(attempts):
+    return min(REMINDER_BACKOFF_MINUTES * (2 ** max(attempts - 1, 0)), REMINDER_MAX_BACKOFF_MINUTES)
+
+
+def _claim_reminders(names):
+    """Lock the given rows that are still Pending / Failed and mark them Processing"""
+    now = now_datetime()
+
+    # Rows left in Processing by a killed worker are picked up again
+    frappe.db.sql("""
+        UPDATE `tabReminder Queue`
+        SET status = 'Pending'
+        WHERE status = 'Processing' AND modified < %s
+    """, add_to_date(now, minutes=-REMINDER_STALE_MINUTES))
+
+    rows = frappe.db.sql("""
+        SELECT name, reference_doctype, reference_name, recipients, attempts
+        FROM `tabReminder Queue`
+        WHERE name IN %s AND status IN ('Pending', 'Failed')
+        ORDER BY trigger_at
+        FOR UPDATE SKIP LOCKED
+    """, (tuple(names),), as_dict=True)
+
+    if rows:
+        frappe.db.sql("""
+            UPDATE `tabReminder Queue`
+            SET status = 'Processing', modified = %s
+            WHERE name IN %s
+        """, (now, tuple(r.name for r in rows)))
+    frappe.db.commit()
+    return rows
+
+
+def _prefetch_references(rows):
+    """{(doctype, name): row} for every Call / Meeting in the batch, one query per doctype"""
+    names_by_doctype = {}
+    for row in rows:
+        names_by_doctype.setdefault(row.reference_doctype, set()).add(row.reference_name)
+
+    docs = {}
+    for doctype, names in names_by_doctype.items():
+        fields = REMINDER_SOURCES.get(doctype)
+        if not fields:
+            continue
+
+        for doc in frappe.db.sql(f"""
+            SELECT {", ".join(f"`{f}`" for f in fields)}
+            FROM `tab{doctype}`
+            WHERE name IN %s
+        """, (tuple(names),), as_dict=True):
+            docs[(doctype, doc.name)] = doc
+    return docs
+
+
+def _send_reminder(row, doc):
+    if row.reference_doctype not in REMINDER_SOURCES:
+        raise Exception(f"Unsupported reference_doctype: {row.reference_doctype}")
+    if not doc:
+        raise Exception(f"{row.reference_doctype} {row.reference_name} not found")
+
+    recipients = [r for r in (row.recipients or "").split(",") if r]
+    if row.reference_doctype == "Calls":
+        send_call_email(doc, recipients)
+    else:
+        send_meet_email(doc, recipients)
+
 
+def _mark_sent(names):
+    if not names:
+        return
+
+    now = now_datetime()
+    frappe.db.sql("""
+        UPDATE `tabReminder Queue`
+        SET status = 'Sent', sent_at = %s, modified = %s,
+            attempts = IFNULL(attempts, 0) + 1, last_error = NULL, next_attempt_at = NULL
+        WHERE name IN %s
+    """, (now, now, tuple(names)))
+
+
+def _mark_failed(failures):
+    """failures: [(row, error)] — attempts + 1, retry at now + backoff while attempts remain"""
+    if not failures:
+        return
+
+    now = now_datetime()
+    error_cases, retry_cases, values_error, values_retry = [], [], [], []
+    for row, error in failures:
+        attempts = (row.attempts or 0) + 1
+        error_cases.append("WHEN %s THEN %s")
+        values_error.extend([row.name, error[:1000]])
+
+        retry_at = None
+        if attempts < REMINDER_MAX_ATTEMPTS:
+            retry_at = add_to_date(now, minutes=get_backoff_minutes(attempts))
+            schedule_reminder(row.name, retry_at)
+
+        retry_cases.append("WHEN %s THEN %s")
+        values_retry.extend([row.name, retry_at])
+
+    frappe.db.sql(f"""
+        UPDATE `tabReminder Queue`
+        SET status = 'Failed', modified = %s,
+            attempts = IFNULL(attempts, 0) + 1,
+            last_error = CASE name {" ".join(error_cases)} END,
+            next_attempt_at = CASE name {" ".join(retry_cases)} END
+        WHERE name IN %s
+    """, [now, *values_error, *values_retry, tuple(row.name for row, _ in failures)])
+
+
+def _deliver(rows):
+    docs = _prefetch_references(rows)
+
+    sent, failures = [], []
+    for row in rows:
+        try:
+            _send_reminder(row, docs.get((row.reference_doctype, row.reference_name)))
+            sent.append(row.name)
+        except Exception as e:
+            logger.error(f"[REMINDER] {row.name} failed: {e}")
+            failures.append((row, str(e)))
+
+    _mark_sent(sent)
+    _mark_failed(failures)
+    frappe.db.commit()
+    return len(sent)
 
 
 def send_call_email(call, recipients):
@@ -449,45 +608,9 @@ def create_or_update_meet_queue(meet):
         "attempts": 0,
     })
     queue.insert(ignore_permissions=True)
+    schedule_reminder(queue.name, queue_trigger)
 
 
-def process_meet_queue_item(queue_row):
-
-    queue = frappe.get_doc("Reminder Queue", queue_row.name)
-
-    # Avoid double-processing
-    if queue.status != "Pending":
-        return
-
-    try:
-        queue.db_set("status", "Processing")
-
-        doc = frappe.get_doc(
-            queue.reference_doctype,
-            queue.reference_name
-        )
-
-        if queue.reference_doctype == "Meeting":
-            recipients = [r for r in queue.recipients.split(",") if r]
-            send_meet_email(doc, recipients)
-
-        else:
-            raise Exception(
-                f"Unsupported reference_doctype: {queue.reference_doctype}"
-            )
-
-        queue.db_set({
-            "status": "Sent",
-            "sent_at": now_datetime(),
-        })
-
-    except Exception as e:
-        queue.db_set({
-            "status": "Failed",
-            "attempts": (queue.attempts or 0) + 1,
-            "last_error": str(e),
-        })
-
 def send_meet_email(meet, recipients):
     if not recipients:
         raise Exception("No reminder recipients configured")
@@ -677,29 +800,24 @@ def get_meet_reminder_html(meet):
 """
 
 
-@frappe.whitelist()
-def force_send_call_queue(queue_name):
-    queue = frappe.get_doc("Reminder Queue", queue_name)
-
-    if queue.status == "Sent":
+def force_send_queue(queue_name):
+    if frappe.db.get_value("Reminder Queue", queue_name, "status") == "Sent":
         frappe.throw("Reminder already sent")
 
-    # Override trigger time
-    queue.db_set("trigger_at", now_datetime())
+    # Process immediately (skipped if a worker holds it right now)
+    rows = _claim_reminders([queue_name])
+    if not rows:
+        frappe.throw("Reminder is already being processed")
 
-    # Process immediately
-    process_call_queue_item(queue)
+    unschedule_reminders([queue_name])
+    _deliver(rows)
 
 
 @frappe.whitelist()
-def force_send_meet_queue(queue_name):
-    queue = frappe.get_doc("Reminder Queue", queue_name)
-
-    if queue.status == "Sent":
-        frappe.throw("Reminder already sent")
+def force_send_call_queue(queue_name):
+    force_send_queue(queue_name)
 
-    # Override trigger time
-    queue.db_set("trigger_at", now_datetime())
 
-    # Process immediately
-    process_meet_queue_item(queue)
+@frappe.whitelist()
+def force_send_meet_queue(queue_name):
+    force_send_queue(queue_name)
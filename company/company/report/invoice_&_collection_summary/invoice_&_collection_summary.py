@@ -151,18 +151,13 @@ def get_data(filters, is_export=False):
     first_invoice_map = {}
     
     if customer_ids:
-        first_records = frappe.db.sql("""
-            SELECT customer_id, name as first_invoice
-            FROM `tabInvoice`
-            WHERE (customer_id, creation) IN (
-                SELECT customer_id, MIN(creation)
-                FROM `tabInvoice`
-                WHERE customer_id IN %s
-                GROUP BY customer_id
-            )
-        """, (customer_ids,), as_dict=True)
-        for r in first_records:
-            first_invoice_map[r.customer_id] = r.first_invoice
+        # Kept on Customer by the Invoice hooks (company.company.customers)
+        first_invoice_map = dict(frappe.get_all(
+            "Customer",
+            filters={"name": ["in", customer_ids]},
+            fields=["name", "first_invoice"],
+            as_list=True
+        ))
 
     # Calculate running balance per invoice
     for d in raw_data:
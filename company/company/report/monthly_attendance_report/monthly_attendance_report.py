@@ -3,6 +3,9 @@ from frappe.utils import getdate
 from frappe import _
 from datetime import date, timedelta
 
+from company.company.holidays import get_holiday_list_name, get_holidays_between
+from company.company.attendance_summary import get_monthly_summaries
+
 def execute(filters=None):
     if not filters:
         filters = {}
@@ -22,41 +25,8 @@ def execute(filters=None):
     year = int(filters.get("year") or today.year)
     employee_filter = filters.get("employee")
 
-    # --- Get Attendance records ---
-    conditions = "MONTH(attendance_date) = %s AND YEAR(attendance_date) = %s"
-    values = [month, year]
-
-    if employee_filter:
-        conditions += " AND employee = %s"
-        values.append(employee_filter)
-
-    attendance_records = frappe.db.sql(
-        f"""
-        SELECT
-            a.employee,
-            e.employee_name,
-            a.status,
-            a.half_day_status,
-            a.in_time,
-            a.out_time
-        FROM `tabAttendance` a
-        LEFT JOIN `tabEmployee` e ON e.name = a.employee
-        WHERE {conditions}
-        """,
-        values,
-        as_dict=True
-    )
-
-    # --- Helper functions ---
-    def td_to_minutes(td):
-        """Convert timedelta/time to minutes"""
-        if not td:
-            return 0
-        if isinstance(td, str):
-            # if frappe returns time as string, convert manually
-            h, m, s = map(int, td.split(":"))
-            return h * 60 + m
-        return td.total_seconds() / 60
+    # --- Get monthly attendance summary (one row per employee) ---
+    summaries = get_monthly_summaries(year, month, employee_filter)
 
     def minutes_to_hhmm(minutes):
         """Convert minutes to HH:MM string"""
@@ -68,53 +38,22 @@ def execute(filters=None):
     start_date = date(year, month, 1)
     end_date = date(year, month + 1, 1) - timedelta(days=1) if month != 12 else date(year, 12, 31)
 
-    holiday_list = frappe.db.get_value("Holiday List", {"year": year, "month_year": str(month)}, "name")
-
-    holidays = set()
-    if holiday_list:
-        holiday_dates = frappe.db.sql(
-            """
-            SELECT holiday_date
-            FROM `tabHolidays`
-            WHERE parent = %s AND holiday_date BETWEEN %s AND %s AND is_working_day = 0
-            """,
-            (holiday_list, start_date, end_date),
-            as_dict=True
-        )
-        holidays = {h.holiday_date for h in holiday_dates}
+    holiday_list = get_holiday_list_name(year, month)
+    holidays = get_holidays_between(start_date, end_date)
 
     total_days_in_month = (end_date - start_date).days + 1
     total_holidays = len(holidays)
     company_working_days = total_days_in_month - total_holidays
     expected_working_minutes = company_working_days * 9 * 60  # 9 hours/day
 
-    # --- Aggregate attendance data ---
-    employee_data = {}
-
-    for a in attendance_records:
-        minutes = 0
-        if a.status in ["Absent", "On Leave"]:
-            minutes = 0
-        elif a.in_time and a.out_time:
-            start_minutes = td_to_minutes(a.in_time)
-            end_minutes = td_to_minutes(a.out_time)
-            if end_minutes < start_minutes:
-                end_minutes += 24 * 60
-            total_minutes = int(end_minutes - start_minutes)
-            if a.status == "Half Day" and a.half_day_status == "Present":
-                total_minutes /= 2
-            minutes = total_minutes
-
-        if a.employee not in employee_data:
-            employee_data[a.employee] = {
-                "employee_name": a.employee_name,
-                "total_minutes": 0,
-                "total_days": 0
-            }
-
-        employee_data[a.employee]["total_minutes"] += minutes
-        if minutes > 0:
-            employee_data[a.employee]["total_days"] += 1
+    employee_data = {
+        row.employee: {
+            "employee_name": row.employee_name,
+            "total_minutes": row.worked_minutes or 0,
+            "total_days": row.worked_days or 0
+        }
+        for row in summaries
+    }
 
     # --- Prepare columns ---
     columns = [
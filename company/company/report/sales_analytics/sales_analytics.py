@@ -151,20 +151,13 @@ def execute(filters=None):
     # 2. Map each customer to their FIRST EVER invoice ID
     first_invoice_map = {}
     if customer_ids:
-        # Optimization: Fetch min creation/name for each customer in one go
-        first_records = frappe.db.sql("""
-            SELECT customer_id, name as first_invoice
-            FROM `tabInvoice`
-            WHERE (customer_id, creation) IN (
-                SELECT customer_id, MIN(creation)
-                FROM `tabInvoice`
-                WHERE customer_id IN %s
-                GROUP BY customer_id
-            )
-        """, (customer_ids,), as_dict=True)
-        
-        for r in first_records:
-            first_invoice_map[r.customer_id] = r.first_invoice
+        # Kept on Customer by the Invoice hooks (company.company.customers)
+        first_invoice_map = dict(frappe.get_all(
+            "Customer",
+            filters={"name": ["in", customer_ids]},
+            fields=["name", "first_invoice"],
+            as_list=True
+        ))
 
     # 3. Apply labels and badges
     for i, row in enumerate(data, start=(1 if is_export else offset + 1)):
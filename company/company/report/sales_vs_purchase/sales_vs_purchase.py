@@ -37,18 +37,13 @@ def execute(filters=None):
     customer_ids = list(set([row.customer_id for row in data if row.customer_id]))
     first_invoice_map = {}
     if customer_ids:
-        first_records = frappe.db.sql("""
-            SELECT customer_id, name as first_invoice
-            FROM `tabInvoice`
-            WHERE (customer_id, creation) IN (
-                SELECT customer_id, MIN(creation)
-                FROM `tabInvoice`
-                WHERE customer_id IN %s
-                GROUP BY customer_id
-            )
-        """, (customer_ids,), as_dict=True)
-        for r in first_records:
-            first_invoice_map[r.customer_id] = r.first_invoice
+        # Kept on Customer by the Invoice hooks (company.company.customers)
+        first_invoice_map = dict(frappe.get_all(
+            "Customer",
+            filters={"name": ["in", customer_ids]},
+            fields=["name", "first_invoice"],
+            as_list=True
+        ))
 
     # Apply row numbers and badges
     for i, row in enumerate(data, start=(1 if is_export else offset + 1)):
@@ -109,13 +104,11 @@ def get_columns():
 def get_data(filters, limit=None, offset=None):
     conditions, values = get_conditions(filters)
     
-    # Main logic: Link Invoices and Purchases using UNION to catch both directions
-    # Then group by Invoice to handle Many-to-One and One-to-Many
+    # One Invoice Purchase Link row per linked pair (name = invoice) holds the
+    # purchase cost and margin, so no grouping over tabPurchase is needed
     
     limit_clause = f"LIMIT {limit} OFFSET {offset}" if limit is not None else ""
 
-    having_clause = "HAVING SUM(CASE WHEN pur.name IS NOT NULL THEN 1 ELSE 0 END) > 0" if filters.get("only_linked") else ""
-
     query = f"""
         SELECT 
             inv.name as invoice_no,
@@ -126,36 +119,26 @@ def get_data(filters, limit=None, offset=None):
             inv_totals.amount_exclusive,
             inv_totals.total_tax_amount,
             inv.grand_total as sales_amount,
-            GROUP_CONCAT(DISTINCT pur.name) as purchase_nos,
-            GROUP_CONCAT(DISTINCT pur.bill_date) as purchase_dates,
-            GROUP_CONCAT(DISTINCT pur.vendor_name) as vendor_names,
-            SUM(COALESCE(pur_totals.pur_excl, 0)) as purchase_amount_exclusive,
-            SUM(COALESCE(pur_totals.pur_tax, 0)) as purchase_total_tax_amount,
-            SUM(COALESCE(pur.grand_total, 0)) as purchase_amount,
-            (inv.grand_total - SUM(COALESCE(pur.grand_total, 0))) as gross_profit,
-            CASE 
-                WHEN inv.grand_total > 0 THEN ((inv.grand_total - SUM(COALESCE(pur.grand_total, 0))) / inv.grand_total) * 100
-                ELSE 0 
-            END as margin_percent,
+            link.purchase as purchase_nos,
+            link.bill_date as purchase_dates,
+            link.vendor_name as vendor_names,
+            COALESCE(link.purchase_amount_exclusive, 0) as purchase_amount_exclusive,
+            COALESCE(link.purchase_tax_amount, 0) as purchase_total_tax_amount,
+            COALESCE(link.purchase_amount, 0) as purchase_amount,
+            COALESCE(link.gross_profit, inv.grand_total) as gross_profit,
+            COALESCE(link.margin_percent, CASE WHEN inv.grand_total > 0 THEN 100 ELSE 0 END) as margin_percent,
             sbp.business_person_name as sales_business_person,
-            GROUP_CONCAT(DISTINCT pbp.business_person_name) as purchase_business_person
+            pbp.business_person_name as purchase_business_person
         FROM `tabInvoice` inv
         LEFT JOIN (
             SELECT parent, SUM(tax_amount) as total_tax_amount, SUM(sub_total - tax_amount) as amount_exclusive
             FROM `tabInvoice Items`
             GROUP BY parent
         ) inv_totals ON inv_totals.parent = inv.name
-        LEFT JOIN `tabPurchase` pur ON (pur.reference_invoice = inv.name OR pur.invoice_id = inv.name OR inv.purchase_id = pur.name OR inv.reference_purchase = pur.name)
-        LEFT JOIN (
-            SELECT parent, SUM(tax_amount) as pur_tax, SUM(sub_total - tax_amount) as pur_excl
-            FROM `tabPurchase Items`
-            GROUP BY parent
-        ) pur_totals ON pur_totals.parent = pur.name
+        LEFT JOIN `tabInvoice Purchase Link` link ON link.invoice = inv.name
         LEFT JOIN `tabBusiness Person` sbp ON sbp.name = inv.business_person_name
-        LEFT JOIN `tabBusiness Person` pbp ON pbp.name = pur.business_person_name
+        LEFT JOIN `tabBusiness Person` pbp ON pbp.name = link.purchase_business_person
         {conditions}
-        GROUP BY inv.name
-        {having_clause}
         ORDER BY inv.invoice_date DESC, inv.creation DESC
         {limit_clause}
     """
@@ -201,11 +184,11 @@ def get_conditions(filters):
         vendor = filters["vendor"]
         if isinstance(vendor, list):
             placeholders = ", ".join([f"%(vendor_{i})s" for i in range(len(vendor))])
-            conditions.append(f"EXISTS (SELECT name FROM `tabPurchase` p WHERE (p.reference_invoice = inv.name OR p.invoice_id = inv.name OR inv.purchase_id = p.name OR inv.reference_purchase = p.name) AND p.vendor_id IN ({placeholders}))")
+            conditions.append(f"link.vendor_id IN ({placeholders})")
             for i, v in enumerate(vendor):
                 values[f"vendor_{i}"] = v
         else:
-            conditions.append(f"EXISTS (SELECT name FROM `tabPurchase` p WHERE (p.reference_invoice = inv.name OR p.invoice_id = inv.name OR inv.purchase_id = p.name OR inv.reference_purchase = p.name) AND p.vendor_id = %(vendor)s)")
+            conditions.append("link.vendor_id = %(vendor)s")
             values["vendor"] = vendor
 
     if filters.get("sales_business_person"):
@@ -213,67 +196,47 @@ def get_conditions(filters):
         values["sales_business_person"] = filters["sales_business_person"]
 
     if filters.get("purchase_business_person"):
-        conditions.append(f"EXISTS (SELECT name FROM `tabPurchase` p WHERE (p.reference_invoice = inv.name OR p.invoice_id = inv.name OR inv.purchase_id = p.name OR inv.reference_purchase = p.name) AND p.business_person_name = %(purchase_business_person)s)")
+        conditions.append("link.purchase_business_person = %(purchase_business_person)s")
         values["purchase_business_person"] = filters["purchase_business_person"]
 
+    if filters.get("only_linked"):
+        conditions.append("link.name IS NOT NULL")
+
     where_clause = "WHERE " + " AND ".join(conditions) if conditions else ""
     return where_clause, values
 
 
 def get_total_count(filters):
     conditions, values = get_conditions(filters)
-    having_clause = "HAVING SUM(CASE WHEN pur.name IS NOT NULL THEN 1 ELSE 0 END) > 0" if filters.get("only_linked") else ""
     return frappe.db.sql(f"""
-        SELECT COUNT(*) FROM (
-            SELECT inv.name 
-            FROM `tabInvoice` inv 
-            LEFT JOIN `tabPurchase` pur ON (pur.reference_invoice = inv.name OR pur.invoice_id = inv.name OR inv.purchase_id = pur.name OR inv.reference_purchase = pur.name)
-            {conditions} 
-            GROUP BY inv.name
-            {having_clause}
-        ) as sub
+        SELECT COUNT(*)
+        FROM `tabInvoice` inv 
+        LEFT JOIN `tabInvoice Purchase Link` link ON link.invoice = inv.name
+        {conditions}
     """, values)[0][0]
 
 
 def get_report_summary(filters):
     conditions, values = get_conditions(filters)
-    having_clause = "HAVING SUM(CASE WHEN pur.name IS NOT NULL THEN 1 ELSE 0 END) > 0" if filters.get("only_linked") else ""
     
-    # We need to sum up based on the grouped view
     totals = frappe.db.sql(f"""
         SELECT 
-            SUM(sales_amount) as total_sales,
-            SUM(amount_exclusive) as total_sales_excl_tax,
-            SUM(total_tax_amount) as total_tax,
-            SUM(purchase_amount_exclusive) as total_purchase_excl_tax,
-            SUM(purchase_total_tax_amount) as total_purchase_tax,
-            SUM(purchase_amount) as total_purchase,
-            SUM(gross_profit) as total_profit
-        FROM (
-            SELECT 
-                inv.grand_total as sales_amount,
-                inv_totals.amount_exclusive,
-                inv_totals.total_tax_amount,
-                SUM(COALESCE(pur_totals.pur_excl, 0)) as purchase_amount_exclusive,
-                SUM(COALESCE(pur_totals.pur_tax, 0)) as purchase_total_tax_amount,
-                SUM(COALESCE(pur.grand_total, 0)) as purchase_amount,
-                (inv.grand_total - SUM(COALESCE(pur.grand_total, 0))) as gross_profit
-            FROM `tabInvoice` inv
-            LEFT JOIN (
-                SELECT parent, SUM(tax_amount) as total_tax_amount, SUM(sub_total - tax_amount) as amount_exclusive
-                FROM `tabInvoice Items`
-                GROUP BY parent
-            ) inv_totals ON inv_totals.parent = inv.name
-            LEFT JOIN `tabPurchase` pur ON (pur.reference_invoice = inv.name OR pur.invoice_id = inv.name OR inv.purchase_id = pur.name OR inv.reference_purchase = pur.name)
-            LEFT JOIN (
-                SELECT parent, SUM(tax_amount) as pur_tax, SUM(sub_total - tax_amount) as pur_excl
-                FROM `tabPurchase Items`
-                GROUP BY parent
-            ) pur_totals ON pur_totals.parent = pur.name
-            {conditions}
-            GROUP BY inv.name
-            {having_clause}
-        ) as sub
+            SUM(inv.grand_total) as total_sales,
+            SUM(inv_totals.amount_exclusive) as total_sales_excl_tax,
+            SUM(inv_totals.total_tax_amount) as total_tax,
+            SUM(COALESCE(link.purchase_amount_exclusive, 0)) as total_purchase_excl_tax,
+            SUM(COALESCE(link.purchase_tax_amount, 0)) as total_purchase_tax,
+            SUM(COALESCE(link.purchase_amount, 0)) as total_purchase,
+            SUM(COALESCE(link.gross_profit, inv.grand_total)) as total_profit,
+            COUNT(*) as total_count
+        FROM `tabInvoice` inv
+        LEFT JOIN (
+            SELECT parent, SUM(tax_amount) as total_tax_amount, SUM(sub_total - tax_amount) as amount_exclusive
+            FROM `tabInvoice Items`
+            GROUP BY parent
+        ) inv_totals ON inv_totals.parent = inv.name
+        LEFT JOIN `tabInvoice Purchase Link` link ON link.invoice = inv.name
+        {conditions}
     """, values, as_dict=True)[0]
 
     total_sales = totals.total_sales or 0
@@ -286,7 +249,7 @@ def get_report_summary(filters):
     avg_margin = (total_profit / total_sales * 100) if total_sales > 0 else 0
 
     return [
-        {"label": "Total Invoice and Purchase", "value": get_total_count(filters), "indicator": "green", "datatype": "Int"},
+        {"label": "Total Invoice and Purchase", "value": totals.total_count or 0, "indicator": "green", "datatype": "Int"},
         
         {"label": "Total Sales (Excl. Tax)", "value": total_sales_excl_tax, "indicator": "blue", "datatype": "Currency"},
         {"label": "Total Sales Tax", "value": total_tax, "indicator": "blue", "datatype": "Currency"},
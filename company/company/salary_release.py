@@ -0,0 +1,255 @@
+import frappe
+from frappe import _
+from frappe.utils import now_datetime, formatdate
+
+import time
+
+
+# Salary Slip Release
+# ----------------------------------------------------------------
+# Submit (approve) a slip
+#  → release_status = Queued (one UPDATE) → enqueue a release drain after commit
+# Release Payroll (Payroll Entry button / whitelisted call)
+#  → Queue every submitted, unreleased slip of the period
+#  → Enqueue RELEASE_WORKERS drain jobs so the rq workers render in parallel
+# Drain (long queue, deduplicated per worker: skipped while that worker's job is queued / running)
+#  → Loop until nothing is Queued or RELEASE_DRAIN_SECONDS have passed:
+#    → Claim RELEASE_BATCH_SIZE Queued slips (FOR UPDATE SKIP LOCKED) → Processing
+#    → Per slip: Notification Log + push + PDF render + Email Queue
+#    → Sent / Failed (with error) committed per slip
+# Sweep (scheduler, every 5 minutes)
+#  → Slips still Queued (time budget used, or queued while a drain was
+#    finishing) → start drains again
+
+RELEASE_BATCH_SIZE = 20
+RELEASE_WORKERS = 4
+RELEASE_STALE_MINUTES = 30
+
+# A drain stops claiming new batches after this (job timeout is 1500s)
+RELEASE_DRAIN_SECONDS = 1200
+
+
+def queue_slip_release(doc, method=None):
+    """Hook: Salary Slip on_submit — only flags the slip, all work runs in a worker"""
+    doc.db_set({"release_status": "Queued", "release_error": None}, update_modified=False)
+    schedule_release_drain()
+
+
+def schedule_release_drain(worker=0):
+    frappe.enqueue(
+        "company.company.salary_release.process_release_queue",
+        queue="long",
+        timeout=1500,
+        job_id=f"salary_slip_release::{worker}",
+        deduplicate=True,
+        enqueue_after_commit=True,
+        worker=worker
+    )
+
+
+@frappe.whitelist()
+def release_payroll(year=None, month=None, payroll_entry=None, slips=None, resend=0):
+    """
+    Queue release (notification, push, PDF email) for submitted salary slips
+    of a pay period / Payroll Entry / explicit list. Already released slips are
+    skipped unless `resend` is set.
+    """
+    from company.company.payroll import get_pay_period
+
+    # Releasing mails every slip of the period; only payroll editors may trigger it
+    frappe.has_permission("Salary Slip", "write", throw=True)
+
+    filters = {"docstatus": 1}
+
+    if slips:
+        filters["name"] = ["in", frappe.parse_json(slips) if isinstance(slips, str) else slips]
+    else:
+        if payroll_entry:
+            start, end = frappe.db.get_value(
+                "Payroll Entry", payroll_entry, ["pay_period_start", "pay_period_end"]
+            )
+        elif year and month:
+            start, end = get_pay_period(year, month)
+        else:
+            frappe.throw(_("Please provide a Payroll Entry, year and month, or salary slips"))
+
+        filters.update({"pay_period_start": [">=", start], "pay_period_end": ["<=", end]})
+
+    if not frappe.utils.cint(resend):
+        filters["release_status"] = ["not in", ["Sent", "Processing"]]
+
+    names = frappe.get_all("Salary Slip", filters=filters, pluck="name")
+    if not names:
+        return {"queued": 0}
+
+    frappe.db.sql("""
+        UPDATE `tabSalary Slip`
+        SET release_status = 'Queued', release_error = NULL
+        WHERE name IN %s
+    """, (tuple(names),))
+
+    schedule_release_drains(len(names))
+    return {"queued": len(names)}
+
+
+def schedule_release_drains(count):
+    """Enough drain workers for `count` queued slips (at most RELEASE_WORKERS)"""
+    for worker in range(min(RELEASE_WORKERS, -(-int(count) // RELEASE_BATCH_SIZE))):
+        schedule_release_drain(worker)
+
+
+def sweep_release_queue():
+    """Scheduler: restart drains for slips left Queued (or stuck in Processing)"""
+    count = frappe.db.count("Salary Slip", {
+        "docstatus": 1,
+        "release_status": ["in", ["Queued", "Processing"]]
+    })
+    if count:
+        schedule_release_drains(count)
+
+
+def _claim_slips(limit):
+    # Slips stuck in Processing (worker killed) are queued again;
+    # released_on holds the claim time while a slip is Processing
+    frappe.db.sql("""
+        UPDATE `tabSalary Slip`
+        SET release_status = 'Queued'
+        WHERE release_status = 'Processing'
+        AND released_on < %s
+    """, frappe.utils.add_to_date(now_datetime(), minutes=-RELEASE_STALE_MINUTES))
+
+    names = [r[0] for r in frappe.db.sql("""
+        SELECT name FROM `tabSalary Slip`
+        WHERE docstatus = 1 AND release_status = 'Queued'
+        ORDER BY creation
+        LIMIT %s
+        FOR UPDATE SKIP LOCKED
+    """, int(limit))]
+
+    if names:
+        frappe.db.sql("""
+            UPDATE `tabSalary Slip`
+            SET release_status = 'Processing', released_on = %s
+            WHERE name IN %s
+        """, (now_datetime(), tuple(names)))
+    frappe.db.commit()
+    return names
+
+
+def process_release_queue(worker=0, batch_size=RELEASE_BATCH_SIZE):
+    """Release queued slips batch after batch until none are left (or the time budget is used)"""
+    deadline = time.monotonic() + RELEASE_DRAIN_SECONDS
+    released = 0
+
+    while True:
+        names = _claim_slips(batch_size)
+        if not names:
+            return released
+
+        released += _release_batch(names)
+
+        if len(names) < int(batch_size) or time.monotonic() >= deadline:
+            return released
+
+
+def _release_batch(names):
+    slips = frappe.get_all(
+        "Salary Slip",
+        filters={"name": ["in", names]},
+        fields=["name", "employee", "employee_name", "pay_period_start", "email", "personal_email"]
+    )
+    users = dict(frappe.get_all(
+        "Employee",
+        filters={"name": ["in", list({s.employee for s in slips})]},
+        fields=["name", "user"],
+        as_list=True
+    ))
+    print_format = frappe.get_meta("Salary Slip").default_print_format or "Standard"
+
+    released = 0
+    for slip in slips:
+        try:
+            release_slip(slip, users.get(slip.employee), print_format)
+            frappe.db.set_value("Salary Slip", slip.name, {
+                "release_status": "Sent",
+                "released_on": now_datetime(),
+                "release_error": None
+            }, update_modified=False)
+            frappe.db.commit()
+            released += 1
+        except Exception as e:
+            frappe.db.rollback()
+            frappe.log_error(frappe.get_traceback(), f"Salary Slip Release Error ({slip.name})")
+            frappe.db.set_value("Salary Slip", slip.name, {
+                "release_status": "Failed",
+                "release_error": str(e)[:500]
+            }, update_modified=False)
+            frappe.db.commit()
+
+    return released
+
+
+def release_slip(slip, user, print_format):
+    """Notification Log, push and PDF email for one slip"""
+    from company.company.push import enqueue_push
+
+    month_year = formatdate(slip.pay_period_start, "MMMM yyyy")
+
+    if user:
+        frappe.get_doc({
+            "doctype": "Notification Log",
+            "subject": f"Salary Slip for {month_year}",
+            "email_content": f"Your salary slip for {month_year} has been approved.",
+            "for_user": user,
+            "document_type": "Salary Slip",
+            "document_name": slip.name,
+            "from_user": frappe.session.user,
+            "type": "Alert",
+            "seen": 0,
+        }).insert(ignore_permissions=True)
+
+        enqueue_push(
+            user,
+            title=f"Salary Slip for {month_year}",
+            body=f"Your salary slip for {month_year} has been approved successfully.",
+            data={"salary_slip": slip.name},
+            reference_doctype="Salary Slip",
+            reference_name=slip.name
+        )
+
+    recipients = [e for e in (slip.email, slip.personal_email) if e]
+    if not recipients:
+        return
+
+    pdf_content = frappe.get_print("Salary Slip", slip.name, print_format=print_format, as_pdf=True)
+
+    frappe.sendmail(
+        recipients=recipients,
+        subject=f"Salary Slip for {month_year}",
+        message=get_release_email(slip.employee_name, month_year),
+        attachments=[{
+            "fname": f"Salary_Slip_{slip.employee}_{month_year}.pdf",
+            "fcontent": pdf_content
+        }],
+        reference_doctype="Salary Slip",
+        reference_name=slip.name
+    )
+
+
+def get_release_email(employee_name, month_year):
+    return f"""
+    <div style="font-family: 'Montserrat', 'Segoe UI', Arial, sans-serif; background:#f4f6f8; padding:30px;">
+        <div style="max-width:600px; margin:auto; background:white; border-radius:12px;
+                    box-shadow:0 2px 8px rgba(0,0,0,0.08); overflow:hidden;">
+            <div style="background:#007bff; color:white; padding:18px 24px; font-size:18px; font-weight:600; text-align:center;">
+                Your Salary Slip for {month_year}
+            </div>
+            <div style="padding:24px; color:#333; font-size:14px; line-height:1.6;">
+                <p>Dear <b>{employee_name}</b>,</p>
+                <p>Your salary slip for <b>{month_year}</b> has been Released. Please find the attached PDF below.</p>
+                <p style="margin-top:20px;">Best regards,<br>
+                <b style="color:#007bff;">HR Team</b></p>
+            </div>
+        </div>
+    </div>
+    """
@@ -0,0 +1,94 @@
+import frappe
+from frappe.utils import getdate, cint
+
+
+# Document Number Series
+# ----------------------------------------------------------------
+# <prefix>/<FY>/<###> numbers for Invoice, Estimation and Expenses,
+# FY = April → March ("25-26").
+#
+# One counter row per (prefix, FY) in tabSeries, key "IB-I/25-26/":
+#   allocate_number  → UPDATE current = LAST_INSERT_ID(current + 1)
+#                      (row lock held until commit, so concurrent saves
+#                       get distinct numbers; a rollback returns the number)
+#   preview_number   → plain read of current + 1, nothing reserved
+# A missing row is seeded once from the highest number already saved
+# for that prefix / FY.
+
+SERIES = {
+    "Invoice": {"prefix": "IB-I", "fieldname": "ref_no"},
+    "Estimation": {"prefix": "IB-E", "fieldname": "ref_no"},
+    "Expenses": {"prefix": "EXP", "fieldname": "expense_no"}
+}
+
+SERIES_DIGITS = 3
+
+
+def get_fy_label(on_date=None):
+    """Financial year (April → March) as "25-26" """
+    on_date = getdate(on_date)
+    start_year = on_date.year if on_date.month >= 4 else on_date.year - 1
+    return f"{str(start_year)[-2:]}-{str(start_year + 1)[-2:]}"
+
+
+def _get_series(doctype):
+    series = SERIES.get(doctype)
+    if not series:
+        frappe.throw(f"No number series for {doctype}")
+    return series
+
+
+def _series_key(doctype, on_date=None):
+    return f"{_get_series(doctype)['prefix']}/{get_fy_label(on_date)}/"
+
+
+def _format(key, number):
+    return f"{key}{str(number).zfill(SERIES_DIGITS)}"
+
+
+def _get_saved_max(doctype, key):
+    """Highest number already used for the prefix / FY (range scan on the unique field)"""
+    fieldname = _get_series(doctype)["fieldname"]
+    result = frappe.db.sql(f"""
+        SELECT MAX(CAST(SUBSTRING_INDEX(`{fieldname}`, '/', -1) AS UNSIGNED))
+        FROM `tab{doctype}`
+        WHERE `{fieldname}` LIKE %s
+    """, (f"{key}%",))
+    return cint(result[0][0]) if result else 0
+
+
+def _get_current(key):
+    result = frappe.db.sql("SELECT current FROM `tabSeries` WHERE name = %s", (key,))
+    return cint(result[0][0]) if result else None
+
+
+def preview_number(doctype, on_date=None):
+    """Next number of the series without reserving it"""
+    key = _series_key(doctype, on_date)
+    current = _get_current(key)
+    if current is None:
+        current = _get_saved_max(doctype, key)
+    return _format(key, current + 1)
+
+
+def allocate_number(doctype, on_date=None):
+    """Reserve and return the next number of the series (atomic per prefix / FY)"""
+    key = _series_key(doctype, on_date)
+
+    if _get_current(key) is None:
+        # Two first saves may both seed; INSERT IGNORE keeps one row
+        frappe.db.sql(
+            "INSERT IGNORE INTO `tabSeries` (name, current) VALUES (%s, %s)",
+            (key, _get_saved_max(doctype, key))
+        )
+
+    frappe.db.sql(
+        "UPDATE `tabSeries` SET current = LAST_INSERT_ID(current + 1) WHERE name = %s",
+        (key,)
+    )
+    return _format(key, cint(frappe.db.sql("SELECT LAST_INSERT_ID()")[0][0]))
+
+
+def set_series_number(doc):
+    """before_insert: assign the series number (a previewed value on the form is replaced)"""
+    doc.set(_get_series(doc.doctype)["fieldname"], allocate_number(doc.doctype))
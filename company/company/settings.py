@@ -0,0 +1,154 @@
+import frappe
+from frappe.utils import getdate, cint
+
+
+# Settings
+# ----------------------------------------------------------------
+# Config doctypes read on hot paths, cached in one Redis hash:
+#   email           Company Email Settings (+ parsed CC list)
+#   reminder        Reminder Settings (+ recipient emails resolved in one query)
+#   flash_messages  enabled Flash Messages by date (+ allowed users)
+# frappe.cache().hget also keeps the value in frappe.local for the request.
+# Cleared from the doctypes' on_update / on_trash (and User email changes).
+
+SETTINGS_CACHE_KEY = "company_settings"
+
+DEFAULT_REMIND_BEFORE_MINUTES = 15
+
+
+def _get(field, generator):
+    return frappe.cache().hget(SETTINGS_CACHE_KEY, field, generator=generator)
+
+
+def split_emails(value):
+    if not value:
+        return []
+    return [e.strip() for e in value.replace("\n", ",").split(",") if e.strip()]
+
+
+# =================== COMPANY EMAIL SETTINGS ===================
+
+def _load_email_settings():
+    settings = frappe.get_all(
+        "Company Email Settings",
+        fields=["hr_email", "hr_cc_emails"],
+        limit=1
+    )
+    settings = settings[0] if settings else {}
+    return frappe._dict({
+        "hr_email": settings.get("hr_email"),
+        "hr_cc_emails": settings.get("hr_cc_emails"),
+        "cc_list": split_emails(settings.get("hr_cc_emails"))
+    })
+
+
+def get_company_email_settings():
+    """
+    Company Email Settings as a dict:
+        hr_email (str | None), hr_cc_emails (str | None), cc_list (list[str])
+    """
+    return _get("email", _load_email_settings)
+
+
+# =================== REMINDER SETTINGS ===================
+
+def _load_reminder_settings():
+    settings = frappe.get_single("Reminder Settings")
+
+    users = [row.user for row in settings.email_to if row.user]
+    emails = frappe.get_all(
+        "User",
+        filters={"name": ["in", users]},
+        pluck="email"
+    ) if users else []
+
+    return frappe._dict({
+        "enable_reminders": cint(settings.enable_reminders),
+        "default_email_enabled": cint(settings.default_email_enabled),
+        "scheduler_interval": settings.scheduler_interval,
+        "default_email_template": settings.default_email_template,
+        "default_remind_before_minutes": (
+            cint(settings.default_remind_before_minutes)
+            if settings.default_remind_before_minutes is not None else None
+        ),
+        "allowed_doctypes": [
+            row.reference_doctype for row in settings.allowed_doctypes
+            if row.enabled and row.reference_doctype
+        ],
+        "email_to_users": users,
+        "reminder_emails": sorted({e for e in emails if e})
+    })
+
+
+def get_reminder_settings():
+    """
+    Reminder Settings as a dict:
+        enable_reminders (0/1), default_email_enabled (0/1), scheduler_interval (str),
+        default_email_template (str | None), default_remind_before_minutes (int | None),
+        allowed_doctypes (list[str]), email_to_users (list[str]), reminder_emails (list[str])
+    """
+    return _get("reminder", _load_reminder_settings)
+
+
+# =================== FLASH MESSAGE ===================
+
+def _load_flash_messages():
+    events = frappe.get_all(
+        "Flash Message",
+        filters={"enabled": 1},
+        fields=["name", "event_name", "title", "message", "music", "event_date"],
+        order_by="creation asc"
+    )
+    if not events:
+        return {}
+
+    allowed = {}
+    for row in frappe.get_all(
+        "Event Popup Allowed User",
+        filters={"parenttype": "Flash Message", "parent": ["in", [e.name for e in events]]},
+        fields=["parent", "user"]
+    ):
+        allowed.setdefault(row.parent, []).append(row.user)
+
+    by_date = {}
+    for event in events:
+        if not event.event_date:
+            continue
+        by_date.setdefault(str(getdate(event.event_date)), []).append({
+            "name": event.name,
+            "event_name": event.event_name,
+            "title": event.title,
+            "message": event.message,
+            "music": event.music,
+            "allowed_users": allowed.get(event.name, [])
+        })
+    return by_date
+
+
+def get_flash_message(user, on_date=None):
+    """Enabled Flash Message for the date that the user may see (no allowed users = everyone)"""
+    for event in _get("flash_messages", _load_flash_messages).get(str(getdate(on_date)), []):
+        if not event["allowed_users"] or user in event["allowed_users"]:
+            return frappe._dict({k: v for k, v in event.items() if k != "allowed_users"})
+
+
+# =================== INVALIDATION ===================
+
+CACHE_FIELDS = {
+    "Company Email Settings": "email",
+    "Reminder Settings": "reminder",
+    "Flash Message": "flash_messages"
+}
+
+
+def clear_settings_cache(doc, method=None):
+    """Hook: on_update / on_trash of Company Email Settings, Reminder Settings, Flash Message"""
+    field = CACHE_FIELDS.get(doc.doctype)
+    if field:
+        frappe.cache().hdel(SETTINGS_CACHE_KEY, field)
+
+
+def clear_reminder_recipients(doc, method=None):
+    """Hook: User on_update — reminder recipients are cached by email"""
+    if doc.has_value_changed("email"):
+        frappe.cache().hdel(SETTINGS_CACHE_KEY, "reminder")
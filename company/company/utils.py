@@ -0,0 +1,116 @@
+import frappe
+from frappe.utils import now
+from frappe.model.naming import getseries
+
+
+# =================== BULK INSERT HELPERS ===================
+# Used by the set-based jobs (payroll, leave allocation, attendance import)
+# which write many rows of the same doctype in one go.
+
+def get_series_for(doctype):
+    """
+    Return (series_key, digits) for a doctype named with an old style
+    series expression such as "SS.#####" → ("SS", 5).
+    """
+    autoname = frappe.get_meta(doctype).autoname or ""
+    prefix, _, hashes = autoname.rpartition(".")
+    if not prefix or not hashes or set(hashes) != {"#"}:
+        frappe.throw(f"{doctype} is not named by a numeric series ({autoname})")
+    return prefix, len(hashes)
+
+
+def reserve_series_names(doctype, count):
+    """Reserve `count` consecutive names from the doctype's naming series with one update"""
+    if count <= 0:
+        return []
+
+    key, digits = get_series_for(doctype)
+
+    # Make sure the series row exists (consumes one number), then bump it by the rest of the block
+    getseries(key, digits)
+    if count > 1:
+        frappe.db.sql(
+            "UPDATE `tabSeries` SET `current` = `current` + %s WHERE `name` = %s",
+            (count - 1, key)
+        )
+    last = frappe.db.sql("SELECT `current` FROM `tabSeries` WHERE `name` = %s", key)[0][0]
+
+    return [f"{key}{str(n).zfill(digits)}" for n in range(last - count + 1, last + 1)]
+
+
+def set_fetch_from_values(doctype, rows):
+    """
+    Fill empty `fetch_from` fields (e.g. employee.employee_name) on plain dict rows,
+    loading each linked doctype once for all rows instead of once per document.
+    """
+    meta = frappe.get_meta(doctype)
+
+    fetch_map = {}
+    for df in meta.fields:
+        if not df.fetch_from or "." not in df.fetch_from:
+            continue
+        link_field, source_field = df.fetch_from.split(".", 1)
+        link_df = meta.get_field(link_field)
+        if not link_df or link_df.fieldtype != "Link":
+            continue
+        fetch_map.setdefault((link_field, link_df.options), []).append((df.fieldname, source_field))
+
+    for (link_field, link_doctype), targets in fetch_map.items():
+        link_names = list({r.get(link_field) for r in rows if r.get(link_field)})
+        if not link_names:
+            continue
+
+        source_fields = list({source for _, source in targets})
+        linked = {
+            d.name: d
+            for d in frappe.get_all(
+                link_doctype,
+                filters={"name": ["in", link_names]},
+                fields=["name"] + source_fields
+            )
+        }
+
+        for row in rows:
+            source = linked.get(row.get(link_field))
+            if not source:
+                continue
+            for fieldname, source_field in targets:
+                if row.get(fieldname) in (None, ""):
+                    row[fieldname] = source.get(source_field)
+
+    return rows
+
+
+def bulk_insert_docs(doctype, rows, chunk_size=500):
+    """
+    Insert plain dict rows of a series-named doctype with multi-row INSERTs.
+    Fetched fields are resolved in bulk and unknown keys are dropped.
+    Controller hooks are NOT run — callers own validation.
+    Returns the list of inserted names (same order as rows).
+    """
+    if not rows:
+        return []
+
+    set_fetch_from_values(doctype, rows)
+
+    valid_columns = set(frappe.get_meta(doctype).get_valid_columns())
+    fields = sorted({f for r in rows for f in r if f in valid_columns} - {
+        "name", "owner", "modified_by", "creation", "modified", "docstatus"
+    })
+
+    names = reserve_series_names(doctype, len(rows))
+    timestamp = now()
+    user = frappe.session.user
+
+    values = [
+        [name, user, user, timestamp, timestamp, 0] + [row.get(f) for f in fields]
+        for name, row in zip(names, rows)
+    ]
+
+    frappe.db.bulk_insert(
+        doctype,
+        ["name", "owner", "modified_by", "creation", "modified", "docstatus"] + fields,
+        values,
+        chunk_size=chunk_size
+    )
+    return names
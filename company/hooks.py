@@ -12,6 +12,7 @@ app_include_js = [
     "/assets/company/js/invoice.js?v=4",
     "/assets/company/js/purchase.js?v=4",
     "/assets/company/js/expenses.js",
+    "/assets/company/js/employee_home.js",
     "/assets/company/js/custom.js",
     "/assets/company/js/attendance.js",
     "/assets/company/js/salary_slip.js",
@@ -52,35 +53,77 @@ app_include_css = "/assets/company/css/custom.css?v=12"
 
 
 doc_events = {
-    "Estimation": {
-        "before_insert": "company.company.api.before_insert_estimation"
+    "Employee": {
+        "on_update": [
+            "company.company.employees.clear_employee_profile_cache",
+            "company.company.celebrations.clear_celebration_index"
+        ],
+        "on_trash": [
+            "company.company.employees.clear_employee_profile_cache",
+            "company.company.celebrations.clear_celebration_index"
+        ]
+    },
+    "User": {
+        "on_update": "company.company.settings.clear_reminder_recipients"
+    },
+    "Company Email Settings": {
+        "on_update": "company.company.settings.clear_settings_cache",
+        "on_trash": "company.company.settings.clear_settings_cache"
     },
-    "Invoice": {
-        "before_insert": "company.company.api.before_insert_invoice"
+    "Reminder Settings": {
+        "on_update": "company.company.settings.clear_settings_cache"
+    },
+    "Flash Message": {
+        "on_update": "company.company.settings.clear_settings_cache",
+        "on_trash": "company.company.settings.clear_settings_cache"
     },
     "Invoice Collection": {
-        "validate": "company.company.api.validate_invoice_collection",
-        "after_insert": "company.company.api.update_invoice_received_balance",
-        "on_update": "company.company.api.update_invoice_received_balance",
-        "on_trash": "company.company.api.update_invoice_received_balance"
+        "validate": "company.company.receivables.validate_invoice_collection",
+        "on_update": "company.company.receivables.update_invoice_received_balance",
+        "on_trash": "company.company.receivables.remove_invoice_collection"
     },
-    "Expenses": {
-        "before_insert": "company.company.api.before_insert_expense"
+    "Purchase Collection": {
+        "validate": "company.company.payables.validate_purchase_collection",
+        "on_update": "company.company.payables.update_purchase_paid_balance",
+        "on_trash": "company.company.payables.remove_purchase_collection"
     },
     "Leave Application": {
         "validate": "company.company.api.validate_leave_balance",
         "before_submit": "company.company.api.validate_leave_balance",
         "on_submit": ["company.company.api.create_unread_entry_for_hr"],
         "on_change": [
-            "company.company.api.update_permission_allocation"
+            "company.company.api.update_permission_allocation",
+            "company.company.conflicts.clear_conflict_index"
         ],
+        "on_trash": "company.company.conflicts.clear_conflict_index",
         "after_insert": "company.company.api.auto_submit_leave_application"
     },
     "Attendance": {
-        "on_update": "company.company.api.update_leave_allocation_from_attendance",
+        "on_change": "company.company.conflicts.clear_conflict_index",
+        "on_update": [
+            "company.company.api.update_leave_allocation_from_attendance",
+            "company.company.attendance_summary.update_attendance_summary",
+            "company.company.attendance_analytics.clear_day_bucket"
+        ],
+        "on_trash": [
+            "company.company.api.update_leave_allocation_from_attendance",
+            "company.company.attendance_summary.remove_from_attendance_summary",
+            "company.company.conflicts.clear_conflict_index",
+            "company.company.attendance_analytics.clear_day_bucket"
+        ]
+    },
+    "Holiday List": {
+        "on_update": "company.company.holidays.clear_holiday_cache",
+        "on_trash": "company.company.holidays.clear_holiday_cache"
     },
     "WFH Attendance": {
-        "on_submit": "company.company.api.create_unread_entry_for_hr"
+        "on_submit": "company.company.api.create_unread_entry_for_hr",
+        "on_change": "company.company.conflicts.clear_conflict_index",
+        "on_trash": "company.company.conflicts.clear_conflict_index"
+    },
+    "Asset Assignment": {
+        "on_change": "company.company.conflicts.clear_conflict_index",
+        "on_trash": "company.company.conflicts.clear_conflict_index"
     },
     "Request": {
         "on_submit": "company.company.api.create_unread_entry_for_hr"
@@ -99,13 +142,25 @@ doc_events = {
 }
 
 
+# Reminder schedule (ZSET + seeded marker) survives bench clear-cache
+persistent_cache_keys = ["reminder_schedule*"]
+
+
 scheduler_events = {
     "daily": [
-        "company.company.api.update_expired_renewals"
+        "company.company.api.update_expired_renewals",
+        "company.company.receivables.reconcile_invoice_balances"
+    ],
+    "hourly": [
+        "company.company.reminders.run_email_reminders"
     ],
     "cron": {
+        "* * * * *": [
+            "company.company.push.drain_push_queue",
+            "company.company.reminders.dispatch_due_reminders"
+        ],
         "*/5 * * * *": [
-            "company.company.reminders.run_email_reminders"
+            "company.company.salary_release.sweep_release_queue"
         ]
     }
 }
@@ -170,6 +225,11 @@ extend_bootinfo = "company.company.api.extend_bootinfo"
 
 # include js in doctype views
 # doctype_list_js = {"doctype" : "public/js/doctype_list.js"}
+doctype_list_js = {
+    "Leave Application": "public/js/hr_unread_list.js",
+    "WFH Attendance": "public/js/hr_unread_list.js",
+    "Request": "public/js/hr_unread_list.js"
+}
 # doctype_tree_js = {"doctype" : "public/js/doctype_tree.js"}
 # doctype_calendar_js = {"doctype" : "public/js/doctype_calendar.js"}
 
@@ -320,7 +380,9 @@ extend_bootinfo = "company.company.api.extend_bootinfo"
 # Ignore links to specified DocTypes when deleting documents
 # -----------------------------------------------------------
 
-# ignore_links_on_delete = ["Communication", "ToDo"]
+# Ledger / outbox rows keep pointing at their source document after it is deleted
+# (leave on_trash posts a reversing entry linking back to it; push rows are never cancelled)
+ignore_links_on_delete = ["Leave Ledger Entry", "Push Notification Queue"]
 
 # Request Events
 # ----------------
@@ -0,0 +1,6 @@
+from company.company.customers import rebuild_customer_invoice_stats
+
+
+def execute():
+    """Backfill Customer first_invoice / invoice_count / last_invoice_date"""
+    rebuild_customer_invoice_stats()
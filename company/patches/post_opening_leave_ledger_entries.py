@@ -0,0 +1,107 @@
+import frappe
+from frappe.utils import flt, getdate
+
+from company.company.utils import bulk_insert_docs
+
+
+def execute():
+    """
+    Ledger history for debits taken before the leave ledger existed.
+    total_leaves_taken already includes them, so only the entries are
+    written (balances are not moved); otherwise re-saving an old Attendance /
+    Permission would debit it again and cancelling it would credit nothing.
+    References that already have ledger entries are skipped, and so are
+    days the old hooks never debited (allocation already used up).
+    """
+    attendance = frappe.db.sql("""
+        SELECT a.name AS reference_name, a.employee, a.leave_type,
+            a.attendance_date AS posting_date, 1 AS leaves,
+            (
+                SELECT la.name FROM `tabLeave Allocation` la
+                WHERE la.employee = a.employee AND la.leave_type = a.leave_type
+                AND la.status = 'Approved'
+                AND la.from_date <= a.attendance_date AND la.to_date >= a.attendance_date
+                ORDER BY la.from_date DESC
+                LIMIT 1
+            ) AS leave_allocation
+        FROM `tabAttendance` a
+        WHERE a.status IN ('On Leave', 'Leave')
+        AND IFNULL(a.leave_type, '') != ''
+        AND NOT EXISTS (
+            SELECT 1 FROM `tabLeave Ledger Entry` l
+            WHERE l.reference_doctype = 'Attendance' AND l.reference_name = a.name
+        )
+    """, as_dict=True)
+
+    permissions = frappe.db.sql("""
+        SELECT app.name AS reference_name, app.employee, app.leave_type,
+            app.from_date AS posting_date, app.permission_hours AS leaves,
+            COALESCE(
+                (
+                    SELECT la.name FROM `tabLeave Allocation` la
+                    WHERE la.employee = app.employee AND la.leave_type = app.leave_type
+                    AND la.status = 'Approved'
+                    AND la.from_date <= app.from_date AND la.to_date >= app.from_date
+                    ORDER BY la.from_date DESC
+                    LIMIT 1
+                ),
+                (
+                    SELECT la.name FROM `tabLeave Allocation` la
+                    WHERE la.employee = app.employee AND la.leave_type = app.leave_type
+                    AND la.status = 'Approved'
+                    ORDER BY la.from_date DESC
+                    LIMIT 1
+                )
+            ) AS leave_allocation
+        FROM `tabLeave Application` app
+        WHERE LOWER(app.leave_type) = 'permission'
+        AND app.workflow_state = 'Approved'
+        AND app.docstatus < 2
+        AND IFNULL(app.permission_hours, 0) > 0
+        AND NOT EXISTS (
+            SELECT 1 FROM `tabLeave Ledger Entry` l
+            WHERE l.reference_doctype = 'Leave Application' AND l.reference_name = app.name
+        )
+    """, as_dict=True)
+
+    candidates = []
+    for reference_doctype, references in (("Attendance", attendance), ("Leave Application", permissions)):
+        for ref in references:
+            if ref.leave_allocation:
+                ref.reference_doctype = reference_doctype
+                candidates.append(ref)
+
+    if not candidates:
+        return
+
+    # The old hooks stopped debiting once an allocation was used up, so only
+    # total_leaves_taken (less what the ledger already holds) is backed by
+    # real debits; earlier days are taken first and the rest get no entry
+    allocations = tuple({ref.leave_allocation for ref in candidates})
+    remaining = {
+        row.name: flt(row.total_leaves_taken) - flt(row.posted)
+        for row in frappe.db.sql("""
+            SELECT la.name, la.total_leaves_taken,
+                (
+                    SELECT IFNULL(SUM(l.leaves), 0) FROM `tabLeave Ledger Entry` l
+                    WHERE l.leave_allocation = la.name
+                ) AS posted
+            FROM `tabLeave Allocation` la
+            WHERE la.name IN %s
+        """, (allocations,), as_dict=True)
+    }
+
+    rows = []
+    candidates.sort(key=lambda ref: (getdate(ref.posting_date), ref.reference_name))
+    for ref in candidates:
+        leaves = flt(ref.leaves)
+        if leaves > remaining.get(ref.leave_allocation, 0) + 0.001:
+            continue
+        remaining[ref.leave_allocation] -= leaves
+        ref.update({
+            "entry_type": "Debit",
+            "remarks": "Opening entry (posted before the leave ledger)"
+        })
+        rows.append(ref)
+
+    bulk_insert_docs("Leave Ledger Entry", rows)
@@ -0,0 +1,6 @@
+from company.company.attendance_summary import rebuild_attendance_summary
+
+
+def execute():
+    """Backfill Attendance Monthly Summary for all historical attendance"""
+    rebuild_attendance_summary()
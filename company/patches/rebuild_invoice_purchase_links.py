@@ -0,0 +1,6 @@
+from company.company.purchase_links import rebuild_invoice_purchase_links
+
+
+def execute():
+    """Create Invoice Purchase Link rows for already linked invoices / purchases"""
+    rebuild_invoice_purchase_links()
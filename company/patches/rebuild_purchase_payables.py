@@ -0,0 +1,6 @@
+from company.company.payables import rebuild_purchase_payables
+
+
+def execute():
+    """Recompute Purchase paid / balance / status from historical collections"""
+    rebuild_purchase_payables()
@@ -0,0 +1,9 @@
+import frappe
+
+
+def execute():
+    """Backfill the cached Leave Allocation balance used by the leave ledger"""
+    frappe.db.sql("""
+        UPDATE `tabLeave Allocation`
+        SET leave_balance = IFNULL(total_leaves_allocated, 0) - IFNULL(total_leaves_taken, 0)
+    """)
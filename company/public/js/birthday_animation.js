@@ -13,28 +13,17 @@ frappe.after_ajax(() => {
     if (frappe.session.user === "Guest") return;
 
     frappe.call({
-        method: "frappe.client.get_list",
-        args: {
-            doctype: "Employee",
-            filters: { user: frappe.session.user },
-            fields: ["employee_name", "dob"]
-        },
+        method: "company.company.celebrations.get_celebrations",
+        args: { period: "today" },
         callback(r) {
-            if (!r.message || !r.message.length) return;
+            const emp = ((r.message && r.message.birthdays) || [])
+                .find(b => b.is_self || b.user === frappe.session.user);
+            if (!emp) return;
 
-            const emp = r.message[0];
-            const [y, m, d] = emp.dob.split("-");
-            const today = new Date();
-
-            const todayKey = today.toISOString().split("T")[0];
+            const todayKey = new Date().toISOString().split("T")[0];
             if (localStorage.getItem("birthday_shown") === todayKey) return;
 
-            if (
-                today.getDate() === Number(d) &&
-                today.getMonth() + 1 === Number(m)
-            ) {
-                showSurpriseButton(emp.employee_name);
-            }
+            showSurpriseButton(emp.employee_name);
         }
     });
 
@@ -0,0 +1,37 @@
+// -------------------------------------------------------
+// EMPLOYEE HOME
+// One call for all employee desk widgets.
+// Section hashes are sent back so the server can skip
+// sections that have not changed since the last load.
+// -------------------------------------------------------
+frappe.provide("company.employee_home");
+
+company.employee_home.sections = {};
+company.employee_home.hashes = {};
+
+company.employee_home.load = function () {
+    if (company.employee_home._pending) return company.employee_home._pending;
+
+    company.employee_home._pending = frappe.call({
+        method: "company.company.api.get_employee_home",
+        args: { known: company.employee_home.hashes },
+    }).then((r) => {
+        const sections = (r.message && r.message.sections) || {};
+
+        Object.keys(sections).forEach((name) => {
+            const section = sections[name];
+            company.employee_home.hashes[name] = section.hash;
+            if (!section.unchanged) {
+                company.employee_home.sections[name] = section.data;
+            }
+        });
+
+        company.employee_home._pending = null;
+        return company.employee_home.sections;
+    }, (err) => {
+        company.employee_home._pending = null;
+        throw err;
+    });
+
+    return company.employee_home._pending;
+};
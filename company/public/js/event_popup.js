@@ -1,13 +1,13 @@
 // company/public/js/event-popup.js
 // Full dynamic Event Popup (uses same theme + effects as your birthday script)
-// Only triggers for Event Popup doctype via company.company.api.get_today_event
+// Only triggers for Event Popup doctype; reads the "today_event" section of
+// the shared employee home payload (company.employee_home.load)
 // No birthday logic is included (per your request).
 
 (function() {
     // ---------------------------
     // CONFIG
     // ---------------------------
-    const API_METHOD = "company.company.api.get_today_event";
     // Fallback audio file (keeps your original birthday song path as fallback)
     const FALLBACK_AUDIO = "";
 
@@ -52,35 +52,30 @@
 
         frappe.after_ajax(() => {
             try {
-                frappe.call({
-                    method: API_METHOD,
-                    callback: function(r) {
-                        if (!r || !r.message) return;
-
-                        const ev = r.message;
-
-                        // require enabled event (server should only return enabled, but double-check)
-                        if (ev.enabled === 0 || ev.enabled === "0") return;
-
-                        // create stable key per event per date to avoid duplicates
-                        const dateKey = new Date().toISOString().split("T")[0];
-                        const eventNameSafe = (ev.event_name || ev.title || "event").replace(/\s+/g, "_").toLowerCase();
-                        const storageKey = `event_popup_shown_${eventNameSafe}_${dateKey}`;
-                        if (localStorage.getItem(storageKey)) return; // already shown today
-
-                        // mark shown (we still allow re-open if needed in same session if you remove key)
-                        localStorage.setItem(storageKey, "1");
-
-                        // Prepare audio (resolve URL and create Audio object)
-                        const musicUrl = resolveMusicUrl(ev.music);
-                        window.eventAudio = safeCreateAudio(musicUrl);
-
-                        // Trigger audio + popup on single user click
-                        createUnlockClick(ev);
-
-
-
-                    }
+                company.employee_home.load().then((sections) => {
+                    const ev = sections.today_event;
+                    if (!ev) return;
+
+                    // require enabled event (server should only return enabled, but double-check)
+                    if (ev.enabled === 0 || ev.enabled === "0") return;
+
+                    // create stable key per event per date to avoid duplicates
+                    const dateKey = new Date().toISOString().split("T")[0];
+                    const eventNameSafe = (ev.event_name || ev.title || "event").replace(/\s+/g, "_").toLowerCase();
+                    const storageKey = `event_popup_shown_${eventNameSafe}_${dateKey}`;
+                    if (localStorage.getItem(storageKey)) return; // already shown today
+
+                    // mark shown (we still allow re-open if needed in same session if you remove key)
+                    localStorage.setItem(storageKey, "1");
+
+                    // Prepare audio (resolve URL and create Audio object)
+                    const musicUrl = resolveMusicUrl(ev.music);
+                    window.eventAudio = safeCreateAudio(musicUrl);
+
+                    // Trigger audio + popup on single user click
+                    createUnlockClick(ev);
+                }).catch((e) => {
+                    console.error("Event Popup: employee home load failed", e);
                 });
             } catch (e) {
                 // fail silently
@@ -0,0 +1,34 @@
+// ====================================================
+// HR Unread — "Mark All as Read" list menu
+// Loaded through doctype_list_js for the tracked doctypes,
+// so it does not depend on custom_badge.js being included.
+// ====================================================
+
+["Leave Application", "WFH Attendance", "Request"].forEach((doctype) => {
+	const settings = (frappe.listview_settings[doctype] = frappe.listview_settings[doctype] || {});
+
+	// This file is evaluated once per list that loads it; wrap onload only once
+	if (settings.__hr_mark_all_read) return;
+	settings.__hr_mark_all_read = true;
+
+	const onload = settings.onload;
+	settings.onload = function (listview) {
+		if (onload) onload.call(this, listview);
+		add_mark_all_read_menu(listview, doctype);
+	};
+});
+
+function add_mark_all_read_menu(listview, doctype) {
+	if (!frappe.user_roles.includes("HR")) return;
+	listview.page.add_menu_item(__("Mark All as Read"), () => {
+		frappe.call({
+			method: "company.company.api.mark_all_hr_items_as_read",
+			args: { doctype },
+			callback: () => {
+				// Sidebar badges exist only when custom_badge.js is included
+				if (typeof update_hr_badges === "function") update_hr_badges();
+				listview.refresh();
+			}
+		});
+	});
+}
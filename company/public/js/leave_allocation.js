@@ -17,6 +17,13 @@ frappe.listview_settings['Leave Allocation'] = {
                         fieldtype: 'Int',
                         default: parseInt(frappe.datetime.now_date().split("-")[1]), // current month
                         reqd: 1
+                    },
+                    {
+                        fieldname: 'months',
+                        label: 'Number of Months',
+                        fieldtype: 'Int',
+                        default: 1, // > 1 backfills consecutive months
+                        reqd: 1
                     }
                 ],
                 function(values){
@@ -24,7 +31,8 @@ frappe.listview_settings['Leave Allocation'] = {
                         method: "company.company.api.auto_allocate_monthly_leaves",
                         args: {
                             year: values.year,
-                            month: values.month
+                            month: values.month,
+                            months: values.months
                         },
                         callback: function(r){
                             if(r.message){